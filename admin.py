@@ -1,8 +1,12 @@
 
 # Register your models here.
+from datetime import timedelta
+
+from django.conf import settings
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User, Property, PropertyImage, Message, Appointment, Review, VerificationDocument, Amenity, PropertyAmenity
+from django.utils import timezone
+from .models import User, Property, PropertyImage, Message, Appointment, Review, VerificationDocument, Amenity, PropertyAmenity, PriceBenchmark, record_bulk_changes
 
 class CustomUserAdmin(UserAdmin):
     list_display = ('username', 'email', 'first_name', 'last_name', 'user_type', 'is_verified', 'is_staff')
@@ -31,7 +35,8 @@ class PropertyImageInline(admin.TabularInline):
     model = PropertyImage
     extra = 1
     fields = ('image', 'is_main', 'uploaded_at')
-    readonly_fields = ('uploaded_at',)
+    # Changed through Property.set_main_image() so only one image is main
+    readonly_fields = ('is_main', 'uploaded_at')
 
 class PropertyAmenityInline(admin.TabularInline):
     model = PropertyAmenity
@@ -46,23 +51,58 @@ class PropertyAdmin(admin.ModelAdmin):
     inlines = [PropertyImageInline, PropertyAmenityInline]
     fieldsets = (
         (None, {'fields': ('landlord', 'title', 'description')}),
-        ('Property Details', {'fields': ('property_type', 'price', 'rental_frequency', 
+        ('Property Details', {'fields': ('property_type', 'price', 'rental_frequency', 'monthly_price',
                                        'bedrooms', 'bathrooms', 'sqft')}),
         ('Location', {'fields': ('address', 'city', 'state', 'zip_code')}),
         ('Status', {'fields': ('is_verified', 'is_active')}),
         ('Dates', {'fields': ('created_at', 'updated_at')}),
     )
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('monthly_price', 'created_at', 'updated_at')
+
+class RecentPeriodFilter(admin.SimpleListFilter):
+    """Show recent rows unless 'All time' is picked, so Postgres prunes old partitions."""
+    title = 'period'
+    parameter_name = 'period'
+    date_field = None
+    PERIODS = (('30', 'Last 30 days'), ('recent', 'Recent'), ('365', 'Last year'), ('all', 'All time'))
+    
+    def lookups(self, request, model_admin):
+        return self.PERIODS
+    
+    def value(self):
+        value = super().value()
+        return value if value in dict(self.PERIODS) else 'recent'
+    
+    def choices(self, changelist):
+        for lookup, title in self.lookup_choices:
+            yield {
+                'selected': self.value() == lookup,
+                'query_string': changelist.get_query_string({self.parameter_name: lookup}),
+                'display': title,
+            }
+    
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value == 'all':
+            return queryset
+        days = settings.RECENT_ACTIVITY_DAYS if value == 'recent' else int(value)
+        return queryset.filter(**{f'{self.date_field}__gte': timezone.now() - timedelta(days=days)})
+
+class MessagePeriodFilter(RecentPeriodFilter):
+    date_field = 'sent_at'
+
+class AppointmentPeriodFilter(RecentPeriodFilter):
+    date_field = 'requested_date'
 
 class MessageAdmin(admin.ModelAdmin):
     list_display = ('subject', 'sender', 'recipient', 'property', 'is_read', 'sent_at')
-    list_filter = ('is_read', 'sent_at')
+    list_filter = (MessagePeriodFilter, 'is_read', 'sent_at')
     search_fields = ('subject', 'body', 'sender__username', 'recipient__username')
     raw_id_fields = ('sender', 'recipient', 'property')
 
 class AppointmentAdmin(admin.ModelAdmin):
     list_display = ('property', 'requester', 'landlord', 'requested_date', 'status')
-    list_filter = ('status', 'requested_date')
+    list_filter = (AppointmentPeriodFilter, 'status', 'requested_date')
     search_fields = ('property__title', 'requester__username', 'landlord__username')
     raw_id_fields = ('property', 'requester', 'landlord')
 
@@ -82,15 +122,23 @@ class AmenityAdmin(admin.ModelAdmin):
     list_display = ('name', 'icon')
     search_fields = ('name',)
 
+class PriceBenchmarkAdmin(admin.ModelAdmin):
+    list_display = ('city', 'property_type', 'bedrooms', 'p25', 'p50', 'p75', 'sample_size', 'refreshed_at')
+    list_filter = ('property_type', 'bedrooms')
+    search_fields = ('city',)
+    readonly_fields = ('refreshed_at',)
+
 # Add these to your existing admin.py
 
 @admin.action(description='Mark selected properties as verified')
 def make_verified(modeladmin, request, queryset):
     queryset.update(is_verified=True)
+    record_bulk_changes(queryset)
 
 @admin.action(description='Mark selected properties as unverified')
 def make_unverified(modeladmin, request, queryset):
     queryset.update(is_verified=False)
+    record_bulk_changes(queryset)
 
 @admin.action(description='Approve selected documents')
 def approve_documents(modeladmin, request, queryset):
@@ -112,6 +160,7 @@ admin.site.register(Appointment, AppointmentAdmin)
 admin.site.register(Review, ReviewAdmin)
 admin.site.register(VerificationDocument, VerificationDocumentAdmin)
 admin.site.register(Amenity, AmenityAdmin)
+admin.site.register(PriceBenchmark, PriceBenchmarkAdmin)
 admin.site.site_header = "Tenant Network Administration"
 admin.site.site_title = "Tenant Network Admin Portal"
 admin.site.index_title = "Welcome to Tenant Network Admin"
\ No newline at end of file
@@ -0,0 +1,102 @@
+"""
+The amenity catalog and amenity filtering.
+
+Amenity is a small table that rarely changes, so each process keeps the
+whole catalog in memory and reloads it only when the catalog version
+moves. The version is derived from the table itself (row count and
+newest ``updated_at``), so every process computes the same one; it is
+cached for AMENITY_CATALOG_SECONDS and dropped after any Amenity is saved
+or deleted. Listing amenities are then resolved against the catalog
+without joining Amenity.
+"""
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from .models import Amenity, PropertyAmenity
+
+CATALOG_VERSION_KEY = 'amenities:catalog:version'
+
+_lock = threading.Lock()
+_catalog = {}
+_version = None
+
+
+def catalog_version():
+    """
+    Changes whenever an Amenity is added, edited or removed. With a cache the
+    other processes don't share, they notice at most AMENITY_CATALOG_SECONDS late.
+    """
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        stats = Amenity.objects.aggregate(count=Count('pk'), changed=Max('updated_at'))
+        changed = stats['changed'].timestamp() if stats['changed'] else 0
+        version = f"{stats['count']}-{changed}"
+        cache.set(CATALOG_VERSION_KEY, version, getattr(settings, 'AMENITY_CATALOG_SECONDS', 60))
+    return version
+
+
+def catalog():
+    """Every Amenity by pk, in name order, from this process's copy while it is current."""
+    global _catalog, _version
+    # Read the version first so a change made during the reload is noticed next time
+    version = catalog_version()
+    if version != _version:
+        amenities = {amenity.pk: amenity for amenity in Amenity.objects.order_by('name')}
+        with _lock:
+            _catalog, _version = amenities, version
+    return _catalog
+
+
+def invalidate_catalog():
+    """Make every process sharing the cache reload the catalog on its next use."""
+    global _version
+    cache.delete(CATALOG_VERSION_KEY)
+    with _lock:
+        _version = None
+
+
+def amenities_for(property_ids):
+    """
+    ``{property_id: [PropertyAmenity, ...]}`` for the given listings from a
+    single query, with ``.amenity`` filled in from the catalog.
+    """
+    amenities = catalog()
+    found = {pk: [] for pk in property_ids}
+    rows = PropertyAmenity.objects.filter(property_id__in=property_ids).only('property_id', 'amenity_id', 'notes')
+    for row in rows:
+        amenity = amenities.get(row.amenity_id)
+        if amenity is not None:
+            row.amenity = amenity
+            found[row.property_id].append(row)
+    for rows in found.values():
+        rows.sort(key=lambda row: row.amenity.name)
+    return found
+
+
+def parse_amenity_ids(values):
+    """The known amenity pks among ``values`` (e.g. ``request.GET.getlist('amenity')``)."""
+    amenities = catalog()
+    return sorted({int(value) for value in values if value.isdigit() and int(value) in amenities})
+
+
+def with_amenities(queryset, amenity_ids):
+    """
+    Narrow a Property queryset to listings having every amenity in
+    ``amenity_ids``. The (amenity, property) index gives each amenity's
+    listings in order, so the intersection is one grouped index scan.
+    """
+    if not amenity_ids:
+        return queryset
+    having_all = (
+        PropertyAmenity.objects
+        .filter(amenity_id__in=amenity_ids)
+        .order_by()
+        .values('property_id')
+        .annotate(matched=Count('amenity_id'))
+        .filter(matched=len(amenity_ids))
+        .values('property_id')
+    )
+    return queryset.filter(pk__in=having_all)
@@ -0,0 +1,157 @@
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Case, DecimalField, ExpressionWrapper, F, Max, Value, When
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from .models import PriceBenchmark, Property
+
+BENCHMARK_PERCENTILES = (0.25, 0.50, 0.75)
+
+
+def backfill_monthly_prices():
+    """Populate ``Property.monthly_price`` for every row in a single UPDATE."""
+    whens = [
+        When(
+            rental_frequency=frequency,
+            then=ExpressionWrapper(
+                F('price') * Value(factor),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            ),
+        )
+        for frequency, factor in Property.MONTHLY_PRICE_FACTORS.items()
+    ]
+    return Property.objects.update(monthly_price=Case(*whens, default=F('price')))
+
+
+def grouped_percentiles(codes, values, quantiles=BENCHMARK_PERCENTILES):
+    """
+    Compute percentiles of ``values`` for every group in ``codes`` at once.
+
+    Returns ``(group_codes, counts, table)`` where ``table`` has one row per
+    group and one column per quantile. Uses the same linear interpolation as
+    ``numpy.percentile``.
+    """
+    order = np.lexsort((values, codes))
+    codes = codes[order]
+    values = values[order]
+    group_codes, starts, counts = np.unique(codes, return_index=True, return_counts=True)
+
+    positions = starts[:, None] + np.asarray(quantiles)[None, :] * (counts[:, None] - 1)
+    lower = np.floor(positions).astype(np.int64)
+    upper = np.ceil(positions).astype(np.int64)
+    fraction = positions - lower
+    table = values[lower] + (values[upper] - values[lower]) * fraction
+    return group_codes, counts, table
+
+
+def _dirty_groups(since):
+    # all_objects, so a soft-deleted listing's group drops it too
+    changed = Property.all_objects.all()
+    if since is not None:
+        changed = changed.filter(updated_at__gt=since)
+    groups = set(
+        changed.annotate(city_key=Lower('city'))
+        .values_list('city_key', 'property_type', 'bedrooms')
+        .distinct()
+    )
+    # Groups a listing moved out of or was deleted from (see models.mark_left_benchmark_group)
+    groups.update(PriceBenchmark.objects.filter(stale=True).values_list('city', 'property_type', 'bedrooms'))
+    return groups
+
+
+def refresh_price_benchmarks(full=False):
+    """
+    Recompute the p25/p50/p75 monthly-price table.
+
+    By default only the city x property_type x bedrooms groups touched since
+    the previous refresh are recomputed; ``full=True`` rebuilds everything.
+    Returns the number of groups written or removed.
+    """
+    started = timezone.now()
+    since = None if full else PriceBenchmark.objects.aggregate(latest=Max('refreshed_at'))['latest']
+    dirty = _dirty_groups(since)
+    if not dirty:
+        return 0
+
+    rows = (
+        Property.objects.filter(is_active=True, monthly_price__isnull=False)
+        .annotate(city_key=Lower('city'))
+        .filter(
+            city_key__in={group[0] for group in dirty},
+            property_type__in={group[1] for group in dirty},
+            bedrooms__in={group[2] for group in dirty},
+        )
+        .values_list('city_key', 'property_type', 'bedrooms', 'monthly_price')
+    )
+
+    keys = []
+    index = {}
+    codes = []
+    prices = []
+    for city, property_type, bedrooms, monthly_price in rows.iterator(chunk_size=5000):
+        key = (city, property_type, bedrooms)
+        if key not in dirty:
+            continue
+        if key not in index:
+            index[key] = len(keys)
+            keys.append(key)
+        codes.append(index[key])
+        prices.append(float(monthly_price))
+
+    benchmarks = []
+    if codes:
+        group_codes, counts, table = grouped_percentiles(
+            np.asarray(codes, dtype=np.int64),
+            np.asarray(prices, dtype=np.float64),
+        )
+        for code, count, (p25, p50, p75) in zip(group_codes, counts, table):
+            city, property_type, bedrooms = keys[code]
+            benchmarks.append(PriceBenchmark(
+                city=city,
+                property_type=property_type,
+                bedrooms=bedrooms,
+                p25=Decimal(f'{p25:.2f}'),
+                p50=Decimal(f'{p50:.2f}'),
+                p75=Decimal(f'{p75:.2f}'),
+                sample_size=int(count),
+                refreshed_at=started,
+            ))
+
+    # Groups that no longer have any active listing lose their benchmark
+    emptied = dirty - set(index)
+
+    with transaction.atomic():
+        PriceBenchmark.objects.bulk_create(
+            benchmarks,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['city', 'property_type', 'bedrooms'],
+            update_fields=['p25', 'p50', 'p75', 'sample_size', 'refreshed_at', 'stale'],
+        )
+        if full:
+            PriceBenchmark.objects.filter(refreshed_at__lt=started).delete()
+        else:
+            for city, property_type, bedrooms in emptied:
+                PriceBenchmark.objects.filter(
+                    city=city, property_type=property_type, bedrooms=bedrooms
+                ).delete()
+
+    return len(benchmarks) + len(emptied)
+
+
+def get_price_benchmark(city, property_type, bedrooms):
+    """Return the stored benchmark for a listing's group, or ``None``."""
+    try:
+        bedrooms = int(bedrooms)
+    except (TypeError, ValueError):
+        return None
+    if not city or not property_type:
+        return None
+    return PriceBenchmark.objects.filter(
+        city=city.strip().lower(),
+        property_type=property_type,
+        bedrooms=bedrooms,
+    ).first()
@@ -0,0 +1,261 @@
+"""
+Read-only JSON API for listings.
+
+``?fields=`` picks property columns and ``?fields[images]=`` (etc.) the
+columns of embedded resources named in ``?include=``. Related rows are
+loaded with one query per relation per page or export batch. Lists use
+opaque keyset cursors; the export streams NDJSON in constant memory.
+"""
+import base64
+import binascii
+import json
+from collections import defaultdict
+
+from django.contrib.auth.decorators import login_required
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import router
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from .changefeed import PUBLIC_MODELS, CursorExpired, read_changes
+from .models import Property, PropertyAmenity, PropertyImage, Review
+from .search import InvalidFilter, filter_properties
+
+PROPERTY_FIELDS = {
+    'id': 'id',
+    'landlord': 'landlord_id',
+    'title': 'title',
+    'slug': 'slug',
+    'description': 'description',
+    'property_type': 'property_type',
+    'price': 'price',
+    'rental_frequency': 'rental_frequency',
+    'monthly_price': 'monthly_price',
+    'bedrooms': 'bedrooms',
+    'bathrooms': 'bathrooms',
+    'sqft': 'sqft',
+    'address': 'address',
+    'city': 'city',
+    'state': 'state',
+    'zip_code': 'zip_code',
+    'latitude': 'latitude',
+    'longitude': 'longitude',
+    'is_verified': 'is_verified',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+}
+
+# Each relation: queryset, {api field: db lookup}
+RELATIONS = {
+    'images': (
+        lambda: PropertyImage.objects.order_by('-is_main', 'uploaded_at'),
+        {'id': 'id', 'image': 'image', 'caption': 'caption', 'is_main': 'is_main', 'uploaded_at': 'uploaded_at'},
+    ),
+    'amenities': (
+        lambda: PropertyAmenity.objects.order_by('amenity__name'),
+        {'id': 'amenity_id', 'name': 'amenity__name', 'icon': 'amenity__icon', 'notes': 'notes'},
+    ),
+    'reviews': (
+        lambda: Review.objects.filter(is_approved=True).order_by('-created_at'),
+        {'id': 'id', 'reviewer': 'reviewer__username', 'rating': 'rating', 'title': 'title',
+         'content': 'content', 'created_at': 'created_at'},
+    ),
+}
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+EXPORT_CHUNK_SIZE = 2000
+CHANGEFEED_DEFAULT_LIMIT = 500
+CHANGEFEED_MAX_LIMIT = 5000
+
+
+class BadRequest(Exception):
+    pass
+
+
+def _requested_fields(request, key, available):
+    raw = request.GET.get(key)
+    if not raw:
+        return list(available)
+    names = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise BadRequest(f"Unknown field(s) for {key}: {', '.join(unknown)}")
+    return names
+
+
+def _includes(request):
+    names = [name.strip() for name in request.GET.get('include', '').split(',') if name.strip()]
+    unknown = [name for name in names if name not in RELATIONS]
+    if unknown:
+        raise BadRequest(f"Unknown include(s): {', '.join(unknown)}")
+    return {name: _requested_fields(request, f'fields[{name}]', RELATIONS[name][1]) for name in names}
+
+
+def _property_columns(fields):
+    # The primary key is always needed to attach embedded resources and build cursors
+    return ['id'] + [PROPERTY_FIELDS[name] for name in fields if name != 'id']
+
+
+def _serialize_property(row, fields):
+    return {name: row[PROPERTY_FIELDS[name]] for name in fields}
+
+
+def _embed(items, rows, includes, using=None):
+    """Attach included relations to ``items`` with one query per relation."""
+    ids = [row['id'] for row in rows]
+    for name, fields in includes.items():
+        queryset_factory, lookups = RELATIONS[name]
+        grouped = defaultdict(list)
+        columns = ['property_id'] + [lookups[field] for field in fields]
+        related_rows = queryset_factory().filter(property_id__in=ids)
+        if using is not None:
+            related_rows = related_rows.using(using)
+        for related in related_rows.values(*columns):
+            entry = {field: related[lookups[field]] for field in fields}
+            if name == 'images' and entry.get('image'):
+                entry['image'] = default_storage.url(entry['image'])
+            grouped[related['property_id']].append(entry)
+        for item, row in zip(items, rows):
+            item[name] = grouped.get(row['id'], [])
+    return items
+
+
+def _encode_cursor(pk):
+    return base64.urlsafe_b64encode(json.dumps({'id': pk}).encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        return int(json.loads(base64.urlsafe_b64decode(padded))['id'])
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        raise BadRequest('Invalid cursor')
+
+
+def _base_queryset(request):
+    return filter_properties(Property.objects.filter(is_active=True), request.GET, strict=True).order_by('-pk')
+
+
+def _bad_request(error):
+    return JsonResponse({'error': str(error)}, status=400)
+
+
+@require_GET
+def property_list_api(request):
+    try:
+        limit = min(MAX_LIMIT, max(1, int(request.GET.get('limit', DEFAULT_LIMIT))))
+    except ValueError:
+        return _bad_request('limit must be an integer')
+    try:
+        fields = _requested_fields(request, 'fields', PROPERTY_FIELDS)
+        includes = _includes(request)
+        queryset = _base_queryset(request)
+        cursor = request.GET.get('cursor')
+        if cursor:
+            queryset = queryset.filter(pk__lt=_decode_cursor(cursor))
+    except (BadRequest, InvalidFilter) as error:
+        return _bad_request(error)
+
+    # One extra row tells us whether there is a next page without a COUNT(*)
+    rows = list(queryset.values(*_property_columns(fields))[:limit + 1])
+    has_next = len(rows) > limit
+    rows = rows[:limit]
+    items = _embed([_serialize_property(row, fields) for row in rows], rows, includes)
+
+    return JsonResponse({
+        'data': items,
+        'next_cursor': _encode_cursor(rows[-1]['id']) if has_next else None,
+    })
+
+
+@require_GET
+def property_detail_api(request, pk):
+    try:
+        fields = _requested_fields(request, 'fields', PROPERTY_FIELDS)
+        includes = _includes(request)
+    except BadRequest as error:
+        return _bad_request(error)
+
+    rows = list(Property.objects.filter(pk=pk, is_active=True).values(*_property_columns(fields)))
+    if not rows:
+        raise Http404('No property found')
+    item = _embed([_serialize_property(rows[0], fields)], rows, includes)[0]
+    return JsonResponse({'data': item})
+
+
+@require_GET
+def property_export_api(request):
+    """Stream every matching property as one JSON document per line."""
+    try:
+        fields = _requested_fields(request, 'fields', PROPERTY_FIELDS)
+        includes = _includes(request)
+        queryset = _base_queryset(request).values(*_property_columns(fields))
+    except (BadRequest, InvalidFilter) as error:
+        return _bad_request(error)
+
+    # The body is produced after ReplicaRoutingMiddleware has reset its routing,
+    # so bind the database chosen for this request now
+    alias = router.db_for_read(Property)
+    queryset = queryset.using(alias)
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+
+    def lines():
+        batch = []
+        for row in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            batch.append(row)
+            if len(batch) == EXPORT_CHUNK_SIZE:
+                yield from _render_batch(batch)
+                batch = []
+        if batch:
+            yield from _render_batch(batch)
+
+    def _render_batch(batch):
+        items = _embed([_serialize_property(row, fields) for row in batch], batch, includes, using=alias)
+        yield ''.join(encoder.encode(item) + '\n' for item in items)
+
+    response = StreamingHttpResponse(lines(), content_type='application/x-ndjson')
+    response['Content-Disposition'] = 'attachment; filename="properties.ndjson"'
+    return response
+
+
+def _feed_response(request, **filters):
+    try:
+        after = int(request.GET.get('after', 0))
+    except ValueError:
+        return _bad_request('after must be an integer')
+    try:
+        limit = min(CHANGEFEED_MAX_LIMIT, max(1, int(request.GET.get('limit', CHANGEFEED_DEFAULT_LIMIT))))
+    except ValueError:
+        return _bad_request('limit must be an integer')
+    try:
+        entries, has_more = read_changes(after=after, limit=limit, **filters)
+    except CursorExpired as error:
+        return JsonResponse({'error': str(error)}, status=410)
+
+    return JsonResponse({
+        'changes': entries,
+        'next_after': entries[-1]['seq'] if entries else after,
+        'has_more': has_more,
+    })
+
+
+@require_GET
+def change_feed(request):
+    """Listing, image, amenity and review changes after ``?after=<seq>``."""
+    models = PUBLIC_MODELS
+    requested = request.GET.get('models')
+    if requested:
+        models = tuple(name.strip() for name in requested.split(',') if name.strip())
+        unknown = [name for name in models if name not in PUBLIC_MODELS]
+        if unknown:
+            return _bad_request(f"Unknown model(s): {', '.join(unknown)}")
+    return _feed_response(request, models=models)
+
+
+@login_required
+@require_GET
+def message_change_feed(request):
+    """Changes to messages the current user sent or received."""
+    return _feed_response(request, models=('message',), user=request.user)
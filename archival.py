@@ -0,0 +1,121 @@
+"""
+Background cleanup that keeps the hot tables small.
+
+Soft-deleted properties lose their related rows a batch at a time, so no
+single statement holds locks for long. Old messages, finished appointments
+and settled payments move to the Archived* tables.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import (
+    Appointment, ArchivedAppointment, ArchivedMessage, ArchivedPayment, Message, Payment, Property,
+    PropertyAmenity, PropertyImage, PropertyVideo, Review, SavedSearchMatch, record_archived,
+)
+
+# Rows owned by a property, deleted before the property itself
+PURGE_RELATIONS = (
+    (PropertyImage, 'property'),
+    (PropertyVideo, 'property'),
+    (PropertyAmenity, 'property'),
+    (Appointment, 'property'),
+    (Review, 'property'),
+    (SavedSearchMatch, 'property'),
+)
+
+
+def _delete_in_batches(queryset, batch_size):
+    deleted = 0
+    while True:
+        ids = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        with transaction.atomic():
+            count, _ = queryset.model.objects.filter(pk__in=ids).delete()
+        deleted += count
+
+
+def purge_deleted_properties(grace=timedelta(hours=24), batch_size=500, limit=None):
+    """
+    Hard-delete properties soft-deleted longer than ``grace`` ago.
+
+    Properties with rental agreements are kept, since deleting them would
+    cascade into agreements and payments.
+    """
+    candidates = (
+        Property.all_objects
+        .filter(deleted_at__lt=timezone.now() - grace, rentalagreement__isnull=True)
+        .order_by('deleted_at')
+        .values_list('pk', flat=True)
+    )
+    if limit:
+        candidates = candidates[:limit]
+
+    purged = 0
+    for pk in list(candidates):
+        for model, fk in PURGE_RELATIONS:
+            _delete_in_batches(model.objects.filter(**{fk: pk}), batch_size)
+        Property.favorited_by.through.objects.filter(property_id=pk).delete()
+        Message.objects.filter(property_id=pk).update(property=None)
+        with transaction.atomic():
+            Property.all_objects.filter(pk=pk).delete()
+        purged += 1
+    return purged
+
+
+def _archive(queryset, archive_model, fields, batch_size, logged=False):
+    """
+    Copy ``queryset`` rows into ``archive_model`` and delete them, batch by
+    batch. ``logged`` models get a change-log ARCHIVE entry per row.
+    """
+    moved = 0
+    while True:
+        with transaction.atomic():
+            rows = list(queryset.order_by('pk').values(*fields)[:batch_size])
+            if not rows:
+                return moved
+            # Re-running after a crash between insert and delete is harmless
+            archive_model.objects.bulk_create([archive_model(**row) for row in rows], ignore_conflicts=True)
+            archived = queryset.model.objects.filter(pk__in=[row['id'] for row in rows])
+            # One DELETE statement, without the post_delete receivers: they would make
+            # Django collect rows one by one and log the archived rows as deleted
+            archived._raw_delete(archived.db)
+            if logged:
+                record_archived(queryset.model, rows)
+        moved += len(rows)
+
+
+def archive_messages(older_than, batch_size=1000):
+    cutoff = timezone.now() - older_than
+    fields = ['id', 'sender_id', 'recipient_id', 'property_id', 'subject', 'body', 'is_read', 'sent_at']
+    return _archive(
+        Message.objects.filter(sent_at__lt=cutoff, is_read=True), ArchivedMessage, fields, batch_size, logged=True,
+    )
+
+
+def archive_appointments(older_than, batch_size=1000):
+    cutoff = timezone.now() - older_than
+    fields = [
+        'id', 'property_id', 'requester_id', 'landlord_id', 'requested_date', 'message', 'status',
+        'created_at', 'updated_at',
+    ]
+    finished = Appointment.objects.filter(
+        status__in=['completed', 'declined', 'canceled'], requested_date__lt=cutoff,
+    )
+    return _archive(finished, ArchivedAppointment, fields, batch_size)
+
+
+def archive_payments(older_than, batch_size=1000):
+    cutoff = timezone.now() - older_than
+    fields = [
+        'id', 'rental_agreement_id', 'amount', 'payment_method', 'status', 'transaction_id',
+        'payment_date', 'due_date', 'receipt_url', 'created_at',
+    ]
+    settled = Payment.objects.filter(
+        status__in=['completed', 'failed', 'refunded'],
+        payment_date__lt=cutoff.date(),
+        rental_agreement__status__in=['completed', 'terminated'],
+    )
+    return _archive(settled, ArchivedPayment, fields, batch_size)
@@ -14,3 +14,7 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tenant_network.settings')
 
 application = get_asgi_application()
+
+from tenant_network.templating import precompile_templates
+
+precompile_templates()
@@ -0,0 +1,116 @@
+"""
+Build-free asset bundling.
+
+``build_bundles`` concatenates the static files listed in ASSET_BUNDLES,
+rewrites relative ``url()`` references in CSS, names each bundle after a
+hash of its content and writes gzip (and brotli, when installed)
+variants next to it. The ``{% bundle %}`` template tag reads the
+resulting manifest, or falls back to the individual files when bundling
+is disabled or has not been built yet.
+"""
+import gzip
+import hashlib
+import json
+import os
+import posixpath
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+BUNDLE_DIR = 'bundles'
+MANIFEST_NAME = 'manifest.json'
+CSS_URL_RE = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+SOURCE_MAP_RE = re.compile(r'^\s*(//[#@] sourceMappingURL=.*|/\*[#@] sourceMappingURL=.*\*/)\s*$', re.MULTILINE)
+
+
+def manifest_path():
+    return os.path.join(settings.STATIC_ROOT, BUNDLE_DIR, MANIFEST_NAME)
+
+
+@lru_cache(maxsize=1)
+def load_manifest():
+    try:
+        with open(manifest_path()) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def bundle_paths(name):
+    """Static paths a page should load for bundle ``name``."""
+    bundles = getattr(settings, 'ASSET_BUNDLES', {})
+    if name not in bundles:
+        raise ImproperlyConfigured(f"Unknown asset bundle {name!r}.")
+    if getattr(settings, 'ASSET_BUNDLES_ENABLED', not settings.DEBUG):
+        built = load_manifest().get(name)
+        if built:
+            return [built]
+    return list(bundles[name])
+
+
+def _rewrite_css_urls(css, source_path):
+    source_dir = posixpath.dirname(source_path)
+
+    def rewrite(match):
+        quote, url = match.groups()
+        if url.startswith(('data:', 'http:', 'https:', '//', '/', '#')):
+            return match.group(0)
+        path, suffix = re.match(r'([^?#]*)(.*)', url).groups()
+        target = posixpath.normpath(posixpath.join(source_dir, path))
+        return f'url({quote}{posixpath.relpath(target, BUNDLE_DIR)}{suffix}{quote})'
+
+    return CSS_URL_RE.sub(rewrite, css)
+
+
+def _read_source(path):
+    absolute = finders.find(path)
+    if not absolute:
+        raise ImproperlyConfigured(f"Static file {path!r} listed in ASSET_BUNDLES was not found.")
+    with open(absolute, encoding='utf-8') as fh:
+        content = SOURCE_MAP_RE.sub('', fh.read())
+    if path.endswith('.css'):
+        content = _rewrite_css_urls(content, path)
+    return content
+
+
+def _write(path, data):
+    with open(path, 'wb') as fh:
+        fh.write(data)
+
+
+def build_bundles(output_root=None):
+    """Write every bundle and its compressed variants; return the manifest."""
+    output_root = output_root or settings.STATIC_ROOT
+    if not output_root:
+        raise ImproperlyConfigured('STATIC_ROOT must be set to build asset bundles.')
+    bundle_root = os.path.join(output_root, BUNDLE_DIR)
+    os.makedirs(bundle_root, exist_ok=True)
+
+    manifest = {}
+    for name, sources in getattr(settings, 'ASSET_BUNDLES', {}).items():
+        stem, ext = os.path.splitext(name)
+        separator = '\n' if ext == '.css' else '\n;\n'
+        content = separator.join(_read_source(path) for path in sources).encode('utf-8')
+        digest = hashlib.sha256(content).hexdigest()[:12]
+        relative = posixpath.join(BUNDLE_DIR, f'{stem}.{digest}{ext}')
+        target = os.path.join(output_root, relative)
+
+        _write(target, content)
+        # mtime=0 keeps the .gz byte-identical between builds
+        _write(f'{target}.gz', gzip.compress(content, compresslevel=9, mtime=0))
+        if brotli is not None:
+            _write(f'{target}.br', brotli.compress(content, quality=11))
+        manifest[name] = relative
+
+    with open(os.path.join(bundle_root, MANIFEST_NAME), 'w') as fh:
+        json.dump(manifest, fh, indent=2, sort_keys=True)
+    load_manifest.cache_clear()
+    return manifest
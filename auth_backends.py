@@ -0,0 +1,136 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Q
+from django.db.models.fields.files import FieldFile
+from django.db.models.functions import Lower
+
+from . import auth_cache
+from .password_pool import averify_password, hash_password, needs_rehash, verify_password
+
+UserModel = get_user_model()
+
+
+def matching_users(field, value):
+    """
+    Users whose ``field`` equals ``value`` ignoring case. Compares
+    ``LOWER(field)`` so the functional unique indexes on User serve it;
+    ``__iexact`` compiles to UPPER() on PostgreSQL and would scan.
+    """
+    return UserModel._default_manager.alias(**{f'{field}_ci': Lower(field)}).filter(**{f'{field}_ci': value.lower()})
+
+
+def _login_candidates(login):
+    login = login.strip().lower()
+    users = UserModel._default_manager.alias(username_ci=Lower('username'), email_ci=Lower('email'))
+    return login, users.filter(Q(username_ci=login) | Q(email_ci=login))[:2]
+
+
+def _pick(login, candidates):
+    # A username match wins over someone else's email address
+    for user in candidates:
+        if user.username.lower() == login:
+            return user
+    return candidates[0] if candidates else None
+
+
+def find_user(login):
+    """The user with ``login`` as their username or email, ignoring case, or None."""
+    login, candidates = _login_candidates(login)
+    return _pick(login, list(candidates))
+
+
+async def afind_user(login):
+    login, candidates = _login_candidates(login)
+    return _pick(login, [user async for user in candidates])
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend that serves ``request.user`` and permission sets from the
+    cache. Entries are dropped when the user is saved or their groups or
+    permissions change (see the receivers in models.py). Nothing is cached
+    when the cache is per process (see auth_cache.is_shared).
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        """
+        Accept a username or an email address, and check the password on the
+        bounded hashing pool. Raises HasherBusy when the pool is saturated.
+        """
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        user = find_user(username)
+        if user is None:
+            # Hash anyway so the response time doesn't reveal unknown accounts
+            hash_password(password)
+            return None
+        if verify_password(password, user.password) and self.user_can_authenticate(user):
+            if needs_rehash(user.password):
+                user.password = hash_password(password)
+                user.save(update_fields=['password'])
+            return user
+        return None
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        user = await afind_user(username)
+        if user is None:
+            await asyncio.to_thread(hash_password, password)
+            return None
+        if await averify_password(password, user.password) and self.user_can_authenticate(user):
+            if needs_rehash(user.password):
+                user.password = await asyncio.to_thread(hash_password, password)
+                await user.asave(update_fields=['password'])
+            return user
+        return None
+
+    def get_user(self, user_id):
+        if not auth_cache.is_shared():
+            return super().get_user(user_id)
+        key = auth_cache.user_key(user_id)
+        snapshot = cache.get(key)
+        if snapshot is not None:
+            user = UserModel(**snapshot)
+            user._state.adding = False
+            user._state.db = DEFAULT_DB_ALIAS
+            return user if self.user_can_authenticate(user) else None
+
+        user = super().get_user(user_id)
+        if user is not None:
+            cache.set(key, self._snapshot(user), auth_cache.timeout())
+        return user
+
+    async def aget_user(self, user_id):
+        # ModelBackend's async version would skip the cache
+        return await sync_to_async(self.get_user)(user_id)
+
+    def _snapshot(self, user):
+        snapshot = {}
+        for field in user._meta.concrete_fields:
+            value = getattr(user, field.attname)
+            snapshot[field.attname] = value.name if isinstance(value, FieldFile) else value
+        return snapshot
+
+    def _get_permissions(self, user_obj, obj, from_name):
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None or not auth_cache.is_shared():
+            return super()._get_permissions(user_obj, obj, from_name)
+
+        perm_cache_name = f'_{from_name}_perm_cache'
+        if not hasattr(user_obj, perm_cache_name):
+            key = auth_cache.permissions_key(user_obj.pk, from_name)
+            perms = cache.get(key)
+            if perms is None:
+                perms = super()._get_permissions(user_obj, obj, from_name)
+                cache.set(key, perms, auth_cache.timeout())
+            setattr(user_obj, perm_cache_name, perms)
+        return getattr(user_obj, perm_cache_name)
@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.core.cache import cache
+
+USER_KEY = 'auth:user:{}'
+PERMS_KEY = 'auth:perms:{}:{}:{}'
+PERMS_VERSION_KEY = 'auth:perms:version'
+PERMISSION_SOURCES = ('user', 'group')
+# Each worker process gets its own copy of these, so invalidation can't reach the others
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def is_shared():
+    """Whether the default cache is one store seen by every worker process."""
+    return settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES
+
+
+def timeout():
+    return getattr(settings, 'AUTH_CACHE_TIMEOUT', 300)
+
+
+def user_key(user_id):
+    return USER_KEY.format(user_id)
+
+
+def permissions_version():
+    return cache.get_or_set(PERMS_VERSION_KEY, 1, None)
+
+
+def permissions_key(user_id, source):
+    return PERMS_KEY.format(permissions_version(), source, user_id)
+
+
+def invalidate_user(user_id):
+    """Forget the cached snapshot and permission sets of one user."""
+    version = permissions_version()
+    cache.delete_many(
+        [user_key(user_id)]
+        + [PERMS_KEY.format(version, source, user_id) for source in PERMISSION_SOURCES]
+    )
+
+
+def invalidate_all_permissions():
+    """Orphan every cached permission set, e.g. after a group's permissions change."""
+    try:
+        cache.incr(PERMS_VERSION_KEY)
+    except ValueError:
+        cache.set(PERMS_VERSION_KEY, 2, None)
@@ -0,0 +1,261 @@
+import asyncio
+import math
+import random
+import statistics
+import time
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import (
+    Amenity, Message, Property, PropertyAmenity, PropertyImage, RentalAgreement, Review, User,
+)
+
+CITIES = ['Harare', 'Bulawayo', 'Mutare', 'Gweru', 'Kwekwe', 'Masvingo', 'Chinhoyi', 'Marondera']
+AMENITIES = ['WiFi', 'Parking', 'Pool', 'Gym', 'Air Conditioning', 'Borehole', 'Solar Backup', 'Garden']
+
+
+def seed_benchmark_data(scale=1, seed=0):
+    """
+    Create a small, deterministic data set sized by ``scale``.
+
+    One unit of scale is 5 landlords, 20 tenants and 50 properties with
+    images, amenities, messages, reviews and draft agreements.
+    """
+    rng = random.Random(seed)
+    password = make_password('benchmark')
+    now = timezone.now()
+
+    landlords = User.objects.bulk_create([
+        User(username=f'bench_landlord_{i}', email=f'landlord{i}@bench.test',
+             user_type=User.LANDLORD, password=password, is_verified=True)
+        for i in range(5 * scale)
+    ])
+    tenants = User.objects.bulk_create([
+        User(username=f'bench_tenant_{i}', email=f'tenant{i}@bench.test',
+             user_type=User.TENANT, password=password)
+        for i in range(20 * scale)
+    ])
+    amenities = [Amenity.objects.get_or_create(name=name)[0] for name in AMENITIES]
+
+    properties = []
+    for i in range(50 * scale):
+        frequency = rng.choice(['month', 'month', 'month', 'week', 'day'])
+        prop = Property(
+            landlord=rng.choice(landlords),
+            title=f'Benchmark listing {i}',
+            slug=f'benchmark-listing-{seed}-{i}',
+            description='Spacious unit close to shops and transport.',
+            property_type=rng.choice(Property.PROPERTY_CATEGORIES)[0],
+            price=Decimal(rng.randint(20, 2000)),
+            rental_frequency=frequency,
+            bedrooms=rng.randint(1, 5),
+            bathrooms=rng.randint(1, 3),
+            sqft=rng.randint(300, 4000),
+            address=f'{i} Benchmark Road',
+            city=rng.choice(CITIES),
+            state='Zimbabwe',
+            zip_code='00263',
+            is_verified=rng.random() < 0.8,
+        )
+        # bulk_create skips save(), so normalize here
+        prop.monthly_price = prop.compute_monthly_price()
+        properties.append(prop)
+    properties = Property.objects.bulk_create(properties, batch_size=500)
+
+    PropertyImage.objects.bulk_create([
+        PropertyImage(property=prop, image=f'property_images/bench/{prop.pk}_{n}.jpg', is_main=(n == 0))
+        for prop in properties
+        for n in range(rng.randint(1, 4))
+    ], batch_size=1000)
+    Property.sync_main_images(Property.all_objects.filter(pk__in=[prop.pk for prop in properties]))
+    PropertyAmenity.objects.bulk_create([
+        PropertyAmenity(property=prop, amenity=amenity)
+        for prop in properties
+        for amenity in rng.sample(amenities, rng.randint(1, 4))
+    ], batch_size=1000)
+
+    Message.objects.bulk_create([
+        Message(sender=tenant, recipient=prop.landlord, property=prop,
+                subject='Is this still available?', body='I would like to view it this week.')
+        for tenant in tenants
+        for prop in rng.sample(properties, min(3, len(properties)))
+    ], batch_size=1000)
+    Review.objects.bulk_create([
+        Review(reviewer=tenant, reviewee=prop.landlord, property=prop, rating=rng.randint(1, 5),
+               title='Stayed here', content='Good landlord, quick to fix issues.', is_approved=True)
+        for tenant in tenants
+        for prop in rng.sample(properties, min(2, len(properties)))
+    ], batch_size=1000)
+    RentalAgreement.objects.bulk_create([
+        RentalAgreement(property=prop, landlord=prop.landlord, tenant=tenant,
+                        start_date=now.date(), end_date=(now + timedelta(days=365)).date(),
+                        monthly_rent=prop.monthly_price, security_deposit=prop.monthly_price,
+                        terms='Standard twelve month lease.', status='pending')
+        for tenant in tenants
+        for prop in [rng.choice(properties)]
+    ], batch_size=1000)
+
+    return {'landlords': landlords, 'tenants': tenants, 'properties': properties}
+
+
+class JourneyRunner:
+    """Replay user journeys through the test client and time every request."""
+
+    def __init__(self, seed=0):
+        self.rng = random.Random(seed)
+        self.samples = defaultdict(list)
+        self.queries = defaultdict(list)
+
+    def request(self, client, label, method, url, data=None):
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            response = getattr(client, method)(url, data or {})
+            elapsed = time.perf_counter() - start
+        if response.status_code >= 400:
+            raise RuntimeError(f'{label} returned {response.status_code} for {url}')
+        self.samples[label].append(elapsed)
+        self.queries[label].append(len(ctx.captured_queries))
+        return response
+
+    def run(self, iterations):
+        tenants = list(User.objects.filter(user_type=User.TENANT, username__startswith='bench_'))
+        properties = list(Property.objects.filter(is_active=True).select_related('landlord'))
+        agreements = list(RentalAgreement.objects.select_related('landlord', 'tenant'))
+        anonymous = Client()
+
+        started = time.perf_counter()
+        for i in range(iterations):
+            tenant = self.rng.choice(tenants)
+            prop = self.rng.choice(properties)
+            client = Client()
+            client.force_login(tenant)
+
+            self.request(anonymous, 'home', 'get', reverse('home'))
+            self.request(anonymous, 'property_list', 'get', reverse('property_list'), {
+                'location': prop.city,
+                'bedrooms': self.rng.choice(['', '1', '2', '3']),
+            })
+            self.request(anonymous, 'property_detail', 'get', reverse('property_detail', args=[prop.pk]))
+            self.request(client, 'property_detail', 'get', reverse('property_detail', args=[prop.pk]))
+            self.request(client, 'toggle_favorite', 'post', reverse('toggle_favorite', args=[prop.pk]))
+            self.request(client, 'message_create', 'post', reverse('message_create'), {
+                'recipient': prop.landlord.pk,
+                'property': prop.pk,
+                'subject': 'Viewing request',
+                'body': 'Could I see the place on Saturday?',
+            })
+            self.request(client, 'appointment_create', 'post', reverse('appointment_create'), {
+                'property': prop.pk,
+                'landlord': prop.landlord.pk,
+                'requested_date': (timezone.now() + timedelta(days=3)).strftime('%Y-%m-%dT%H:%M'),
+                'message': 'Saturday morning works for me.',
+            })
+            self.request(client, 'dashboard', 'get', reverse('dashboard'))
+
+            if agreements:
+                agreement = agreements[i % len(agreements)]
+                signer = Client()
+                signer.force_login(agreement.tenant if i % 2 else agreement.landlord)
+                self.request(signer, 'sign_agreement', 'post', reverse('sign_agreement', args=[agreement.pk]))
+                self.request(signer, 'rental_agreement_detail', 'get',
+                             reverse('rental_agreement_detail', args=[agreement.pk]))
+        return time.perf_counter() - started
+
+    def report(self, wall_time):
+        rows = {}
+        for label, timings in sorted(self.samples.items()):
+            ordered = sorted(timings)
+            queries = self.queries[label]
+            rows[label] = {
+                'requests': len(ordered),
+                'p50_ms': round(percentile(ordered, 50) * 1000, 2),
+                'p99_ms': round(percentile(ordered, 99) * 1000, 2),
+                'throughput_rps': round(len(ordered) / sum(ordered), 1) if sum(ordered) else 0.0,
+                'queries_mean': round(statistics.mean(queries), 1),
+                'queries_max': max(queries),
+            }
+        total = sum(row['requests'] for row in rows.values())
+        return {
+            'views': rows,
+            'total_requests': total,
+            'wall_time_s': round(wall_time, 2),
+            'overall_rps': round(total / wall_time, 1) if wall_time else 0.0,
+        }
+
+
+def percentile(ordered, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def query_regressions(report, baseline, tolerance=0):
+    """Return ``(view, baseline, actual)`` for views exceeding their query budget."""
+    regressions = []
+    for label, budget in sorted(baseline.items()):
+        row = report['views'].get(label)
+        if row and row['queries_max'] > budget + tolerance:
+            regressions.append((label, budget, row['queries_max']))
+    return regressions
+
+
+
+async def _load_worker(client, method, path, deadline, samples, errors):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, path)
+            ok = response.status_code < 400
+        except Exception:
+            ok = False
+        if ok:
+            samples.append(time.perf_counter() - start)
+        else:
+            errors.append(1)
+
+
+async def measure_capacity(base_url, path, method='GET', concurrency=10, duration=10.0, cookies=None, headers=None):
+    """
+    Keep ``concurrency`` requests in flight against ``base_url + path`` for
+    ``duration`` seconds and report throughput, latency and error counts.
+    """
+    import httpx
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    samples, errors = [], []
+    async with httpx.AsyncClient(
+        base_url=base_url, cookies=cookies, headers=headers, limits=limits, timeout=30.0,
+    ) as client:
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*(
+            _load_worker(client, method, path, deadline, samples, errors) for _ in range(concurrency)
+        ))
+
+    ordered = sorted(samples)
+    total = len(ordered) + len(errors)
+    return {
+        'concurrency': concurrency,
+        'requests': len(ordered),
+        'errors': len(errors),
+        'error_rate': round(len(errors) / total, 4) if total else 0.0,
+        'rps': round(len(ordered) / duration, 1),
+        'p50_ms': round(percentile(ordered, 50) * 1000, 2),
+        'p99_ms': round(percentile(ordered, 99) * 1000, 2),
+    }
+
+
+def sustainable_capacity(rows, p99_budget_ms, max_error_rate=0.01):
+    """Highest throughput among runs that stayed within the latency and error budget."""
+    healthy = [row for row in rows if row['p99_ms'] <= p99_budget_ms and row['error_rate'] <= max_error_rate]
+    return max(healthy, key=lambda row: row['rps'], default=None)
+
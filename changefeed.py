@@ -0,0 +1,47 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Min, Q
+from django.utils import timezone
+
+from .models import ChangeLogEntry
+
+PUBLIC_MODELS = ('property', 'propertyimage', 'propertyamenity', 'review')
+
+
+class CursorExpired(Exception):
+    """The requested cursor is older than the retained change log."""
+
+
+def read_changes(after=0, limit=500, models=PUBLIC_MODELS, user=None):
+    """
+    Return up to ``limit`` entries with ``seq > after`` plus whether more follow.
+
+    Entries younger than CHANGEFEED_SETTLE_SECONDS are held back so a row
+    whose sequence number was allocated earlier but committed later is
+    not skipped by a consumer that has already moved past it.
+    """
+    oldest = ChangeLogEntry.objects.aggregate(oldest=Min('seq'))['oldest']
+    if after and oldest is not None and after < oldest - 1:
+        raise CursorExpired(f'Changes before {oldest} have been pruned; resync from a full export.')
+
+    settle = getattr(settings, 'CHANGEFEED_SETTLE_SECONDS', 2)
+    entries = ChangeLogEntry.objects.filter(
+        seq__gt=after,
+        model__in=models,
+        created_at__lte=timezone.now() - timedelta(seconds=settle),
+    )
+    if user is not None:
+        entries = entries.filter(Q(sender_id=user.pk) | Q(recipient_id=user.pk))
+
+    rows = list(entries.order_by('seq').values('seq', 'model', 'object_id', 'action', 'data', 'created_at')[:limit + 1])
+    return rows[:limit], len(rows) > limit
+
+
+def prune_changes(days):
+    """Delete entries older than ``days``; consumers behind that point must resync."""
+    cutoff = timezone.now() - timedelta(days=days)
+    latest = ChangeLogEntry.objects.order_by('-seq').values_list('seq', flat=True).first()
+    # Keep the newest entry so read_changes() can still tell a stale cursor apart
+    deleted, _ = ChangeLogEntry.objects.filter(created_at__lt=cutoff).exclude(seq=latest).delete()
+    return deleted
@@ -1,10 +1,17 @@
+from functools import lru_cache
+
 from django.conf import settings
 
-def theme_settings(request):
+@lru_cache(maxsize=None)
+def _theme_context():
     return {
         'theme': getattr(settings, 'THEME_SETTINGS', {}),
-        'hero_images': [
+        'hero_images': (
             'images/default-profile.png',
-            'images/house3.jpg'
-        ]
-    }
\ No newline at end of file
+            'images/house3.jpg',
+        ),
+    }
+
+def theme_settings(request):
+    # Built once per process; templates only read it
+    return _theme_context()
\ No newline at end of file
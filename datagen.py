@@ -0,0 +1,376 @@
+"""
+Deterministic synthetic data for scale testing.
+
+Rows are produced in independent chunks whose contents depend only on the
+seed and the chunk number, so chunks can be generated and loaded by any
+number of worker processes and still give the same database. Users,
+properties and agreements get explicit primary keys so that related rows
+can point at them without looking anything up.
+"""
+import csv
+import io
+import random
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import (
+    Amenity, Appointment, Message, Payment, Property, PropertyAmenity, PropertyImage,
+    RentalAgreement, Review, User,
+)
+
+CITIES = [
+    ('Harare', 'Harare'), ('Bulawayo', 'Bulawayo'), ('Chitungwiza', 'Harare'),
+    ('Mutare', 'Manicaland'), ('Gweru', 'Midlands'), ('Kwekwe', 'Midlands'),
+    ('Masvingo', 'Masvingo'), ('Chinhoyi', 'Mashonaland West'), ('Marondera', 'Mashonaland East'),
+    ('Victoria Falls', 'Matabeleland North'),
+]
+# Bigger cities get proportionally more listings
+CITY_WEIGHTS = [30, 18, 8, 8, 7, 5, 5, 4, 4, 3]
+AMENITIES = [
+    ('WiFi', 'fa-wifi'), ('Parking', 'fa-car'), ('Swimming Pool', 'fa-swimming-pool'),
+    ('Gym', 'fa-dumbbell'), ('Air Conditioning', 'fa-snowflake'), ('Borehole', 'fa-tint'),
+    ('Solar Backup', 'fa-solar-panel'), ('Garden', 'fa-seedling'), ('Security', 'fa-shield-alt'),
+    ('Furnished', 'fa-couch'),
+]
+BASE_MONTHLY_RENT = {
+    'studio': 250, 'apartment': 400, 'condo': 550, 'townhouse': 700, 'house': 800, 'villa': 1800,
+}
+FIRST_NAMES = ['Tendai', 'Rudo', 'Tatenda', 'Nyasha', 'Farai', 'Chipo', 'Kudzai', 'Tafadzwa', 'Blessing', 'Takudzwa']
+LAST_NAMES = ['Moyo', 'Ncube', 'Sibanda', 'Dube', 'Chikomo', 'Mutasa', 'Banda', 'Nyathi', 'Marufu', 'Zhou']
+APPOINTMENT_STATUSES = ['completed', 'canceled', 'declined', 'confirmed', 'pending']
+APPOINTMENT_WEIGHTS = [50, 15, 10, 10, 15]
+MAX_AGREEMENTS_PER_TENANT = 2
+
+_SALTS = {'user': 1, 'property': 2, 'listing': 3, 'tenant': 4}
+
+
+def _rng(seed, kind, number):
+    return random.Random((seed << 40) ^ (_SALTS[kind] << 32) ^ number)
+
+
+class Plan:
+    """Sizes, seed and primary-key offsets shared by every worker."""
+
+    def __init__(self, landlords, tenants, properties, seed=0, chunk_size=2000, anchor=None):
+        self.landlords = landlords
+        self.tenants = tenants
+        self.properties = properties
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.anchor = anchor or timezone.now().replace(minute=0, second=0, microsecond=0)
+        self.password = None
+        self.user_base = 0
+        self.property_base = 0
+        self.agreement_base = 0
+        self.amenity_ids = []
+
+    def prepare(self, password_hash):
+        """Resolve id offsets and the amenity catalog against the current database."""
+        self.password = password_hash
+        self.user_base = User.objects.aggregate(m=Max('pk'))['m'] or 0
+        self.property_base = Property.objects.aggregate(m=Max('pk'))['m'] or 0
+        self.agreement_base = RentalAgreement.objects.aggregate(m=Max('pk'))['m'] or 0
+        self.amenity_ids = [
+            Amenity.objects.get_or_create(name=name, defaults={'icon': icon})[0].pk
+            for name, icon in AMENITIES
+        ]
+
+    @property
+    def total_users(self):
+        return self.landlords + self.tenants
+
+    def chunks(self, total):
+        return [(start, min(start + self.chunk_size, total)) for start in range(0, total, self.chunk_size)]
+
+    def landlord_id(self, index):
+        return self.user_base + 1 + index
+
+    def tenant_id(self, index):
+        return self.user_base + 1 + self.landlords + index
+
+    def property_id(self, index):
+        return self.property_base + 1 + index
+
+    def property_profile(self, index):
+        """Attributes of listing ``index`` that other tables need to stay consistent."""
+        rng = _rng(self.seed, 'property', index)
+        property_type = rng.choice(Property.PROPERTY_CATEGORIES)[0]
+        city, state = rng.choices(CITIES, weights=CITY_WEIGHTS)[0]
+        bedrooms = 1 if property_type == 'studio' else rng.randint(1, 6)
+        monthly = BASE_MONTHLY_RENT[property_type] * (1 + 0.35 * (bedrooms - 1)) * rng.uniform(0.7, 1.4)
+        if city in ('Harare', 'Victoria Falls'):
+            monthly *= 1.25
+        frequency = rng.choices(['month', 'week', 'day'], weights=[80, 12, 8])[0]
+        factor = Property.MONTHLY_PRICE_FACTORS[frequency]
+        price = (Decimal(f'{monthly:.2f}') / factor).quantize(Decimal('0.01'))
+        return {
+            'landlord_id': self.landlord_id(rng.randrange(self.landlords)),
+            'property_type': property_type,
+            'city': city,
+            'state': state,
+            'bedrooms': bedrooms,
+            'price': price,
+            'rental_frequency': frequency,
+        }
+
+
+def generate_users(plan, start, stop):
+    rng = _rng(plan.seed, 'user', start)
+    users = []
+    for index in range(start, stop):
+        is_landlord = index < plan.landlords
+        number = index if is_landlord else index - plan.landlords
+        kind = User.LANDLORD if is_landlord else User.TENANT
+        joined = plan.anchor - timedelta(days=rng.randint(30, 1500), minutes=rng.randint(0, 1439))
+        users.append(User(
+            id=plan.user_base + 1 + index,
+            username=f'gen{plan.seed}_{kind}_{number}',
+            email=f'gen{plan.seed}.{kind}.{number}@example.com',
+            first_name=rng.choice(FIRST_NAMES),
+            last_name=rng.choice(LAST_NAMES),
+            password=plan.password,
+            user_type=kind,
+            phone_number=f'+26377{rng.randint(1000000, 9999999)}',
+            is_verified=rng.random() < (0.7 if is_landlord else 0.4),
+            date_joined=joined,
+            date_updated=joined,
+        ))
+    return {User: users}
+
+
+def generate_listings(plan, start, stop):
+    rng = _rng(plan.seed, 'listing', start)
+    properties, images, amenities = [], [], []
+    for index in range(start, stop):
+        profile = plan.property_profile(index)
+        property_id = plan.property_id(index)
+        created = plan.anchor - timedelta(days=rng.randint(1, 900), minutes=rng.randint(0, 1439))
+        prop = Property(
+            id=property_id,
+            slug=f'gen-{plan.seed}-{index}',
+            title=f"{profile['bedrooms']} bed {profile['property_type']} in {profile['city']}",
+            description='Well kept unit close to schools, shops and public transport.',
+            bathrooms=max(1, profile['bedrooms'] - rng.randint(0, 2)),
+            sqft=300 * profile['bedrooms'] + rng.randint(0, 900),
+            address=f'{rng.randint(1, 999)} {rng.choice(LAST_NAMES)} Street',
+            zip_code=f'{rng.randint(0, 99999):05d}',
+            is_verified=rng.random() < 0.75,
+            is_active=rng.random() < 0.92,
+            created_at=created,
+            updated_at=created + timedelta(days=rng.randint(0, 30)),
+            **profile,
+        )
+        prop.monthly_price = prop.compute_monthly_price()
+        properties.append(prop)
+
+        for position in range(rng.randint(1, 6)):
+            images.append(PropertyImage(
+                property_id=property_id,
+                image=f'property_images/property_{property_id}/photo_{position}.jpg',
+                is_main=position == 0,
+                uploaded_at=created + timedelta(minutes=position),
+            ))
+        for amenity_id in rng.sample(plan.amenity_ids, rng.randint(1, min(6, len(plan.amenity_ids)))):
+            amenities.append(PropertyAmenity(property_id=property_id, amenity_id=amenity_id))
+    return {Property: properties, PropertyImage: images, PropertyAmenity: amenities}
+
+
+def generate_activity(plan, start, stop):
+    """
+    Conversations, viewings, agreements, payments, reviews and favorites.
+
+    Each tenant messages a few landlords; some conversations lead to a
+    viewing, some viewings to an agreement, agreements produce monthly
+    payments and only tenants with an agreement review the property.
+    """
+    rng = _rng(plan.seed, 'tenant', start)
+    rows = {Message: [], Appointment: [], RentalAgreement: [], Payment: [], Review: []}
+    favorites = []
+    Favorite = Property.favorited_by.through
+    today = plan.anchor.date()
+
+    for tenant_index in range(start, stop):
+        tenant_id = plan.tenant_id(tenant_index)
+        agreements = 0
+        conversations = rng.sample(range(plan.properties), min(plan.properties, rng.randint(0, 6)))
+        for property_index in conversations:
+            profile = plan.property_profile(property_index)
+            property_id = plan.property_id(property_index)
+            landlord_id = profile['landlord_id']
+            sent_at = plan.anchor - timedelta(days=rng.randint(1, 700), minutes=rng.randint(0, 1439))
+            subject = f"Enquiry about your {profile['property_type']} in {profile['city']}"
+
+            length = rng.randint(1, 8)
+            for position in range(length):
+                from_tenant = position % 2 == 0
+                rows[Message].append(Message(
+                    sender_id=tenant_id if from_tenant else landlord_id,
+                    recipient_id=landlord_id if from_tenant else tenant_id,
+                    property_id=property_id,
+                    subject=subject if position == 0 else f'Re: {subject}',
+                    body='Is the property still available? When can I view it?' if from_tenant
+                    else 'Yes it is. Let me know a time that suits you.',
+                    is_read=position < length - 1 or rng.random() < 0.5,
+                    sent_at=sent_at,
+                ))
+                sent_at += timedelta(minutes=rng.randint(5, 2880))
+
+            if rng.random() >= 0.4:
+                continue
+            requested = sent_at + timedelta(days=rng.randint(1, 14))
+            status = 'pending' if requested > plan.anchor else rng.choices(
+                APPOINTMENT_STATUSES, weights=APPOINTMENT_WEIGHTS)[0]
+            rows[Appointment].append(Appointment(
+                property_id=property_id,
+                requester_id=tenant_id,
+                landlord_id=landlord_id,
+                requested_date=requested,
+                message='I would like to view the property.',
+                status=status,
+                created_at=sent_at,
+                updated_at=min(requested, plan.anchor),
+            ))
+
+            if status != 'completed' or agreements >= MAX_AGREEMENTS_PER_TENANT or rng.random() >= 0.35:
+                continue
+            agreement_id = plan.agreement_base + 1 + tenant_index * MAX_AGREEMENTS_PER_TENANT + agreements
+            agreements += 1
+            start_date = requested.date() + timedelta(days=rng.randint(7, 30))
+            end_date = start_date + timedelta(days=365)
+            signed_at = timezone.make_aware(datetime.combine(start_date - timedelta(days=3), time(12)))
+            factor = Property.MONTHLY_PRICE_FACTORS[profile['rental_frequency']]
+            rent = (profile['price'] * factor).quantize(Decimal('0.01'))
+            rows[RentalAgreement].append(RentalAgreement(
+                id=agreement_id,
+                property_id=property_id,
+                landlord_id=landlord_id,
+                tenant_id=tenant_id,
+                start_date=start_date,
+                end_date=end_date,
+                monthly_rent=rent,
+                security_deposit=rent,
+                terms='Twelve month lease. Rent due on the first day of each month.',
+                status='active' if end_date > today else 'completed',
+                created_at=signed_at - timedelta(days=2),
+                signed_by_landlord=True,
+                signed_by_tenant=True,
+                signed_at=signed_at,
+            ))
+
+            reliability = rng.random()
+            due = start_date
+            while due <= min(end_date, today):
+                late_days = 0 if rng.random() < reliability else rng.randint(1, 45)
+                paid_on = due + timedelta(days=late_days)
+                payment_status = 'completed' if paid_on <= today else 'pending'
+                if payment_status == 'completed' and rng.random() < 0.03:
+                    payment_status = 'failed'
+                rows[Payment].append(Payment(
+                    rental_agreement_id=agreement_id,
+                    amount=rent,
+                    payment_method=rng.choices(['stripe', 'bank_transfer', 'paypal'], weights=[60, 30, 10])[0],
+                    status=payment_status,
+                    transaction_id=f'gen_{agreement_id}_{due:%Y%m}' if payment_status == 'completed' else '',
+                    payment_date=min(paid_on, today),
+                    due_date=due,
+                    created_at=signed_at,
+                ))
+                due = (due.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+            if rng.random() < 0.6 and start_date + timedelta(days=30) <= today:
+                review_day = start_date + timedelta(days=rng.randint(30, 300))
+                reviewed = timezone.make_aware(datetime.combine(review_day, time(18)))
+                rating = rng.choices([1, 2, 3, 4, 5], weights=[4, 6, 15, 35, 40])[0]
+                rows[Review].append(Review(
+                    reviewer_id=tenant_id,
+                    reviewee_id=landlord_id,
+                    property_id=property_id,
+                    rating=rating,
+                    title='Great place to stay' if rating >= 4 else 'Could be better',
+                    content='Landlord was responsive and the property matched the listing.' if rating >= 4
+                    else 'Repairs took a long time to get done.',
+                    is_approved=rng.random() < 0.8,
+                    created_at=min(reviewed, plan.anchor),
+                    updated_at=min(reviewed, plan.anchor),
+                ))
+
+        for property_index in rng.sample(range(plan.properties), min(plan.properties, rng.randint(0, 5))):
+            favorites.append(Favorite(property_id=plan.property_id(property_index), user_id=tenant_id))
+
+    rows[Favorite] = favorites
+    return rows
+
+
+def _copy_rows(model, fields, objs):
+    table = connection.ops.quote_name(model._meta.db_table)
+    columns = ', '.join(connection.ops.quote_name(f.column) for f in fields)
+    sql = f'COPY {table} ({columns}) FROM STDIN'
+    with connection.cursor() as cursor:
+        raw = cursor.cursor
+        if hasattr(raw, 'copy'):
+            # psycopg 3
+            with raw.copy(sql) as copy:
+                for obj in objs:
+                    copy.write_row([f.get_db_prep_save(getattr(obj, f.attname), connection) for f in fields])
+        else:
+            # psycopg2
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for obj in objs:
+                writer.writerow([
+                    r'\N' if value is None else value
+                    for value in (f.get_db_prep_save(getattr(obj, f.attname), connection) for f in fields)
+                ])
+            buffer.seek(0)
+            raw.copy_expert(f"{sql} WITH (FORMAT csv, NULL '\\N')", buffer)
+
+
+def _insert_rows(model, fields, objs, batch_size):
+    # Plain batched INSERTs: bulk_create would overwrite the generated
+    # auto_now/auto_now_add timestamps with the current time.
+    table = connection.ops.quote_name(model._meta.db_table)
+    columns = ', '.join(connection.ops.quote_name(f.column) for f in fields)
+    placeholders = ', '.join(['%s'] * len(fields))
+    sql = f'INSERT INTO {table} ({columns}) VALUES ({placeholders})'
+    with connection.cursor() as cursor:
+        for offset in range(0, len(objs), batch_size):
+            cursor.executemany(sql, [
+                [f.get_db_prep_save(getattr(obj, f.attname), connection) for f in fields]
+                for obj in objs[offset:offset + batch_size]
+            ])
+
+
+def load(rows, batch_size=5000):
+    """Write generated instances table by table in one transaction."""
+    counts = {}
+    with transaction.atomic():
+        for model, objs in rows.items():
+            if not objs:
+                continue
+            fields = [
+                f for f in model._meta.concrete_fields
+                if not (f.primary_key and getattr(objs[0], f.attname) is None)
+            ]
+            if connection.vendor == 'postgresql':
+                _copy_rows(model, fields, objs)
+            else:
+                _insert_rows(model, fields, objs, batch_size)
+            counts[model._meta.label] = len(objs)
+        if rows.get(PropertyImage):
+            Property.sync_main_images(
+                Property.all_objects.filter(pk__in={image.property_id for image in rows[PropertyImage]})
+            )
+    return counts
+
+
+def reset_sequences():
+    """Move Postgres id sequences past the explicitly assigned primary keys."""
+    statements = connection.ops.sequence_reset_sql(no_style(), [User, Property, RentalAgreement])
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
@@ -0,0 +1,115 @@
+"""
+Signed rental agreement PDFs.
+
+The PDF is rendered by a task once both parties have signed and stored
+under the hash of what it prints (``document_version``), so it is only
+re-rendered when the agreement itself changes. reportlab's invariant mode
+keeps the output byte-for-byte reproducible.
+"""
+import hashlib
+import io
+import json
+from xml.sax.saxutils import escape
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import cm
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table
+
+from .models import RentalAgreement
+
+# Bump when the layout changes so stored documents are rendered again
+LAYOUT_VERSION = 1
+
+
+def document_fields(agreement):
+    """Everything the PDF prints; render_pdf reads the listing and parties from here."""
+    prop = agreement.property
+    return {
+        'agreement': agreement.pk,
+        'title': prop.title,
+        'address': f'{prop.address}, {prop.city}, {prop.state} {prop.zip_code}',
+        'landlord': _party_fields(agreement.landlord),
+        'tenant': _party_fields(agreement.tenant),
+        'start_date': agreement.start_date,
+        'end_date': agreement.end_date,
+        'monthly_rent': agreement.monthly_rent,
+        'security_deposit': agreement.security_deposit,
+        'terms': agreement.terms,
+        'signed_at': agreement.signed_at,
+    }
+
+
+def document_version(agreement):
+    payload = json.dumps({'layout': LAYOUT_VERSION, **document_fields(agreement)}, sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def document_name(version):
+    return f'agreements/{version[:2]}/{version}.pdf'
+
+
+def _party_fields(user):
+    return [user.get_full_name() or user.username, user.email]
+
+
+def _party(fields):
+    name, email = fields
+    return f'{escape(name)} ({escape(email)})' if email else escape(name)
+
+
+def render_pdf(agreement):
+    styles = getSampleStyleSheet()
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(
+        buffer, pagesize=A4, invariant=1,
+        title=f'Rental Agreement #{agreement.pk}',
+        leftMargin=2 * cm, rightMargin=2 * cm, topMargin=2 * cm, bottomMargin=2 * cm,
+    )
+    fields = document_fields(agreement)
+    story = [
+        Paragraph(f'Rental Agreement for {escape(fields["title"])}', styles['Title']),
+        Paragraph(escape(fields['address']), styles['Normal']),
+        Spacer(1, 0.6 * cm),
+        Table([
+            ['Landlord', Paragraph(_party(fields['landlord']), styles['Normal'])],
+            ['Tenant', Paragraph(_party(fields['tenant']), styles['Normal'])],
+            ['Term', f'{agreement.start_date:%d %B %Y} to {agreement.end_date:%d %B %Y}'],
+            ['Monthly rent', f'${agreement.monthly_rent}'],
+            ['Security deposit', f'${agreement.security_deposit}'],
+        ], colWidths=[4 * cm, 13 * cm], hAlign='LEFT'),
+        Spacer(1, 0.6 * cm),
+        Paragraph('Terms', styles['Heading2']),
+    ]
+    for block in agreement.terms.replace('\r\n', '\n').split('\n\n'):
+        if block.strip():
+            story.append(Paragraph(escape(block.strip()).replace('\n', '<br/>'), styles['Normal']))
+            story.append(Spacer(1, 0.3 * cm))
+    signed = f'{agreement.signed_at:%d %B %Y %H:%M %Z}' if agreement.signed_at else 'not yet signed'
+    story += [
+        Spacer(1, 0.6 * cm),
+        Paragraph('Signatures', styles['Heading2']),
+        Paragraph(f'Signed electronically by both parties on {signed}.', styles['Normal']),
+    ]
+    doc.build(story)
+    return buffer.getvalue()
+
+
+def generate_document(agreement):
+    """Store the agreement's PDF unless the stored one is current; returns its storage name."""
+    version = document_version(agreement)
+    if agreement.document and agreement.document_version == version:
+        return agreement.document.name
+
+    name = document_name(version)
+    if not default_storage.exists(name):
+        name = default_storage.save(name, ContentFile(render_pdf(agreement)))
+    RentalAgreement.objects.filter(pk=agreement.pk).update(
+        document=name, document_version=version, document_generated_at=timezone.now(),
+    )
+    agreement.document, agreement.document_version = name, version
+    return name
@@ -1,10 +1,46 @@
 from django import forms
-from .models import Property, PropertyImage, Message, Appointment, Review,User,PropertyVideo, RentalAgreement, Payment
+from .models import Property, PropertyImage, Message, Appointment, Review,User,PropertyVideo, RentalAgreement, Payment, SavedSearch
 from django.contrib.auth import get_user_model
 from django.contrib.auth.forms import UserCreationForm,AuthenticationForm
+from django.forms.boundfield import BoundField
 
+from .auth_backends import matching_users
+from .password_pool import HasherBusy, hash_password
+from .templating import cached_layout
 
-class PropertyForm(forms.ModelForm):
+
+class CachedBoundField(BoundField):
+    def as_widget(self, widget=None, attrs=None, only_initial=False):
+        key = self.form.layout_key()
+        if key is None or widget or attrs or only_initial:
+            return super().as_widget(widget, attrs, only_initial)
+        return cached_layout((key, self.name), lambda: BoundField.as_widget(self))
+
+
+class CachedLayoutMixin:
+    """
+    Reuse the markup of unbound forms, whole or field by field. An unbound
+    form's HTML depends only on its class and initial data, as long as its
+    choices are static or hidden; don't use it on forms with query-backed
+    select boxes.
+    """
+
+    bound_field_class = CachedBoundField
+
+    def layout_key(self):
+        if self.is_bound or any(callable(field.initial) for field in self.fields.values()):
+            return None
+        initial = tuple(sorted((name, repr(getattr(value, 'pk', value))) for name, value in self.initial.items()))
+        return (type(self), self.prefix, self.auto_id, self.label_suffix, self.use_required_attribute, initial)
+
+    def render(self, template_name=None, context=None, renderer=None):
+        key = self.layout_key()
+        if key is None or context or renderer:
+            return super().render(template_name, context, renderer)
+        return cached_layout((key, template_name), lambda: super(CachedLayoutMixin, self).render(template_name))
+
+
+class PropertyForm(CachedLayoutMixin, forms.ModelForm):
     class Meta:
         model = Property
         fields = [
@@ -31,7 +67,7 @@ class PropertyImageForm(forms.ModelForm):
         model = PropertyImage
         fields = ['image', 'is_main']
 
-class MessageForm(forms.ModelForm):
+class MessageForm(CachedLayoutMixin, forms.ModelForm):
     class Meta:
         model = Message
         fields = ['recipient', 'property', 'subject', 'body']
@@ -41,7 +77,7 @@ class MessageForm(forms.ModelForm):
             'body': forms.Textarea(attrs={'rows': 4}),
         }
 
-class AppointmentForm(forms.ModelForm):
+class AppointmentForm(CachedLayoutMixin, forms.ModelForm):
     class Meta:
         model = Appointment
         fields = ['property', 'landlord', 'requested_date', 'message']
@@ -94,20 +130,35 @@ class CustomUserCreationForm(UserCreationForm):
 
     def clean_username(self):
         username = self.cleaned_data.get('username')
-        if User.objects.filter(username__iexact=username).exists():
+        if matching_users('username', username).exists():
             raise forms.ValidationError("A user with that username already exists.")
         return username
 
     def clean_email(self):
         email = self.cleaned_data.get('email')
-        if User.objects.filter(email__iexact=email).exists():
+        if matching_users('email', email).exists():
             raise forms.ValidationError("A user with that email already exists.")
         return email
 
+    def set_password_and_save(self, user, password_field_name='password1', commit=True):
+        # Hash on the shared pool rather than in the request thread
+        user.password = hash_password(self.cleaned_data[password_field_name])
+        if commit:
+            user.save()
+        return user
+
 class CustomAuthenticationForm(AuthenticationForm):
     username = forms.CharField(label='Email/Username', widget=forms.TextInput(attrs={'class': 'form-control'}))
     password = forms.CharField(label='Password', widget=forms.PasswordInput(attrs={'class': 'form-control'}))
 
+    def clean(self):
+        try:
+            return super().clean()
+        except HasherBusy:
+            raise forms.ValidationError(
+                "We're handling a lot of sign-ins right now. Please try again in a moment.", code='busy',
+            )
+
 class PropertyVideoForm(forms.ModelForm):
     class Meta:
         model = PropertyVideo
@@ -133,4 +184,28 @@ class PaymentForm(forms.ModelForm):
         widgets = {
             'payment_date': forms.DateInput(attrs={'type': 'date'}),
             'due_date': forms.DateInput(attrs={'type': 'date'}),
-        }
\ No newline at end of file
+        }
+class SavedSearchForm(forms.ModelForm):
+    """A saved search built from the listing page's filter parameters."""
+    # Listing filters the saved-search matcher cannot apply
+    UNSUPPORTED_FILTERS = ('amenity', 'min_reputation')
+
+    class Meta:
+        model = SavedSearch
+        fields = ['name', 'city', 'property_type', 'min_bedrooms', 'max_bedrooms', 'min_price', 'max_price']
+
+    def __init__(self, user, params, **kwargs):
+        super().__init__(SavedSearch.data_from_params(params), instance=SavedSearch(user=user), **kwargs)
+        self.unsupported = [name for name in self.UNSUPPORTED_FILTERS if params.get(name)]
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if self.unsupported:
+            raise forms.ValidationError(
+                "Saved searches can't filter on amenities or landlord reputation yet. "
+                "Remove those filters to save this search."
+            )
+        min_price, max_price = cleaned_data.get('min_price'), cleaned_data.get('max_price')
+        if min_price is not None and max_price is not None and min_price > max_price:
+            raise forms.ValidationError("The minimum price is above the maximum price.")
+        return cleaned_data
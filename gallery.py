@@ -0,0 +1,176 @@
+"""
+Listing image uploads with deduplication.
+
+Uploads are hashed while they stream to disk (``HashingUploadHandler``).
+Identical bytes are stored once under a content-addressed name and shared
+by every PropertyImage that uses them; image files are never deleted with
+their rows, so sharing is safe. A 64-bit difference hash flags images that
+look like one of the landlord's existing photos (the same shot resized or
+re-encoded) without rejecting them.
+"""
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.db import transaction
+from PIL import Image
+
+from .models import ChangeLogEntry, PropertyImage, record_change
+
+HASH_MASK = (1 << 64) - 1
+
+
+class HashingUploadHandler(TemporaryFileUploadHandler):
+    """Write each upload to a temporary file, computing its SHA-256 on the way."""
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.hasher = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.hasher.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        upload = super().file_complete(file_size)
+        upload.sha256 = self.hasher.hexdigest()
+        return upload
+
+
+def content_hash(upload):
+    if getattr(upload, 'sha256', None):
+        return upload.sha256
+    hasher = hashlib.sha256()
+    for chunk in upload.chunks():
+        hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def difference_hash(upload):
+    """64-bit dHash of the image, stored signed so it fits a BigIntegerField."""
+    upload.seek(0)
+    with Image.open(upload) as image:
+        # JPEGs can be decoded straight at a fraction of their size
+        image.draft('L', (64, 64))
+        pixels = list(image.convert('L').resize((9, 8), Image.Resampling.LANCZOS).getdata())
+    upload.seek(0)
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            value = value << 1 | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def hash_distance(a, b):
+    return bin((a ^ b) & HASH_MASK).count('1')
+
+
+def shared_name(sha256, filename):
+    extension = os.path.splitext(filename)[1].lower()
+    return f'property_images/shared/{sha256[:2]}/{sha256}{extension}'
+
+
+def store_upload(upload, sha256):
+    """Return a storage name holding ``upload``'s bytes, writing them only if new."""
+    existing = PropertyImage.objects.filter(content_hash=sha256).values_list('image', flat=True).first()
+    if existing:
+        return existing
+    name = shared_name(sha256, upload.name)
+    if default_storage.exists(name):
+        return name
+    # FileSystemStorage moves a temporary upload into place instead of copying it
+    return default_storage.save(name, upload)
+
+
+def add_images(prop, uploads, main=None):
+    """
+    Attach ``uploads`` to ``prop``; ``main`` is the index of the upload to
+    make the main image. Returns ``(created, skipped, rejected)``: the new
+    images, names of files the listing already has or that exceed
+    PROPERTY_IMAGES_MAX, and names of files that are not images.
+    """
+    own_hashes = set(prop.images.values_list('content_hash', flat=True))
+    room = settings.PROPERTY_IMAGES_MAX - prop.images.count()
+    known = list(
+        PropertyImage.objects
+        .filter(property__landlord_id=prop.landlord_id, perceptual_hash__isnull=False)
+        .values_list('pk', 'perceptual_hash')
+    )
+    threshold = settings.PROPERTY_IMAGE_SIMILARITY_DISTANCE
+
+    images, similar_in_batch, skipped, rejected = [], {}, [], []
+    main_image = None
+    for index, upload in enumerate(uploads):
+        sha256 = content_hash(upload)
+        if sha256 in own_hashes or len(images) >= room:
+            skipped.append(upload.name)
+            continue
+        try:
+            phash = difference_hash(upload)
+        except (OSError, Image.DecompressionBombError):
+            rejected.append(upload.name)
+            continue
+
+        image = PropertyImage(
+            property=prop,
+            image=store_upload(upload, sha256),
+            content_hash=sha256,
+            perceptual_hash=phash,
+        )
+        image.similar_to_id = next((pk for pk, other in known if hash_distance(phash, other) <= threshold), None)
+        if image.similar_to_id is None:
+            for earlier in images:
+                if hash_distance(phash, earlier.perceptual_hash) <= threshold:
+                    similar_in_batch[image] = earlier
+                    break
+        if main is not None and str(index) == str(main):
+            main_image = image
+        images.append(image)
+        own_hashes.add(sha256)
+
+    if not images:
+        return [], skipped, rejected
+    with transaction.atomic():
+        created = PropertyImage.objects.bulk_create(images)
+        if similar_in_batch:
+            for image, earlier in similar_in_batch.items():
+                image.similar_to_id = earlier.pk
+            PropertyImage.objects.bulk_update(list(similar_in_batch), ['similar_to'])
+        if main_image is None and prop.main_image_id is None:
+            main_image = created[0]
+        if main_image is not None:
+            prop.set_main_image(main_image)
+        # bulk_create() sends no post_save, so feed the change log here
+        for image in created:
+            record_change(image, ChangeLogEntry.CREATE)
+    return created, skipped, rejected
+
+
+def save_image_formset(formset, prop):
+    """
+    Save a PropertyImageFormSet for ``prop``. A ticked is_main goes through
+    Property.set_main_image() so the one-main-image constraint holds.
+    """
+    with transaction.atomic():
+        images = formset.save(commit=False)
+        for image in formset.deleted_objects:
+            image.delete()
+        # Deleting the main image nulled Property.main_image in the database
+        prop.refresh_from_db(fields=['main_image'])
+        main_image = prop.main_image
+        for image in images:
+            image.property = prop
+            is_current = image.pk is not None and image.pk == prop.main_image_id
+            if image.is_main and not is_current:
+                main_image = image
+            elif is_current and not image.is_main:
+                main_image = None
+            # The flag itself only changes through set_main_image()
+            image.is_main = is_current
+            image.save()
+        if main_image is None:
+            main_image = prop.images.first()
+        if getattr(main_image, 'pk', None) != prop.main_image_id:
+            prop.set_main_image(main_image)
@@ -0,0 +1,166 @@
+import hashlib
+import re
+from datetime import datetime
+
+from django.contrib.messages import get_messages
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import content_disposition_header, http_date, quote_etag
+
+RANGE_HEADER = re.compile(r'^bytes=(\d*)-(\d*)$')
+RANGE_CHUNK_SIZE = 64 * 1024
+
+
+def related_version(model, timestamp_field=None, fk='property'):
+    """
+    Subquery giving the newest ``timestamp_field`` (or the row count) of
+    ``model`` rows pointing at the outer object, for use in ETag lookups.
+    """
+    aggregate = Max(timestamp_field) if timestamp_field else Count('pk')
+    rows = model.objects.filter(**{fk: OuterRef('pk')}).order_by().values(fk)
+    return Subquery(rows.annotate(version=aggregate).values('version')[:1])
+
+
+class ConditionalResponseMixin:
+    """
+    ETag/Last-Modified support for read-only class-based views.
+
+    Subclasses return the values the page depends on from
+    ``get_cache_versions()``; the newest datetime among them becomes
+    Last-Modified unless ``get_last_modified()`` says otherwise. Matching
+    ``If-None-Match``/``If-Modified-Since`` requests get a 304 before any
+    template work. Anonymous responses may be
+    stored by shared caches for ``cache_shared_max_age`` seconds;
+    authenticated ones are private to the browser.
+    """
+
+    cache_max_age = 60
+    cache_shared_max_age = 300
+
+    def get_cache_versions(self):
+        return []
+
+    def get_last_modified(self):
+        return None
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or self._has_pending_messages(request):
+            return super().dispatch(request, *args, **kwargs)
+
+        versions = self.get_cache_versions()
+        if versions is None:
+            return super().dispatch(request, *args, **kwargs)
+
+        user = request.user
+        if user.is_authenticated:
+            versions = [user.pk, user.date_updated, *versions]
+        etag = hashlib.md5(repr(versions).encode(), usedforsecurity=False).hexdigest()
+        last_modified = self.get_last_modified() or _newest_datetime(versions)
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        # get_conditional_response compares against the quoted If-None-Match values
+        response = get_conditional_response(request, etag=quote_etag(etag), last_modified=timestamp)
+        if response is None:
+            response = super().dispatch(request, *args, **kwargs)
+            if response.status_code == 200:
+                response.headers.setdefault('ETag', quote_etag(etag))
+                if timestamp is not None:
+                    response.headers.setdefault('Last-Modified', http_date(timestamp))
+        self._patch_cache_headers(response, user.is_authenticated)
+        return response
+
+    def _patch_cache_headers(self, response, authenticated):
+        if authenticated:
+            patch_cache_control(response, private=True, max_age=0, must_revalidate=True)
+        else:
+            patch_cache_control(
+                response, public=True, max_age=self.cache_max_age, s_maxage=self.cache_shared_max_age,
+            )
+        patch_vary_headers(response, ('Cookie',))
+
+    def _has_pending_messages(self, request):
+        # A flash message changes the page without changing any version
+        return len(get_messages(request)) > 0
+
+
+def _newest_datetime(values):
+    found = []
+    for value in values:
+        if isinstance(value, dict):
+            # .aggregate() results
+            value = tuple(value.values())
+        found.extend(v for v in (value if isinstance(value, (list, tuple)) else (value,)) if isinstance(v, datetime))
+    return max(found, default=None)
+
+
+def ranged_file_response(request, field_file, etag, content_type, filename=None):
+    """
+    Serve a stored file with ETag revalidation and single byte-range
+    requests, so PDF viewers and resumed downloads fetch only what they need.
+    """
+    etag = quote_etag(etag)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        size = field_file.size
+        try:
+            byte_range = _requested_range(request, size, etag)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+        handle = field_file.storage.open(field_file.name, 'rb')
+        if byte_range is None:
+            response = FileResponse(handle, content_type=content_type, filename=filename)
+        else:
+            start, end = byte_range
+            handle.seek(start)
+            response = StreamingHttpResponse(_read_range(handle, end - start + 1), status=206, content_type=content_type)
+            response['Content-Length'] = str(end - start + 1)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            if filename:
+                response['Content-Disposition'] = content_disposition_header(False, filename)
+        response['Accept-Ranges'] = 'bytes'
+        response['ETag'] = etag
+    patch_cache_control(response, private=True, max_age=0, must_revalidate=True)
+    return response
+
+
+def _requested_range(request, size, etag):
+    """
+    ``(start, end)`` of a satisfiable single ``Range`` header, or None to send
+    the whole file. Raises ValueError when the range lies past the end.
+    """
+    header = request.headers.get('Range', '')
+    if request.method != 'GET' or not header:
+        return None
+    if_range = request.headers.get('If-Range')
+    if if_range and if_range != etag:
+        return None
+    match = RANGE_HEADER.match(header.strip())
+    if not match or not any(match.groups()):
+        # Malformed and multi-range requests get the whole file
+        return None
+    first, last = match.groups()
+    if not first:
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def _read_range(handle, length):
+    try:
+        while length > 0:
+            chunk = handle.read(min(RANGE_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        handle.close()
+
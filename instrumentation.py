@@ -0,0 +1,335 @@
+import logging
+import random
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+
+logger = logging.getLogger(__name__)
+
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+METRICS = {
+    'duration_seconds': TIME_BUCKETS,
+    'db_queries': COUNT_BUCKETS,
+    'db_time_seconds': TIME_BUCKETS,
+    'db_duplicate_queries': COUNT_BUCKETS,
+    'template_seconds': TIME_BUCKETS,
+    'response_bytes': SIZE_BUCKETS,
+}
+
+
+class Histogram:
+    """Fixed-bucket cumulative histogram, cheap enough to update on every request."""
+
+    __slots__ = ('buckets', 'counts', 'total', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._templates = {}
+
+    def observe(self, view_name, values):
+        with self._lock:
+            for metric, value in values.items():
+                key = (metric, view_name)
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = Histogram(METRICS[metric])
+                histogram.observe(value)
+
+    def observe_templates(self, stats):
+        """Add a request's ``TemplateProfile.stats`` to the per-template totals."""
+        with self._lock:
+            for name, (renders, seconds, queries) in stats.items():
+                totals = self._templates.setdefault(name, [0, 0.0, 0])
+                totals[0] += renders
+                totals[1] += seconds
+                totals[2] += queries
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._templates.clear()
+
+    def render_prometheus(self):
+        """Return all histograms in the Prometheus text exposition format."""
+        with self._lock:
+            snapshot = sorted(
+                (metric, view_name, list(h.counts), h.total, h.count)
+                for (metric, view_name), h in self._histograms.items()
+            )
+            templates = sorted((name, list(totals)) for name, totals in self._templates.items())
+
+        lines = []
+        current_metric = None
+        for metric, view_name, counts, total, count in snapshot:
+            name = f'tnp_request_{metric}'
+            view_name = _label_value(view_name)
+            if metric != current_metric:
+                lines.append(f'# TYPE {name} histogram')
+                current_metric = metric
+            cumulative = 0
+            for bound, bucket_count in zip(METRICS[metric], counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{{view="{view_name}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{view="{view_name}",le="+Inf"}} {count}')
+            lines.append(f'{name}_sum{{view="{view_name}"}} {total}')
+            lines.append(f'{name}_count{{view="{view_name}"}} {count}')
+
+        for position, metric in enumerate(('renders', 'render_seconds', 'queries')):
+            if templates:
+                lines.append(f'# TYPE tnp_template_{metric}_total counter')
+            for template_name, totals in templates:
+                lines.append(
+                    f'tnp_template_{metric}_total{{template="{_label_value(template_name)}"}} {totals[position]}'
+                )
+        return '\n'.join(lines) + '\n'
+
+
+def _label_value(value):
+    # Prometheus label values escape backslash, double quote and newline
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = MetricsRegistry()
+
+# The TemplateProfile of the request being rendered, if it is profiled
+current_template_profile = ContextVar('current_template_profile', default=None)
+
+
+class TemplateProfile:
+    """
+    Render time and queries per template for one request. Both exclude
+    the templates it includes or extends, so the queries a template is
+    charged with are the ones its own context variables set off.
+    """
+
+    def __init__(self):
+        self.stack = []
+        self.stats = {}
+
+    def enter(self, name):
+        self.stack.append([name, time.perf_counter(), 0.0])
+        self.stats.setdefault(name, [0, 0.0, 0])[0] += 1
+
+    def exit(self):
+        name, start, nested = self.stack.pop()
+        elapsed = time.perf_counter() - start
+        self.stats[name][1] += elapsed - nested
+        if self.stack:
+            self.stack[-1][2] += elapsed
+
+    def query(self):
+        if self.stack:
+            self.stats[self.stack[-1][0]][2] += 1
+
+    def slowest(self, count):
+        return sorted(self.stats.items(), key=lambda item: item[1][1], reverse=True)[:count]
+
+
+def install_template_profiler():
+    """Wrap ``Template._render`` so templates report to the current TemplateProfile."""
+    from django.template.base import Template
+
+    original = Template._render
+    if getattr(original, 'profiled', False):
+        return
+
+    def _render(self, context):
+        profile = current_template_profile.get()
+        if profile is None:
+            return original(self, context)
+        profile.enter(self.origin.template_name or self.name or '<string>')
+        try:
+            return original(self, context)
+        finally:
+            profile.exit()
+
+    _render.profiled = True
+    Template._render = _render
+
+
+class QueryRecorder:
+    """``connection.execute_wrapper`` hook that counts and times queries."""
+
+    def __init__(self, template_profile=None):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+        self.template_profile = template_profile
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.statements[sql] += 1
+            if self.template_profile is not None:
+                self.template_profile.query()
+
+    @property
+    def duplicates(self):
+        return self.count - len(self.statements)
+
+
+class PerformanceMiddleware:
+    """
+    Record query count, SQL time, duplicate queries, template render time
+    and response size per resolved URL name.
+
+    Results feed the in-process histograms served by ``metrics_view`` and a
+    ``Server-Timing`` header. PERFORMANCE_SAMPLE_RATE (0-1) limits the share
+    of requests that are measured. Template time is captured for
+    TemplateResponse views (all the class-based views); function views that
+    call ``render()`` only contribute to the total.
+
+    With PERFORMANCE_TEMPLATE_PROFILE on, every template render is also
+    timed (see TemplateProfile): the slowest templates of each request are
+    added to ``Server-Timing`` and per-template totals to ``metrics_view``.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.sample_rate = getattr(settings, 'PERFORMANCE_SAMPLE_RATE', 1.0)
+        self.duplicate_threshold = getattr(settings, 'PERFORMANCE_DUPLICATE_QUERY_THRESHOLD', 5)
+        self.server_timing = getattr(settings, 'PERFORMANCE_SERVER_TIMING', True)
+        self.profile_templates = getattr(settings, 'PERFORMANCE_TEMPLATE_PROFILE', False)
+        if self.profile_templates:
+            install_template_profiler()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        recorder = QueryRecorder(TemplateProfile() if self.profile_templates else None)
+        request._template_seconds = 0.0
+        start = time.perf_counter()
+        token = current_template_profile.set(recorder.template_profile)
+        try:
+            with ExitStack() as stack:
+                self._install_recorder(stack, recorder)
+                response = self.get_response(request)
+        finally:
+            current_template_profile.reset(token)
+        return self._finish(request, response, recorder, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return await self.get_response(request)
+
+        recorder = QueryRecorder(TemplateProfile() if self.profile_templates else None)
+        request._template_seconds = 0.0
+        start = time.perf_counter()
+        # sync_to_async copies the context, so rendering threads see the profile
+        token = current_template_profile.set(recorder.template_profile)
+        stack = ExitStack()
+        # ORM calls of an ASGI request all run on its thread-sensitive worker
+        # thread, whose connections are not the event loop's
+        await sync_to_async(self._install_recorder)(stack, recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            current_template_profile.reset(token)
+        return self._finish(request, response, recorder, time.perf_counter() - start)
+
+    def _install_recorder(self, stack, recorder):
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(recorder))
+
+    def _finish(self, request, response, recorder, duration):
+        match = request.resolver_match
+        view_name = (match.view_name if match else None) or 'unresolved'
+        template_seconds = request._template_seconds
+        size = len(response.content) if not response.streaming else 0
+
+        registry.observe(view_name, {
+            'duration_seconds': duration,
+            'db_queries': recorder.count,
+            'db_time_seconds': recorder.duration,
+            'db_duplicate_queries': recorder.duplicates,
+            'template_seconds': template_seconds,
+            'response_bytes': size,
+        })
+        profile = recorder.template_profile
+        if profile is not None:
+            registry.observe_templates(profile.stats)
+
+        if recorder.duplicates >= self.duplicate_threshold:
+            sql, repeats = recorder.statements.most_common(1)[0]
+            logger.warning(
+                "%s ran %d duplicate queries; most repeated (%dx): %s",
+                view_name, recorder.duplicates, repeats, sql[:200],
+            )
+
+        if self.server_timing:
+            response['Server-Timing'] = (
+                f'db;dur={recorder.duration * 1000:.1f};desc="{recorder.count} queries", '
+                f'tpl;dur={template_seconds * 1000:.1f}, '
+                f'total;dur={duration * 1000:.1f}'
+            )
+            if profile is not None:
+                response['Server-Timing'] += ''.join(
+                    f', tpl{position};dur={seconds * 1000:.1f};desc="{name} ({queries} queries)"'
+                    for position, (name, (_, seconds, queries)) in enumerate(profile.slowest(5), 1)
+                )
+        return response
+
+    def process_template_response(self, request, response):
+        if not hasattr(request, '_template_seconds'):
+            # Not sampled
+            return response
+        render = response.render
+
+        def timed_render():
+            start = time.perf_counter()
+            try:
+                return render()
+            finally:
+                request._template_seconds += time.perf_counter() - start
+
+        response.render = timed_render
+        return response
+
+
+def metrics_view(request):
+    token = getattr(settings, 'PERFORMANCE_METRICS_TOKEN', '')
+    authorized = request.user.is_superuser or (
+        token and request.headers.get('Authorization') == f'Bearer {token}'
+    )
+    if not authorized:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render_prometheus(), content_type='text/plain; version=0.0.4')
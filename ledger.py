@@ -0,0 +1,131 @@
+"""
+Running balances for rental agreements.
+
+Each Payment is an installment: while pending or failed it is owed, once
+completed it is paid, and a refund voids it. ``post_payment`` turns a
+payment's change of state into LedgerEntry rows and adjusts the
+agreement's AgreementBalance under a row lock, in the payment's own
+transaction. What is overdue depends on the date, so ``refresh_arrears``
+recomputes it for every agreement in one UPDATE.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, Min, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import AgreementBalance, LedgerEntry, Payment, RentalAgreement
+
+UNPAID = ('pending', 'failed')
+ZERO = Decimal('0.00')
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+
+
+def _effect(state):
+    """``(charged, paid)`` for a payment in ``state``; None means it did not exist."""
+    if state is None or state['status'] == 'refunded':
+        return ZERO, ZERO
+    amount = Decimal(str(state['amount']))
+    return amount, amount if state['status'] == 'completed' else ZERO
+
+
+def post_payment(payment, previous):
+    """Book the difference between ``previous`` (status/amount/due_date values) and ``payment``."""
+    current = {'status': payment.status, 'amount': payment.amount, 'due_date': payment.due_date}
+    old_charged, old_paid = _effect(previous)
+    new_charged, new_paid = _effect(current)
+    charged, paid = new_charged - old_charged, new_paid - old_paid
+
+    agreement_id = payment.rental_agreement_id
+    with transaction.atomic():
+        if charged or paid:
+            balance, _ = AgreementBalance.objects.select_for_update().get_or_create(agreement_id=agreement_id)
+            entries = []
+            for kind, amount in ((LedgerEntry.CHARGE, charged), (LedgerEntry.PAYMENT, -paid)):
+                if amount:
+                    balance.balance += amount
+                    entries.append(LedgerEntry(
+                        agreement_id=agreement_id, payment_id=payment.pk, kind=kind, amount=amount,
+                        balance_after=balance.balance, payment_status=payment.status,
+                    ))
+            balance.charged += charged
+            balance.paid += paid
+            balance.save()
+            LedgerEntry.objects.bulk_create(entries)
+
+        today = timezone.localdate()
+        due_dates = [payment.due_date] + ([previous['due_date']] if previous else [])
+        if any(due < today for due in due_dates):
+            refresh_arrears([agreement_id], today)
+
+
+def refresh_arrears(agreement_ids=None, today=None):
+    """
+    Set the overdue amount and oldest overdue due date from unpaid
+    installments due before ``today``, for all agreements (or
+    ``agreement_ids``) in a single UPDATE. Returns the rows updated.
+    """
+    today = today or timezone.localdate()
+    overdue = (
+        Payment.objects
+        .filter(rental_agreement=OuterRef('pk'), status__in=UNPAID, due_date__lt=today)
+        .order_by()
+        .values('rental_agreement')
+    )
+    balances = AgreementBalance.objects.all()
+    if agreement_ids is not None:
+        balances = balances.filter(pk__in=agreement_ids)
+    return balances.update(
+        overdue_amount=Coalesce(
+            Subquery(overdue.annotate(total=Sum('amount')).values('total')), Value(ZERO), output_field=MONEY,
+        ),
+        overdue_since=Subquery(overdue.annotate(oldest=Min('due_date')).values('oldest')),
+        arrears_refreshed_at=timezone.now(),
+    )
+
+
+def open_ledgers(batch_size=500):
+    """
+    Give agreements whose payments predate the ledger a balance and opening
+    entries. Run once with the workers stopped; returns the agreements opened.
+    """
+    missing = list(RentalAgreement.objects.filter(balance__isnull=True).values_list('pk', flat=True))
+    for start in range(0, len(missing), batch_size):
+        batch = missing[start:start + batch_size]
+        totals = {
+            row['rental_agreement']: row
+            for row in Payment.objects.filter(rental_agreement__in=batch)
+            .values('rental_agreement')
+            .annotate(
+                charged=Coalesce(Sum('amount', filter=~Q(status='refunded')), Value(ZERO), output_field=MONEY),
+                paid=Coalesce(Sum('amount', filter=Q(status='completed')), Value(ZERO), output_field=MONEY),
+            )
+        }
+        balances, entries = [], []
+        for pk in batch:
+            charged = totals.get(pk, {}).get('charged', ZERO)
+            paid = totals.get(pk, {}).get('paid', ZERO)
+            balances.append(AgreementBalance(agreement_id=pk, charged=charged, paid=paid, balance=charged - paid))
+            if charged:
+                entries.append(LedgerEntry(agreement_id=pk, kind=LedgerEntry.CHARGE, amount=charged, balance_after=charged))
+            if paid:
+                entries.append(LedgerEntry(
+                    agreement_id=pk, kind=LedgerEntry.PAYMENT, amount=-paid, balance_after=charged - paid,
+                ))
+        with transaction.atomic():
+            AgreementBalance.objects.bulk_create(balances)
+            LedgerEntry.objects.bulk_create(entries)
+    if missing:
+        refresh_arrears(missing)
+    return len(missing)
+
+
+def landlord_arrears(landlord):
+    """The landlord's agreements with overdue rent, largest arrears first."""
+    return (
+        AgreementBalance.objects
+        .filter(agreement__landlord=landlord, overdue_amount__gt=0)
+        .select_related('agreement__tenant', 'agreement__property')
+        .order_by('-overdue_amount')
+    )
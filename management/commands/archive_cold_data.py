@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from tenant_network.archival import archive_appointments, archive_messages, archive_payments
+
+
+class Command(BaseCommand):
+    help = "Move read messages, finished appointments and settled payments past their age limit into archive tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows moved per transaction.')
+        parser.add_argument(
+            '--only',
+            choices=['messages', 'appointments', 'payments'],
+            help='Archive a single kind of row.',
+        )
+
+    def handle(self, *args, **options):
+        jobs = {
+            'messages': (archive_messages, settings.ARCHIVE_MESSAGES_AFTER_DAYS),
+            'appointments': (archive_appointments, settings.ARCHIVE_APPOINTMENTS_AFTER_DAYS),
+            'payments': (archive_payments, settings.ARCHIVE_PAYMENTS_AFTER_DAYS),
+        }
+        for name, (archive, days) in jobs.items():
+            if options['only'] and options['only'] != name:
+                continue
+            moved = archive(timedelta(days=days), batch_size=options['batch_size'])
+            self.stdout.write(f"Archived {moved} {name} older than {days} days.")
+        self.stdout.write(self.style.SUCCESS('Archival complete.'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from tenant_network.assets import brotli, build_bundles
+
+
+class Command(BaseCommand):
+    help = "Concatenate ASSET_BUNDLES into content-hashed, precompressed files under STATIC_ROOT/bundles."
+
+    def handle(self, *args, **options):
+        manifest = build_bundles()
+        for name, path in sorted(manifest.items()):
+            self.stdout.write(f"  {name} -> {path}")
+        variants = 'gzip and brotli' if brotli is not None else 'gzip'
+        self.stdout.write(self.style.SUCCESS(f"Built {len(manifest)} bundles with {variants} variants."))
@@ -0,0 +1,20 @@
+from django.contrib.staticfiles.management.commands.collectstatic import Command as CollectStaticCommand
+from django.core.management import call_command
+
+
+class Command(CollectStaticCommand):
+    """collectstatic that also builds the asset bundles afterwards."""
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            '--no-bundles',
+            action='store_true',
+            help='Skip building the ASSET_BUNDLES after collecting.',
+        )
+
+    def handle(self, **options):
+        summary = super().handle(**options)
+        if not options['no_bundles'] and not options['dry_run']:
+            call_command('build_assets', verbosity=options['verbosity'], stdout=self.stdout)
+        return summary
@@ -0,0 +1,94 @@
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from tenant_network import datagen
+
+PHASES = (
+    ('users', datagen.generate_users, 'total_users'),
+    ('listings', datagen.generate_listings, 'properties'),
+    ('activity', datagen.generate_activity, 'tenants'),
+)
+
+
+def _init_worker():
+    django.setup()
+    # Never share the parent's database sockets
+    connections.close_all()
+
+
+def _run_chunk(generator, plan, start, stop, batch_size):
+    return datagen.load(generator(plan, start, stop), batch_size=batch_size)
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with deterministic, correlated synthetic data for performance work: "
+        "users, listings with images and amenities, message threads, viewings, agreements, "
+        "payments, reviews and favorites."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--landlords', type=int, default=200)
+        parser.add_argument('--tenants', type=int, default=5000)
+        parser.add_argument('--properties', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=0, help='Same seed and sizes give the same rows.')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Generator processes (default: CPU count on Postgres, 1 elsewhere).')
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Users, listings or tenants handled per worker task.')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Rows per INSERT batch when COPY is unavailable.')
+        parser.add_argument('--password', default='password123', help='Password set on every generated user.')
+
+    def handle(self, *args, **options):
+        if options['landlords'] < 1 or options['properties'] < 1:
+            raise CommandError('At least one landlord and one property are required.')
+
+        workers = options['workers']
+        if workers is None:
+            workers = os.cpu_count() if connection.vendor == 'postgresql' else 1
+
+        plan = datagen.Plan(
+            landlords=options['landlords'],
+            tenants=options['tenants'],
+            properties=options['properties'],
+            seed=options['seed'],
+            chunk_size=options['chunk_size'],
+        )
+        plan.prepare(make_password(options['password']))
+
+        totals = Counter()
+        started = time.perf_counter()
+        for phase, generator, size_attr in PHASES:
+            phase_started = time.perf_counter()
+            chunks = plan.chunks(getattr(plan, size_attr))
+            if workers > 1:
+                connections.close_all()
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                    results = pool.map(
+                        _run_chunk,
+                        *zip(*[(generator, plan, start, stop, options['batch_size']) for start, stop in chunks]),
+                    )
+                    for counts in results:
+                        totals.update(counts)
+            else:
+                for start, stop in chunks:
+                    totals.update(_run_chunk(generator, plan, start, stop, options['batch_size']))
+            self.stdout.write(f"{phase}: {len(chunks)} chunks in {time.perf_counter() - phase_started:.1f}s")
+
+        if connection.vendor == 'postgresql':
+            datagen.reset_sequences()
+
+        for label, count in sorted(totals.items()):
+            self.stdout.write(f"  {label:<40}{count:>12,}")
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {sum(totals.values()):,} rows in {elapsed:.1f}s with {workers} worker(s)."
+        ))
@@ -0,0 +1,90 @@
+import asyncio
+import json
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.utils.crypto import get_random_string
+
+from tenant_network.benchmarks import measure_capacity, sustainable_capacity
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare how much concurrency running servers can absorb, e.g. the WSGI app under gunicorn "
+        "against the ASGI app under uvicorn. Start both against the same database with "
+        "RATELIMIT_ENABLED=False, then pass each as --target label=url."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target',
+            action='append',
+            required=True,
+            help='label=base URL, e.g. wsgi=http://127.0.0.1:8000 asgi=http://127.0.0.1:8001. Repeatable.',
+        )
+        parser.add_argument('--path', required=True, help='Request path, e.g. /payments/1/create-intent/.')
+        parser.add_argument('--method', default='GET', help='HTTP method (default GET).')
+        parser.add_argument(
+            '--concurrency',
+            default='10,50,100,200',
+            help='Comma-separated numbers of requests kept in flight.',
+        )
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds per concurrency level.')
+        parser.add_argument('--username', help='Send requests logged in as this user.')
+        parser.add_argument('--p99-budget', type=float, default=500.0, help='p99 latency (ms) a healthy run stays under.')
+        parser.add_argument('--output', help='Write the JSON report to this path.')
+
+    def handle(self, *args, **options):
+        try:
+            targets = dict(target.split('=', 1) for target in options['target'])
+            levels = [int(level) for level in options['concurrency'].split(',')]
+        except ValueError:
+            raise CommandError('--target takes label=url and --concurrency a list of integers.')
+
+        cookies, headers = self.credentials(options['username'])
+        report = {}
+        for label, base_url in targets.items():
+            rows = []
+            for level in levels:
+                row = asyncio.run(measure_capacity(
+                    base_url, options['path'], options['method'].upper(), level, options['duration'],
+                    cookies=cookies, headers=headers,
+                ))
+                rows.append(row)
+                self.stdout.write(
+                    f"{label:<8} c={level:<5} {row['rps']:>8} rps  p50 {row['p50_ms']:>8} ms  "
+                    f"p99 {row['p99_ms']:>8} ms  errors {row['error_rate']:.1%}"
+                )
+            best = sustainable_capacity(rows, options['p99_budget'])
+            report[label] = {'runs': rows, 'capacity': best}
+
+        self.stdout.write('')
+        for label, result in report.items():
+            best = result['capacity']
+            if best:
+                self.stdout.write(self.style.SUCCESS(
+                    f"{label}: {best['rps']} rps at concurrency {best['concurrency']} within p99 {options['p99_budget']} ms"
+                ))
+            else:
+                self.stdout.write(self.style.WARNING(f"{label}: no run stayed within the latency and error budget"))
+
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(report, fh, indent=2)
+
+    def credentials(self, username):
+        # Any 32-character secret works as long as the cookie and header agree
+        csrf = get_random_string(32)
+        cookies = {settings.CSRF_COOKIE_NAME: csrf}
+        headers = {'X-CSRFToken': csrf}
+        if username:
+            try:
+                user = get_user_model().objects.get(username=username)
+            except get_user_model().DoesNotExist:
+                raise CommandError(f'No user named {username!r}.')
+            client = Client()
+            client.force_login(user)
+            cookies[settings.SESSION_COOKIE_NAME] = client.cookies[settings.SESSION_COOKIE_NAME].value
+        return cookies, headers
@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+
+from tenant_network.partitioning import PARTITIONED_MODELS, convert_table, is_supported, maintain_partitions
+
+
+class Command(BaseCommand):
+    help = (
+        "Maintain monthly partitions of the message, payment and appointment tables on PostgreSQL: "
+        "create upcoming months and detach expired ones. Run daily. Use --convert once to turn "
+        "the existing plain tables into partitioned tables."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--convert',
+            action='store_true',
+            help='Rebuild plain tables as partitioned tables first (locks each table while copying).',
+        )
+        parser.add_argument(
+            '--months-ahead',
+            type=int,
+            default=getattr(settings, 'PARTITION_MONTHS_AHEAD', 3),
+            help='Keep this many future monthly partitions ready.',
+        )
+        parser.add_argument(
+            '--drop-detached',
+            action='store_true',
+            help='Drop partitions past their retention instead of only detaching them.',
+        )
+
+    def handle(self, *args, **options):
+        if not is_supported():
+            self.stdout.write("Partitioning needs PostgreSQL; plain tables are left as they are.")
+            return
+
+        retention = getattr(settings, 'PARTITION_RETAIN_MONTHS', {})
+        failed = []
+        for model, column in PARTITIONED_MODELS:
+            table = model._meta.db_table
+            # One table failing must not leave the others without next month's partition
+            try:
+                if options['convert'] and convert_table(model, column, options['months_ahead']):
+                    self.stdout.write(f"Converted {table} to monthly partitions on {column}.")
+
+                created, removed = maintain_partitions(
+                    model, column,
+                    months_ahead=options['months_ahead'],
+                    retain_months=retention.get(model._meta.model_name),
+                    drop=options['drop_detached'],
+                )
+            except DatabaseError as exc:
+                self.stderr.write(f"Partition maintenance of {table} failed: {exc}")
+                failed.append(table)
+                continue
+            for name in created:
+                self.stdout.write(f"Created partition {name}.")
+            for name in removed:
+                self.stdout.write(f"{'Dropped' if options['drop_detached'] else 'Detached'} partition {name}.")
+        if failed:
+            raise CommandError(f"Partition maintenance failed for {', '.join(failed)}.")
+        self.stdout.write(self.style.SUCCESS('Partition maintenance complete.'))
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from tenant_network.changefeed import prune_changes
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete change feed entries older than the retention window. "
+        "Consumers whose cursor falls before it get 410 Gone and must resync."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=getattr(settings, 'CHANGEFEED_RETENTION_DAYS', 30),
+            help='Keep this many days of changes (default: CHANGEFEED_RETENTION_DAYS).',
+        )
+
+    def handle(self, *args, **options):
+        deleted = prune_changes(options['days'])
+        self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} change log entries."))
@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from tenant_network.archival import purge_deleted_properties
+
+
+class Command(BaseCommand):
+    help = (
+        "Remove soft-deleted properties and their images, videos, amenities, appointments "
+        "and reviews in small batches. Schedule it to run regularly."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours',
+            type=int,
+            default=getattr(settings, 'PROPERTY_PURGE_GRACE_HOURS', 24),
+            help='Only purge properties deleted at least this many hours ago.',
+        )
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows deleted per statement.')
+        parser.add_argument('--limit', type=int, default=None, help='Stop after this many properties.')
+
+    def handle(self, *args, **options):
+        purged = purge_deleted_properties(
+            grace=timedelta(hours=options['grace_hours']),
+            batch_size=options['batch_size'],
+            limit=options['limit'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Purged {purged} deleted properties."))
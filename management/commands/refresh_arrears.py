@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from tenant_network.ledger import open_ledgers, refresh_arrears
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute overdue rent for every rental agreement in one pass. "
+        "Run daily; balances themselves are kept up to date as payments change."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--open',
+            action='store_true',
+            help='First create balances and opening entries for agreements without a ledger.',
+        )
+
+    def handle(self, *args, **options):
+        if options['open']:
+            opened = open_ledgers()
+            self.stdout.write(f"Opened ledgers for {opened} agreements.")
+        updated = refresh_arrears()
+        self.stdout.write(self.style.SUCCESS(f"Refreshed arrears for {updated} agreements."))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from tenant_network.analytics import backfill_monthly_prices, refresh_price_benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute monthly rent percentiles per city, property type and bedroom count. "
+        "Runs incrementally by default; use --full after changes made with queryset.update(), "
+        "which the incremental run cannot see."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Rebuild every benchmark group instead of only those changed since the last run.',
+        )
+        parser.add_argument(
+            '--backfill',
+            action='store_true',
+            help='Recalculate Property.monthly_price for all rows before refreshing.',
+        )
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            updated = backfill_monthly_prices()
+            self.stdout.write(f"Normalized monthly price for {updated} properties.")
+
+        refreshed = refresh_price_benchmarks(full=options['full'] or options['backfill'])
+        self.stdout.write(self.style.SUCCESS(f"Refreshed {refreshed} price benchmark groups."))
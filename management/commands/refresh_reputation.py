@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from tenant_network.reputation import refresh_reputation
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute every user's reputation score from reviews, rent payments, "
+        "viewings and verification in one batch."
+    )
+
+    def handle(self, *args, **options):
+        scored = refresh_reputation()
+        self.stdout.write(self.style.SUCCESS(f"Scored {scored} users."))
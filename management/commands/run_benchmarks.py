@@ -0,0 +1,85 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (
+    override_settings, setup_databases, setup_test_environment, teardown_databases, teardown_test_environment,
+)
+
+from tenant_network.benchmarks import JourneyRunner, query_regressions, seed_benchmark_data
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed synthetic data into a throwaway test database and replay the main user journeys, "
+        "reporting p50/p99 latency, throughput and query counts per view."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, default=1, help='Data volume multiplier (1 = 50 properties).')
+        parser.add_argument('--iterations', type=int, default=50, help='Number of journeys to replay.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for data and journeys.')
+        parser.add_argument('--keepdb', action='store_true', help='Reuse the test database between runs.')
+        parser.add_argument('--output', help='Write the JSON report to this path.')
+        parser.add_argument('--baseline', help='JSON file mapping view label to its maximum query count.')
+        parser.add_argument(
+            '--write-baseline',
+            action='store_true',
+            help='Store the observed maximum query counts in --baseline instead of comparing.',
+        )
+        parser.add_argument(
+            '--ci',
+            action='store_true',
+            help='Exit with an error when any view exceeds its --baseline query count.',
+        )
+        parser.add_argument('--tolerance', type=int, default=0, help='Extra queries allowed over the baseline.')
+
+    def handle(self, *args, **options):
+        if (options['ci'] or options['write_baseline']) and not options['baseline']:
+            raise CommandError('--ci and --write-baseline need --baseline.')
+
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False, keepdb=options['keepdb'])
+        try:
+            seed_benchmark_data(scale=options['scale'], seed=options['seed'])
+            runner = JourneyRunner(seed=options['seed'])
+            # Every journey comes from one client IP, which throttling would block
+            with override_settings(RATELIMIT_ENABLED=False):
+                wall_time = runner.run(options['iterations'])
+            report = runner.report(wall_time)
+        finally:
+            teardown_databases(old_config, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        self.print_report(report)
+
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(report, fh, indent=2)
+
+        if options['write_baseline']:
+            baseline = {label: row['queries_max'] for label, row in report['views'].items()}
+            with open(options['baseline'], 'w') as fh:
+                json.dump(baseline, fh, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {options['baseline']}"))
+        elif options['baseline']:
+            with open(options['baseline']) as fh:
+                baseline = json.load(fh)
+            regressions = query_regressions(report, baseline, options['tolerance'])
+            for label, budget, actual in regressions:
+                self.stdout.write(self.style.ERROR(f"{label}: {actual} queries (baseline {budget})"))
+            if regressions and options['ci']:
+                raise CommandError(f"{len(regressions)} view(s) exceeded their query baseline.")
+
+    def print_report(self, report):
+        header = f"{'view':<26}{'reqs':>6}{'p50 ms':>10}{'p99 ms':>10}{'req/s':>9}{'queries':>9}{'max':>6}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for label, row in report['views'].items():
+            self.stdout.write(
+                f"{label:<26}{row['requests']:>6}{row['p50_ms']:>10}{row['p99_ms']:>10}"
+                f"{row['throughput_rps']:>9}{row['queries_mean']:>9}{row['queries_max']:>6}"
+            )
+        self.stdout.write(
+            f"\n{report['total_requests']} requests in {report['wall_time_s']}s "
+            f"({report['overall_rps']} req/s overall)"
+        )
@@ -0,0 +1,49 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from tenant_network.taskqueue import Worker, task_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued background tasks and the periodic jobs in TASKS_SCHEDULE. "
+        "Start one per server; workers coordinate through the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4, help='Tasks run at the same time.')
+        parser.add_argument(
+            '--processes',
+            action='store_true',
+            help='Use a process pool instead of threads, for CPU-bound tasks.',
+        )
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds between polls when idle.')
+        parser.add_argument('--once', action='store_true', help='Exit when no task is due.')
+        parser.add_argument(
+            '--stats',
+            type=int,
+            metavar='HOURS',
+            help='Print per-task counts and timings for the last HOURS and exit.',
+        )
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            since = timezone.now() - timedelta(hours=options['stats'])
+            for row in task_stats(since):
+                self.stdout.write(
+                    f"{row['name']}: {row['total']} run, {row['failed']} failed, "
+                    f"avg {row['avg_seconds'] or 0:.3f}s, max {row['max_seconds'] or 0:.3f}s"
+                )
+            return
+
+        worker = Worker(
+            concurrency=options['concurrency'],
+            processes=options['processes'],
+            poll_interval=options['poll_interval'],
+        )
+        self.stdout.write(f"Worker {worker.id} started with {options['concurrency']} "
+                          f"{'processes' if options['processes'] else 'threads'}.")
+        worker.run(once=options['once'])
+        self.stdout.write(self.style.SUCCESS(f"Worker {worker.id} stopped."))
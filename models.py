@@ -1,10 +1,19 @@
-from django.db import models
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.db.models.fields.files import FieldFile
+from django.db.models.functions import Lower
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
 from django.contrib.auth.models import AbstractUser, Group, Permission
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils.text import slugify
 from django.urls import reverse
+from decimal import Decimal
 import os
 import uuid
+from . import auth_cache
 
 def user_profile_pic_path(instance, filename):
     # Upload to: profile_pics/user_<id>/<filename>
@@ -47,6 +56,11 @@ class User(AbstractUser):
         ordering = ['-date_joined']
         verbose_name = 'User'
         verbose_name_plural = 'Users'
+        constraints = [
+            # Sign-in and sign-up look accounts up by LOWER(username/email)
+            models.UniqueConstraint(Lower('username'), name='user_username_ci_unique'),
+            models.UniqueConstraint(Lower('email'), name='user_email_ci_unique', condition=~models.Q(email='')),
+        ]
     
     # Custom related_name for auth models
     groups = models.ManyToManyField(
@@ -69,6 +83,39 @@ class User(AbstractUser):
     
     def get_absolute_url(self):
         return reverse('profile')
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Drop the cached snapshot used by CachedModelBackend once the change is
+        # visible; earlier, another request could cache the old row again
+        pk = self.pk
+        transaction.on_commit(lambda: auth_cache.invalidate_user(pk))
+    
+    def delete(self, *args, **kwargs):
+        pk = self.pk
+        result = super().delete(*args, **kwargs)
+        transaction.on_commit(lambda: auth_cache.invalidate_user(pk))
+        return result
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def invalidate_user_permissions(sender, instance, action, reverse, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        # Changed from the Group/Permission side, possibly for many users
+        transaction.on_commit(auth_cache.invalidate_all_permissions)
+    else:
+        pk = instance.pk
+        transaction.on_commit(lambda: auth_cache.invalidate_user(pk))
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=Permission)
+def invalidate_group_permissions(sender, **kwargs):
+    action = kwargs.get('action')
+    if action is None or action.startswith('post_'):
+        transaction.on_commit(auth_cache.invalidate_all_permissions)
 
 class VerificationDocument(models.Model):
     DOCUMENT_TYPES = [
@@ -96,6 +143,13 @@ class VerificationDocument(models.Model):
     def __str__(self):
         return f"{self.user.username}'s {self.get_document_type_display()}"
 
+class LivePropertyManager(models.Manager):
+    """Hide soft-deleted properties; use ``Property.all_objects`` to see them."""
+    
+    def get_queryset(self):
+        # The main image is on nearly every page that shows a listing
+        return super().get_queryset().filter(deleted_at__isnull=True).select_related('main_image')
+
 class Property(models.Model):
     PROPERTY_CATEGORIES = [
         ('apartment', 'Apartment'),
@@ -112,6 +166,13 @@ class Property(models.Model):
         ('day', 'Daily'),
     ]
     
+    # Multipliers that turn a per-frequency price into a monthly equivalent
+    MONTHLY_PRICE_FACTORS = {
+        'month': Decimal('1'),
+        'week': Decimal('52') / Decimal('12'),
+        'day': Decimal('365') / Decimal('12'),
+    }
+    
     landlord = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -124,6 +185,14 @@ class Property(models.Model):
     property_type = models.CharField(max_length=20, choices=PROPERTY_CATEGORIES)
     price = models.DecimalField(max_digits=12, decimal_places=2)
     rental_frequency = models.CharField(max_length=10, choices=RENTAL_FREQUENCIES, default='month')
+    monthly_price = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Price normalized to a monthly equivalent, maintained on save"
+    )
     bedrooms = models.PositiveIntegerField(validators=[MinValueValidator(1)])
     bathrooms = models.PositiveIntegerField(validators=[MinValueValidator(1)])
     sqft = models.PositiveIntegerField(verbose_name="Area (sqft)")
@@ -135,6 +204,26 @@ class Property(models.Model):
     longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     is_verified = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
+    deleted_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Set when the landlord deletes the listing; related rows are purged in the background"
+    )
+    # Maintained in batches by popularity.flush_counters(), never by save()
+    view_count = models.PositiveBigIntegerField(default=0, editable=False)
+    impression_count = models.PositiveBigIntegerField(default=0, editable=False)
+    popularity = models.FloatField(default=0, editable=False)
+    popularity_updated_at = models.DateTimeField(null=True, blank=True, editable=False)
+    main_image = models.ForeignKey(
+        'PropertyImage',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='+',
+        help_text="Kept in step with PropertyImage.is_main by set_main_image()"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     favorited_by = models.ManyToManyField(
@@ -143,20 +232,56 @@ class Property(models.Model):
         blank=True
     )
     
+    objects = LivePropertyManager()
+    all_objects = models.Manager()
+    
     class Meta:
         verbose_name_plural = 'Properties'
         ordering = ['-created_at']
+        base_manager_name = 'all_objects'
         indexes = [
             models.Index(fields=['-created_at']),
             models.Index(fields=['is_active']),
             models.Index(fields=['is_verified']),
             models.Index(fields=['slug']),
+            models.Index(fields=['monthly_price']),
+            models.Index(fields=['deleted_at']),
+            models.Index(fields=['is_active', '-popularity'], name='property_trending_idx'),
         ]
     
     def __str__(self):
         return f"{self.title} - {self.city}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so moving to another benchmark group marks the old one stale,
+        # and hiding or showing the listing republishes its rows in the change feed
+        if len(values) == len(cls._meta.concrete_fields):
+            instance._loaded_benchmark_group = instance.benchmark_group()
+            instance._loaded_listed = instance.is_listed()
+        return instance
+    
+    def is_listed(self):
+        """Whether the public sees this listing (active and not soft-deleted)."""
+        return self.is_active and self.deleted_at is None
+    
+    def benchmark_group(self):
+        """The PriceBenchmark (city, property_type, bedrooms) this listing counts towards."""
+        return ((self.city or '').lower(), self.property_type, self.bedrooms)
+    
+    def compute_monthly_price(self):
+        if self.price is None:
+            return None
+        factor = self.MONTHLY_PRICE_FACTORS.get(self.rental_frequency, Decimal('1'))
+        return (Decimal(self.price) * factor).quantize(Decimal('0.01'))
+    
     def save(self, *args, **kwargs):
+        self.monthly_price = self.compute_monthly_price()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'price', 'rental_frequency'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'monthly_price'}
+        
         if not self.slug:
             if not self.id:
                 super().save(*args, **kwargs)
@@ -165,7 +290,7 @@ class Property(models.Model):
             self.slug = base_slug
             
             counter = 1
-            while Property.objects.filter(slug=self.slug).exclude(pk=self.pk).exists():
+            while Property.all_objects.filter(slug=self.slug).exclude(pk=self.pk).exists():
                 self.slug = f"{base_slug}-{counter}"
                 counter += 1
         
@@ -174,9 +299,37 @@ class Property(models.Model):
     def get_absolute_url(self):
         return reverse('property_detail', kwargs={'pk': self.pk, 'slug': self.slug})
     
-    @property
-    def main_image(self):
-        return self.images.filter(is_main=True).first() or self.images.first()
+    def soft_delete(self):
+        """Hide the listing now; purge_deleted_properties removes it and its rows later."""
+        self.deleted_at = timezone.now()
+        self.save(update_fields=['deleted_at', 'updated_at'])
+    
+    def set_main_image(self, image):
+        """
+        Make ``image`` (one of this listing's images, or None) the main image.
+
+        The listing row is locked first so concurrent calls queue up instead
+        of tripping the one-main-image constraint.
+        """
+        if image is not None and image.property_id != self.pk:
+            raise ValueError("The main image must belong to the property.")
+        with transaction.atomic():
+            list(Property.all_objects.select_for_update().filter(pk=self.pk).values_list('pk'))
+            images = PropertyImage.objects.filter(property_id=self.pk)
+            # Clear before setting: the partial unique index is checked row by row
+            images.filter(is_main=True).exclude(pk=getattr(image, 'pk', None)).update(is_main=False)
+            if image is not None:
+                images.filter(pk=image.pk).update(is_main=True)
+                image.is_main = True
+            self.main_image = image
+            self.save(update_fields=['main_image', 'updated_at'])
+    
+    @classmethod
+    def sync_main_images(cls, queryset):
+        """Point ``main_image`` at the is_main image, e.g. after bulk-loading images."""
+        return queryset.update(main_image=models.Subquery(
+            PropertyImage.objects.filter(property=models.OuterRef('pk'), is_main=True).values('pk')[:1]
+        ))
 
 class PropertyImage(models.Model):
     property = models.ForeignKey(
@@ -191,19 +344,34 @@ class PropertyImage(models.Model):
     is_main = models.BooleanField(default=False)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     caption = models.CharField(max_length=100, blank=True)
+    # Filled in by gallery.add_images(); identical uploads share one stored file
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True, editable=False)
+    perceptual_hash = models.BigIntegerField(null=True, blank=True, editable=False)
+    similar_to = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='near_duplicates',
+        help_text="An earlier image of the landlord's that this one looks like"
+    )
 
     class Meta:
         verbose_name = 'Property Image'
         verbose_name_plural = 'Property Images'
         ordering = ['-is_main', 'uploaded_at']
+        constraints = [
+            # Change the main image with Property.set_main_image()
+            models.UniqueConstraint(
+                fields=['property'],
+                condition=models.Q(is_main=True),
+                name='one_main_image_per_property'
+            ),
+        ]
     
     def __str__(self):
         return f"Image for {self.property.title}"
-    
-    def save(self, *args, **kwargs):
-        if self.is_main:
-            PropertyImage.objects.filter(property=self.property).exclude(pk=self.pk).update(is_main=False)
-        super().save(*args, **kwargs)
 
 class PropertyVideo(models.Model):
     property = models.ForeignKey(
@@ -237,6 +405,7 @@ class Amenity(models.Model):
     )
     description = models.CharField(max_length=200, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name_plural = 'Amenities'
@@ -254,10 +423,21 @@ class PropertyAmenity(models.Model):
         verbose_name = 'Property Amenity'
         verbose_name_plural = 'Property Amenities'
         unique_together = ('property', 'amenity')
+        indexes = [
+            # Listings per amenity, for amenity filters (see amenities.with_amenities)
+            models.Index(fields=['amenity', 'property'], name='property_amenity_filter_idx'),
+        ]
     
     def __str__(self):
         return f"{self.property.title} - {self.amenity.name}"
 
+@receiver(post_save, sender=Amenity)
+@receiver(post_delete, sender=Amenity)
+def invalidate_amenity_catalog(sender, **kwargs):
+    from .amenities import invalidate_catalog
+    # After commit, so no process reloads the catalog before the change is visible
+    transaction.on_commit(invalidate_catalog)
+
 class Message(models.Model):
     sender = models.ForeignKey(
         User,
@@ -394,6 +574,10 @@ class RentalAgreement(models.Model):
     signed_by_landlord = models.BooleanField(default=False)
     signed_by_tenant = models.BooleanField(default=False)
     signed_at = models.DateTimeField(null=True, blank=True)
+    # Signed PDF rendered by tasks.generate_agreement_document (see documents.py)
+    document = models.FileField(upload_to='agreements/', blank=True, editable=False)
+    document_version = models.CharField(max_length=64, blank=True, editable=False)
+    document_generated_at = models.DateTimeField(null=True, blank=True, editable=False)
     
     class Meta:
         ordering = ['-created_at']
@@ -426,6 +610,7 @@ class Payment(models.Model):
     payment_method = models.CharField(max_length=20, choices=PAYMENT_METHODS)
     status = models.CharField(max_length=20, choices=PAYMENT_STATUS, default='pending')
     transaction_id = models.CharField(max_length=100, blank=True)
+    stripe_client_secret = models.CharField(max_length=255, blank=True, editable=False)
     payment_date = models.DateField()
     due_date = models.DateField()
     receipt_url = models.URLField(blank=True)
@@ -433,6 +618,498 @@ class Payment(models.Model):
     
     class Meta:
         ordering = ['-payment_date']
+        indexes = [
+            # Arrears: unpaid installments past their due date, per agreement
+            models.Index(fields=['rental_agreement', 'status', 'due_date']),
+        ]
+    
+    def __str__(self):
+        return f"Payment of ${self.amount} for {self.rental_agreement.property.title}"
+    
+    def save(self, *args, **kwargs):
+        from .ledger import post_payment
+        # Status changes made with QuerySet.update() bypass the ledger; use save()
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                previous = Payment.objects.select_for_update().filter(pk=self.pk).values(
+                    'status', 'amount', 'due_date'
+                ).first()
+            super().save(*args, **kwargs)
+            post_payment(self, previous)
+
+class AgreementBalance(models.Model):
+    """
+    Running totals for one agreement, kept by ledger.post_payment() in the
+    same transaction as the payment change. ``balance`` is what the tenant
+    owes overall; the overdue columns are refreshed for all agreements at
+    once by ledger.refresh_arrears().
+    """
+    agreement = models.OneToOneField(
+        RentalAgreement,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='balance'
+    )
+    charged = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    paid = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    balance = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    overdue_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    overdue_since = models.DateField(null=True, blank=True)
+    arrears_refreshed_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Agreement Balance'
+        verbose_name_plural = 'Agreement Balances'
+        indexes = [
+            models.Index(
+                fields=['-overdue_amount'],
+                condition=models.Q(overdue_amount__gt=0),
+                name='agreement_balance_arrears_idx'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"Balance of ${self.balance} on agreement {self.agreement_id}"
+
+class LedgerEntry(models.Model):
+    """Append-only record of every change to an agreement's balance."""
+    CHARGE = 'charge'
+    PAYMENT = 'payment'
+    KINDS = [
+        (CHARGE, 'Charge'),
+        (PAYMENT, 'Payment'),
+    ]
+    
+    agreement = models.ForeignKey(RentalAgreement, on_delete=models.CASCADE, related_name='ledger_entries')
+    # A plain id: payments are partitioned and archived, the ledger keeps everything
+    payment_id = models.BigIntegerField(null=True, blank=True)
+    kind = models.CharField(max_length=10, choices=KINDS)
+    amount = models.DecimalField(max_digits=12, decimal_places=2, help_text="Positive amounts raise the balance owed")
+    balance_after = models.DecimalField(max_digits=12, decimal_places=2)
+    payment_status = models.CharField(max_length=20, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Ledger Entry'
+        verbose_name_plural = 'Ledger Entries'
+        ordering = ['-id']
+        indexes = [
+            models.Index(fields=['agreement', '-id']),
+            models.Index(fields=['payment_id']),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} of ${self.amount} on agreement {self.agreement_id}"
+
+class PriceBenchmark(models.Model):
+    city = models.CharField(max_length=100, help_text="Lower-cased city name")
+    property_type = models.CharField(max_length=20, choices=Property.PROPERTY_CATEGORIES)
+    bedrooms = models.PositiveIntegerField()
+    p25 = models.DecimalField(max_digits=12, decimal_places=2)
+    p50 = models.DecimalField(max_digits=12, decimal_places=2)
+    p75 = models.DecimalField(max_digits=12, decimal_places=2)
+    sample_size = models.PositiveIntegerField(default=0)
+    refreshed_at = models.DateTimeField(auto_now=True)
+    stale = models.BooleanField(default=False, help_text="A listing left this group since the last refresh")
+    
+    class Meta:
+        verbose_name = 'Price Benchmark'
+        verbose_name_plural = 'Price Benchmarks'
+        ordering = ['city', 'property_type', 'bedrooms']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['city', 'property_type', 'bedrooms'],
+                name='unique_price_benchmark_group'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.city} {self.get_property_type_display()} {self.bedrooms}bd: median ${self.p50}/month"
+
+class ReputationScore(models.Model):
+    """
+    Trust score per user, rebuilt in batch by reputation.refresh_reputation().
+    Rates are smoothed towards the site-wide average, so a user with little
+    history scores near the middle rather than at either extreme.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='reputation'
+    )
+    score = models.FloatField(help_text="0-100, weighted from the components below")
+    review_rating = models.FloatField(help_text="Smoothed average of approved reviews received (1-5)")
+    review_count = models.PositiveIntegerField(default=0)
+    on_time_rate = models.FloatField(help_text="Share of due rent paid by the due date (tenants)")
+    payment_count = models.PositiveIntegerField(default=0)
+    completion_rate = models.FloatField(help_text="Share of settled viewings that took place")
+    cancellation_rate = models.FloatField(help_text="Share of viewings that were canceled")
+    appointment_count = models.PositiveIntegerField(default=0)
+    is_verified = models.BooleanField(default=False)
+    computed_at = models.DateTimeField()
+    
+    class Meta:
+        verbose_name = 'Reputation Score'
+        verbose_name_plural = 'Reputation Scores'
+        indexes = [
+            models.Index(fields=['-score']),
+        ]
     
     def __str__(self):
-        return f"Payment of ${self.amount} for {self.rental_agreement.property.title}"
\ No newline at end of file
+        return f"{self.user}: {self.score:.0f}"
+
+
+class ArchivedMessage(models.Model):
+    """Cold copy of a Message; ids are kept but not enforced as foreign keys."""
+    id = models.BigIntegerField(primary_key=True)
+    sender_id = models.BigIntegerField()
+    recipient_id = models.BigIntegerField()
+    property_id = models.BigIntegerField(null=True, blank=True)
+    subject = models.CharField(max_length=200)
+    body = models.TextField()
+    is_read = models.BooleanField(default=False)
+    sent_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-sent_at']
+        indexes = [
+            models.Index(fields=['sender_id', '-sent_at']),
+            models.Index(fields=['recipient_id', '-sent_at']),
+        ]
+    
+    def __str__(self):
+        return f"Archived message {self.id}"
+
+class ArchivedAppointment(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    property_id = models.BigIntegerField()
+    requester_id = models.BigIntegerField()
+    landlord_id = models.BigIntegerField()
+    requested_date = models.DateTimeField()
+    message = models.TextField(blank=True)
+    status = models.CharField(max_length=20, choices=Appointment.STATUS_CHOICES)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-requested_date']
+        indexes = [
+            models.Index(fields=['requester_id', '-requested_date']),
+            models.Index(fields=['landlord_id', '-requested_date']),
+        ]
+    
+    def __str__(self):
+        return f"Archived appointment {self.id}"
+
+class ArchivedPayment(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    rental_agreement_id = models.BigIntegerField()
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    payment_method = models.CharField(max_length=20, choices=Payment.PAYMENT_METHODS)
+    status = models.CharField(max_length=20, choices=Payment.PAYMENT_STATUS)
+    transaction_id = models.CharField(max_length=100, blank=True)
+    payment_date = models.DateField()
+    due_date = models.DateField()
+    receipt_url = models.URLField(blank=True)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-payment_date']
+        indexes = [
+            models.Index(fields=['rental_agreement_id', '-payment_date']),
+        ]
+    
+    def __str__(self):
+        return f"Archived payment {self.id} of ${self.amount}"
+
+class SavedSearch(models.Model):
+    """
+    A tenant's listing filters stored as ranges, so a new listing can be
+    matched by querying searches instead of re-running every search.
+    Empty city/type and null bounds mean "any".
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='saved_searches')
+    name = models.CharField(max_length=100, blank=True)
+    city = models.CharField(max_length=100, blank=True, help_text="Lower-cased city name")
+    property_type = models.CharField(max_length=20, choices=Property.PROPERTY_CATEGORIES, blank=True)
+    min_bedrooms = models.PositiveIntegerField(null=True, blank=True)
+    max_bedrooms = models.PositiveIntegerField(null=True, blank=True)
+    min_price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True,
+                                    help_text="Monthly equivalent")
+    max_price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True,
+                                    help_text="Monthly equivalent")
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Saved Search'
+        verbose_name_plural = 'Saved Searches'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['city', 'property_type', 'min_price'], condition=models.Q(is_active=True),
+                         name='saved_search_match_idx'),
+        ]
+    
+    def __str__(self):
+        return self.name or self.describe()
+    
+    @staticmethod
+    def data_from_params(params):
+        """Form data for SavedSearchForm from listing-page parameters (see search.filter_properties)."""
+        bedrooms = (params.get('bedrooms') or '').strip()
+        return {
+            'name': params.get('name', '')[:100],
+            'city': (params.get('location') or '').strip().lower(),
+            'property_type': params.get('property_type') or '',
+            'min_bedrooms': bedrooms,
+            # The listing page treats 3 as "3 or more"
+            'max_bedrooms': '' if bedrooms == '3' else bedrooms,
+            'min_price': params.get('min_price') or '',
+            'max_price': params.get('max_price') or '',
+        }
+    
+    def to_params(self):
+        params = {}
+        if self.city:
+            params['location'] = self.city
+        if self.property_type:
+            params['property_type'] = self.property_type
+        if self.min_bedrooms:
+            params['bedrooms'] = self.min_bedrooms
+        if self.min_price is not None:
+            params['min_price'] = self.min_price
+        if self.max_price is not None:
+            params['max_price'] = self.max_price
+        return params
+    
+    def describe(self):
+        parts = [self.get_property_type_display() if self.property_type else 'Any type']
+        if self.city:
+            parts.append(f"in {self.city.title()}")
+        if self.min_bedrooms:
+            parts.append(f"{self.min_bedrooms}{'+' if self.max_bedrooms is None else ''} bed")
+        if self.min_price is not None or self.max_price is not None:
+            parts.append(f"${self.min_price or 0}-{self.max_price or 'any'}/month")
+        return ', '.join(parts)
+
+class SavedSearchMatch(models.Model):
+    search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name='matches')
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='saved_search_matches')
+    matched_at = models.DateTimeField(auto_now_add=True)
+    notified_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['search', 'property'], name='unique_saved_search_match'),
+        ]
+        indexes = [
+            models.Index(fields=['notified_at', 'search']),
+        ]
+    
+    def __str__(self):
+        return f"{self.property} matches {self.search}"
+
+class ChangeLogEntry(models.Model):
+    """
+    Append-only record of listing and message changes, read by the change feed.
+
+    ``seq`` only grows, so consumers resume from the last one they applied.
+    Messages carry their sender and recipient so each user sees only their own.
+    """
+    CREATE = 'create'
+    UPDATE = 'update'
+    DELETE = 'delete'
+    # Moved to an Archived* table; still exists, just no longer live
+    ARCHIVE = 'archive'
+    ACTIONS = (
+        (CREATE, 'Create'),
+        (UPDATE, 'Update'),
+        (DELETE, 'Delete'),
+        (ARCHIVE, 'Archive'),
+    )
+    
+    seq = models.BigAutoField(primary_key=True)
+    model = models.CharField(max_length=30)
+    object_id = models.PositiveBigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTIONS)
+    data = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    sender_id = models.PositiveBigIntegerField(null=True, blank=True)
+    recipient_id = models.PositiveBigIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Change Log Entry'
+        verbose_name_plural = 'Change Log'
+        ordering = ['seq']
+        indexes = [
+            models.Index(fields=['model', 'seq']),
+            models.Index(fields=['sender_id', 'seq']),
+            models.Index(fields=['recipient_id', 'seq']),
+            models.Index(fields=['created_at']),
+        ]
+    
+    def __str__(self):
+        return f"#{self.seq} {self.action} {self.model} {self.object_id}"
+
+class Task(models.Model):
+    """A unit of deferred work, claimed and run by ``manage.py run_worker``."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    )
+    
+    name = models.CharField(max_length=200)
+    args = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+    kwargs = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    priority = models.SmallIntegerField(default=0, help_text="Higher runs first")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    dedupe_key = models.CharField(max_length=200, null=True, blank=True, unique=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration = models.FloatField(null=True, blank=True, help_text="Seconds spent in the last attempt")
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-priority', 'run_at']
+        indexes = [
+            models.Index(fields=['status', '-priority', 'run_at']),
+            models.Index(fields=['name', 'finished_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+def _changelog_visible(instance):
+    # Hidden rows are announced as deletes so mirrors drop them; the images,
+    # amenities and reviews of a hidden listing are hidden with it
+    if isinstance(instance, Property):
+        return instance.is_listed()
+    if isinstance(instance, Review) and not instance.is_approved:
+        return False
+    if isinstance(instance, (PropertyImage, PropertyAmenity, Review)) and instance.property_id is not None:
+        return Property.objects.filter(pk=instance.property_id, is_active=True).exists()
+    return True
+
+def _changelog_snapshot(instance):
+    data = {}
+    for field in instance._meta.concrete_fields:
+        value = field.value_from_object(instance)
+        data[field.attname] = value.name if isinstance(value, FieldFile) else value
+    return data
+
+def record_change(instance, action):
+    """Queue a change-log row for ``instance``, written once the transaction commits."""
+    if not getattr(settings, 'CHANGEFEED_ENABLED', True):
+        return
+    if action != ChangeLogEntry.DELETE and not _changelog_visible(instance):
+        action = ChangeLogEntry.DELETE
+    entry = ChangeLogEntry(
+        model=instance._meta.model_name,
+        object_id=instance.pk,
+        action=action,
+        data=None if action == ChangeLogEntry.DELETE else _changelog_snapshot(instance),
+    )
+    if isinstance(instance, Message):
+        entry.sender_id = instance.sender_id
+        entry.recipient_id = instance.recipient_id
+    # Writing on commit keeps rolled-back changes out and seq close to commit order
+    transaction.on_commit(entry.save)
+
+def record_archived(model, rows):
+    """Log ARCHIVE entries for ``rows`` (dicts with 'id'), which archival.py deletes without signals."""
+    if not getattr(settings, 'CHANGEFEED_ENABLED', True):
+        return
+    entries = [
+        ChangeLogEntry(
+            model=model._meta.model_name, object_id=row['id'], action=ChangeLogEntry.ARCHIVE,
+            sender_id=row.get('sender_id'), recipient_id=row.get('recipient_id'),
+        )
+        for row in rows
+    ]
+    transaction.on_commit(lambda: ChangeLogEntry.objects.bulk_create(entries))
+
+def record_bulk_changes(queryset):
+    """Record updates made with ``QuerySet.update()``, which sends no signals."""
+    for instance in queryset.iterator():
+        record_change(instance, ChangeLogEntry.UPDATE)
+
+@receiver(post_save, sender=Property)
+@receiver(post_save, sender=PropertyImage)
+@receiver(post_save, sender=PropertyAmenity)
+@receiver(post_save, sender=Review)
+@receiver(post_save, sender=Message)
+def log_saved_change(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        record_change(instance, ChangeLogEntry.CREATE if created else ChangeLogEntry.UPDATE)
+
+@receiver(post_delete, sender=Property)
+@receiver(post_delete, sender=PropertyImage)
+@receiver(post_delete, sender=PropertyAmenity)
+@receiver(post_delete, sender=Review)
+@receiver(post_delete, sender=Message)
+def log_deleted_change(sender, instance, **kwargs):
+    record_change(instance, ChangeLogEntry.DELETE)
+
+@receiver(post_save, sender=Property)
+def log_listing_rows_change(sender, instance, created, raw=False, **kwargs):
+    # A listing hidden or shown again takes its images, amenities and reviews with it
+    was_listed = getattr(instance, '_loaded_listed', None)
+    listed = instance.is_listed()
+    instance._loaded_listed = listed
+    if raw or created or was_listed is None or was_listed == listed:
+        return
+    action = ChangeLogEntry.UPDATE if listed else ChangeLogEntry.DELETE
+    for rows in (instance.images.all(), instance.amenities.all(), instance.reviews.all()):
+        for row in rows.iterator():
+            record_change(row, action)
+
+# Property fields a saved search can filter on; other edits never change a match
+SAVED_SEARCH_FIELDS = frozenset({
+    'city', 'property_type', 'bedrooms', 'price', 'rental_frequency', 'is_active', 'deleted_at',
+})
+
+@receiver(post_save, sender=Property)
+def queue_saved_search_match(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # Also queued when a listing is deactivated or deleted, which drops its unsent matches
+    if raw or (created and not instance.is_active):
+        return
+    if update_fields is not None and not SAVED_SEARCH_FIELDS & set(update_fields):
+        return
+    from .taskqueue import enqueue
+    transaction.on_commit(lambda: enqueue('tenant_network.tasks.match_saved_searches', [instance.pk]))
+
+def _mark_benchmark_stale(group):
+    city, property_type, bedrooms = group
+    PriceBenchmark.objects.filter(city=city, property_type=property_type, bedrooms=bedrooms).update(stale=True)
+
+@receiver(post_save, sender=Property)
+def mark_left_benchmark_group(sender, instance, raw=False, **kwargs):
+    # The new group is found through updated_at; only the group it left needs marking
+    old = getattr(instance, '_loaded_benchmark_group', None)
+    group = instance.benchmark_group()
+    if not raw and old is not None and old != group:
+        _mark_benchmark_stale(old)
+    instance._loaded_benchmark_group = group
+
+@receiver(post_delete, sender=Property)
+def mark_deleted_benchmark_group(sender, instance, **kwargs):
+    _mark_benchmark_stale(getattr(instance, '_loaded_benchmark_group', None) or instance.benchmark_group())
+
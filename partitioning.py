@@ -0,0 +1,206 @@
+"""
+Monthly range partitioning of the time-ordered tables on PostgreSQL.
+
+Partitions are named ``<table>_pYYYYMM`` and hold one calendar month; a
+``<table>_default`` partition catches anything outside the managed range
+(e.g. appointments booked far ahead) until that month's partition is
+created, which moves the rows over.
+Postgres requires the partition key in every unique constraint, so a
+converted table's primary key becomes ``(id, <date column>)``. The Django
+models still declare ``id`` alone as their primary key: ``id`` comes from
+one sequence shared by all partitions, so it stays unique in practice and
+pk lookups keep working, but the database no longer enforces it.
+
+Needs PostgreSQL 14 or later (Django 5.2's own minimum; 11 is enough for
+partitioned primary keys and DEFAULT partitions). Identity columns on
+partitioned tables only arrived in PostgreSQL 17, so converted tables take
+``id`` from a plain owned sequence instead. Other databases keep plain
+tables; check ``is_supported()`` first.
+"""
+import re
+from datetime import date, datetime
+
+from django.db import connection, transaction
+
+from .models import Appointment, Message, Payment
+
+PARTITIONED_MODELS = (
+    (Message, 'sent_at'),
+    (Payment, 'payment_date'),
+    (Appointment, 'requested_date'),
+)
+
+PARTITION_SUFFIX = re.compile(r'_p(\d{4})(\d{2})$')
+
+
+def is_supported():
+    return connection.vendor == 'postgresql'
+
+
+def month_start(day, offset=0):
+    months = day.year * 12 + day.month - 1 + offset
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def _as_date(value):
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _qn(name):
+    return connection.ops.quote_name(name)
+
+
+def is_partitioned(table):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = %s AND pg_table_is_visible(c.oid)",
+            [table],
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions(table):
+    """Return ``{first day of month: partition name}`` for the monthly partitions."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = %s AND pg_table_is_visible(p.oid)",
+            [table],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    partitions = {}
+    for name in names:
+        match = PARTITION_SUFFIX.search(name)
+        if match:
+            partitions[date(int(match.group(1)), int(match.group(2)), 1)] = name
+    return partitions
+
+
+def create_partition(table, column, month):
+    """
+    Create the partition for ``month``. Postgres refuses it while the DEFAULT
+    partition holds rows of that month, so those are moved into it: DEFAULT
+    is detached, the partition created and filled, then DEFAULT re-attached.
+    """
+    name = f'{table}_p{month:%Y%m}'
+    default = f'{table}_default'
+    bounds = [month.isoformat(), month_start(month, 1).isoformat()]
+    in_month = f"{_qn(column)} >= %s AND {_qn(column)} < %s"
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s), to_regclass(%s)", [_qn(name), _qn(default)])
+        exists, has_default = cursor.fetchone()
+        if exists:
+            return name
+        stranded = False
+        if has_default:
+            cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {_qn(default)} WHERE {in_month})", bounds)
+            stranded = cursor.fetchone()[0]
+        if stranded:
+            cursor.execute(f"ALTER TABLE {_qn(table)} DETACH PARTITION {_qn(default)}")
+        cursor.execute(
+            f"CREATE TABLE {_qn(name)} PARTITION OF {_qn(table)} FOR VALUES FROM (%s) TO (%s)", bounds,
+        )
+        if stranded:
+            cursor.execute(f"INSERT INTO {_qn(name)} SELECT * FROM {_qn(default)} WHERE {in_month}", bounds)
+            cursor.execute(f"DELETE FROM {_qn(default)} WHERE {in_month}", bounds)
+            cursor.execute(f"ALTER TABLE {_qn(table)} ATTACH PARTITION {_qn(default)} DEFAULT")
+    return name
+
+
+def convert_table(model, column, months_ahead=3):
+    """
+    Rebuild ``model``'s table as a partitioned table holding the same rows.
+
+    Takes an exclusive lock for the length of the copy, so run it in a
+    maintenance window. Returns False if the table was already partitioned.
+    """
+    table = model._meta.db_table
+    if is_partitioned(table):
+        return False
+    old = f'{table}_unpartitioned'
+    sequence = f'{table}_partitioned_id_seq'
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {_qn(table)} IN ACCESS EXCLUSIVE MODE")
+        cursor.execute(
+            "SELECT indexdef FROM pg_indexes WHERE tablename = %s "
+            "AND indexname NOT IN (SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass)",
+            [table, table],
+        )
+        index_sql = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'f'",
+            [table],
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(f"SELECT MIN({_qn(column)}), MAX({_qn(column)}) FROM {_qn(table)}")
+        oldest, newest = cursor.fetchone()
+
+        cursor.execute(f"ALTER TABLE {_qn(table)} RENAME TO {_qn(old)}")
+        cursor.execute(
+            f"CREATE TABLE {_qn(table)} (LIKE {_qn(old)} INCLUDING DEFAULTS "
+            f"INCLUDING CONSTRAINTS) PARTITION BY RANGE ({_qn(column)})"
+        )
+        cursor.execute(f"CREATE SEQUENCE IF NOT EXISTS {_qn(sequence)} OWNED BY {_qn(table)}.id")
+        cursor.execute(
+            f"ALTER TABLE {_qn(table)} ALTER COLUMN id SET DEFAULT nextval(%s::regclass)", [sequence],
+        )
+        cursor.execute(f"ALTER TABLE {_qn(table)} ADD PRIMARY KEY (id, {_qn(column)})")
+        cursor.execute(f"CREATE TABLE {_qn(table + '_default')} PARTITION OF {_qn(table)} DEFAULT")
+
+        today = date.today()
+        first = month_start(_as_date(oldest) if oldest else today)
+        last = month_start(max(_as_date(newest), today) if newest else today, months_ahead)
+        month = first
+        while month <= last:
+            create_partition(table, column, month)
+            month = month_start(month, 1)
+
+        cursor.execute(f"INSERT INTO {_qn(table)} SELECT * FROM {_qn(old)}")
+        cursor.execute(f"DROP TABLE {_qn(old)}")
+        # Indexes and foreign keys went with the old table; recreate them on the parent
+        for sql in index_sql:
+            cursor.execute(sql.replace(f' ON {old} ', f' ON {table} ').replace(
+                f' ON public.{old} ', f' ON public.{table} '))
+        for name, definition in foreign_keys:
+            cursor.execute(f"ALTER TABLE {_qn(table)} ADD CONSTRAINT {_qn(name)} {definition}")
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence(%s, 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {_qn(table)}",
+            [table],
+        )
+    return True
+
+
+def maintain_partitions(model, column, months_ahead=3, retain_months=None, drop=False):
+    """
+    Create partitions up to ``months_ahead`` and detach (or drop) those older
+    than ``retain_months``. Returns ``(created, removed)`` partition names.
+    """
+    table = model._meta.db_table
+    if not is_partitioned(table):
+        return [], []
+
+    existing = list_partitions(table)
+    this_month = month_start(date.today())
+    created = []
+    for offset in range(months_ahead + 1):
+        month = month_start(this_month, offset)
+        if month not in existing:
+            created.append(create_partition(table, column, month))
+
+    removed = []
+    if retain_months:
+        cutoff = month_start(this_month, -retain_months)
+        with connection.cursor() as cursor:
+            for month, name in sorted(existing.items()):
+                if month >= cutoff:
+                    break
+                cursor.execute(f"ALTER TABLE {_qn(table)} DETACH PARTITION {_qn(name)}")
+                if drop:
+                    cursor.execute(f"DROP TABLE {_qn(name)}")
+                removed.append(name)
+    return created, removed
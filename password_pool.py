@@ -0,0 +1,73 @@
+"""
+Password hashing on a small dedicated thread pool.
+
+Hashing is deliberately slow, so a burst of logins or sign-ups can take
+every CPU and starve ordinary page views. Running the hasher here caps
+how many hash at once (PASSWORD_HASH_WORKERS) and how many may wait for
+a worker (PASSWORD_HASH_MAX_PENDING). A caller that cannot get a slot
+within PASSWORD_HASH_WAIT_SECONDS gets HasherBusy instead of joining an
+ever-growing queue. The hashers release the GIL while they work, and
+nothing in the pool touches the database.
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, get_hasher, identify_hasher, make_password
+
+_lock = threading.Lock()
+_executor = None
+_slots = None
+
+
+class HasherBusy(Exception):
+    """No password hashing slot became free in time."""
+
+
+def _pool():
+    global _executor, _slots
+    with _lock:
+        if _executor is None:
+            workers = settings.PASSWORD_HASH_WORKERS
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+            _slots = threading.BoundedSemaphore(workers + settings.PASSWORD_HASH_MAX_PENDING)
+    return _executor, _slots
+
+
+def submit(func, *args):
+    """Run ``func(*args)`` on the pool and return its future, or raise HasherBusy."""
+    executor, slots = _pool()
+    if not slots.acquire(timeout=settings.PASSWORD_HASH_WAIT_SECONDS):
+        raise HasherBusy
+    try:
+        future = executor.submit(func, *args)
+    except BaseException:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    return future
+
+
+def hash_password(raw_password):
+    return submit(make_password, raw_password).result()
+
+
+def verify_password(raw_password, encoded):
+    return submit(check_password, raw_password, encoded).result()
+
+
+async def averify_password(raw_password, encoded):
+    # Waiting for a slot blocks, so do that off the event loop too
+    future = await asyncio.to_thread(submit, check_password, raw_password, encoded)
+    return await asyncio.wrap_future(future)
+
+
+def needs_rehash(encoded):
+    """Whether ``encoded`` was made with an outdated hasher or work factor."""
+    preferred = get_hasher('default')
+    try:
+        hasher = identify_hasher(encoded)
+    except ValueError:
+        return False
+    return hasher.algorithm != preferred.algorithm or preferred.must_update(encoded)
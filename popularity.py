@@ -0,0 +1,192 @@
+"""
+View and impression counters with time-decayed popularity.
+
+Hits are buffered (per process, or in Redis when several servers share
+the load) and written by ``flush_counters()`` in one batched UPDATE, so a
+busy listing never makes requests queue on its row lock.
+
+``Property.popularity`` is the log of the decayed hit weight measured
+against a fixed epoch: each hit adds ``weight * 2 ** (hours since epoch /
+half-life)``. Older hits therefore count for less without ever rewriting
+the rows of listings nobody looks at, and ordering by the column (which is
+indexed) gives the trending order at any moment.
+"""
+import atexit
+import math
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Value, When
+from django.utils import timezone
+
+from .models import Property
+
+EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+VIEW_WEIGHT = 1.0
+IMPRESSION_WEIGHT = 0.05
+
+
+class LocalCounterBuffer:
+    """Per-process buffer; the request that finds it stale flushes it."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = defaultdict(lambda: [0, 0])
+        self._last_flush = time.monotonic()
+
+    def add(self, pk, views=0, impressions=0):
+        with self._lock:
+            counts = self._pending[pk]
+            counts[0] += views
+            counts[1] += impressions
+
+    def drain(self):
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(lambda: [0, 0])
+            self._last_flush = time.monotonic()
+        return {pk: tuple(counts) for pk, counts in pending.items()}
+
+    def due(self, interval):
+        return time.monotonic() - self._last_flush >= interval
+
+
+class RedisCounterBuffer:
+    """Buffer shared by all servers; drained by the flush_view_counters task."""
+
+    def __init__(self, alias='default'):
+        cache = caches[alias]
+        if not hasattr(cache, '_cache') or not hasattr(cache._cache, 'get_client'):
+            raise ImproperlyConfigured("VIEW_COUNTER_STORE = 'redis' needs a RedisCache cache backend.")
+        self._client = cache._cache.get_client(write=True)
+        self._key = cache.make_key('popularity:pending')
+
+    def add(self, pk, views=0, impressions=0):
+        pipe = self._client.pipeline()
+        if views:
+            pipe.hincrby(self._key, f'{pk}:v', views)
+        if impressions:
+            pipe.hincrby(self._key, f'{pk}:i', impressions)
+        pipe.execute()
+
+    def drain(self):
+        # Renaming first means increments arriving meanwhile go to a fresh hash
+        flushing = f'{self._key}:{uuid.uuid4().hex}'
+        try:
+            self._client.rename(self._key, flushing)
+        except Exception:
+            return {}  # Nothing pending
+        raw = self._client.hgetall(flushing)
+        self._client.delete(flushing)
+
+        pending = defaultdict(lambda: [0, 0])
+        for field, count in raw.items():
+            pk, _, kind = field.decode().partition(':')
+            pending[int(pk)][0 if kind == 'v' else 1] += int(count)
+        return {pk: tuple(counts) for pk, counts in pending.items()}
+
+    def due(self, interval):
+        return False
+
+
+_buffer = None
+
+
+def get_buffer():
+    global _buffer
+    if _buffer is None:
+        if getattr(settings, 'VIEW_COUNTER_STORE', 'local') == 'redis':
+            _buffer = RedisCounterBuffer(getattr(settings, 'VIEW_COUNTER_CACHE_ALIAS', 'default'))
+        else:
+            _buffer = LocalCounterBuffer()
+            atexit.register(_flush_at_exit)
+    return _buffer
+
+
+def _flush_at_exit():
+    try:
+        flush_counters()
+    except Exception:
+        pass
+
+
+def popularity_increment(weight, now):
+    half_lives = (now - EPOCH).total_seconds() / 3600 / settings.POPULARITY_HALF_LIFE_HOURS
+    return math.log(weight) + half_lives * math.log(2)
+
+
+def _log_add(a, b):
+    high, low = max(a, b), min(a, b)
+    return high + math.log1p(math.exp(low - high))
+
+
+def record_view(pk):
+    _record(pk, views=1)
+
+
+def record_impressions(pks):
+    buffer = get_buffer()
+    for pk in pks:
+        buffer.add(pk, impressions=1)
+    _maybe_flush(buffer)
+
+
+def _record(pk, views=0, impressions=0):
+    buffer = get_buffer()
+    buffer.add(pk, views=views, impressions=impressions)
+    _maybe_flush(buffer)
+
+
+def _maybe_flush(buffer):
+    if not buffer.due(settings.VIEW_COUNTER_FLUSH_SECONDS):
+        return
+    # Only one thread per process flushes; the others carry on
+    if buffer._flush_lock.acquire(blocking=False):
+        try:
+            flush_counters()
+        finally:
+            buffer._flush_lock.release()
+
+
+def flush_counters(batch_size=500):
+    """Write buffered counts and popularity in batched UPDATEs; returns listings touched."""
+    pending = get_buffer().drain()
+    if not pending:
+        return 0
+
+    now = timezone.now()
+    ids = sorted(pending)
+    for start in range(0, len(ids), batch_size):
+        batch = ids[start:start + batch_size]
+        with transaction.atomic():
+            # Locking in pk order keeps concurrent flushers from deadlocking
+            current = dict(
+                Property.all_objects.select_for_update().filter(pk__in=batch).order_by('pk')
+                .values_list('pk', 'popularity')
+            )
+            views, impressions, scores = [], [], []
+            for pk in batch:
+                if pk not in current:
+                    continue
+                view_count, impression_count = pending[pk]
+                weight = view_count * VIEW_WEIGHT + impression_count * IMPRESSION_WEIGHT
+                views.append(When(pk=pk, then=Value(view_count)))
+                impressions.append(When(pk=pk, then=Value(impression_count)))
+                scores.append(When(pk=pk, then=Value(_log_add(current[pk], popularity_increment(weight, now)))))
+            if not scores:
+                continue
+            # QuerySet.update() leaves updated_at alone, so page ETags are unaffected
+            Property.all_objects.filter(pk__in=current).update(
+                view_count=F('view_count') + Case(*views, default=Value(0)),
+                impression_count=F('impression_count') + Case(*impressions, default=Value(0)),
+                popularity=Case(*scores, default=F('popularity'), output_field=FloatField()),
+                popularity_updated_at=now,
+            )
+    return len(ids)
@@ -0,0 +1,180 @@
+import math
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.http import HttpResponse, JsonResponse
+
+RATE_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """Turn '10/m' into tokens per second."""
+    count, _, unit = rate.partition('/')
+    try:
+        return int(count) / RATE_UNITS[unit[:1]]
+    except (KeyError, ValueError):
+        raise ImproperlyConfigured(f"Invalid rate {rate!r}; expected '<count>/<s|m|h|d>'.")
+
+
+class LocalTokenBucketStore:
+    """Per-process buckets guarded by a lock; fine for a single server."""
+
+    SWEEP_EVERY = 10000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._calls = 0
+
+    def take(self, key, rate, capacity):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                retry_after = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                retry_after = (1 - tokens) / rate
+
+            self._calls += 1
+            if self._calls >= self.SWEEP_EVERY:
+                self._sweep(now)
+        return retry_after
+
+    def _sweep(self, now):
+        # An idle bucket has refilled completely, which is the same as no bucket
+        self._calls = 0
+        idle = 3600
+        self._buckets = {k: v for k, v in self._buckets.items() if now - v[1] < idle}
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class RedisTokenBucketStore:
+    """Buckets shared between servers, updated atomically by a Lua script."""
+
+    SCRIPT = """
+    local tokens_ts = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local rate = tonumber(ARGV[1])
+    local capacity = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local tokens = tonumber(tokens_ts[1]) or capacity
+    local ts = tonumber(tokens_ts[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    local retry_after = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+    else
+        retry_after = (1 - tokens) / rate
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return tostring(retry_after)
+    """
+
+    def __init__(self, alias='default'):
+        cache = caches[alias]
+        if not hasattr(cache, '_cache') or not hasattr(cache._cache, 'get_client'):
+            raise ImproperlyConfigured("RATELIMIT_STORE = 'redis' needs a RedisCache cache backend.")
+        self._client = cache._cache.get_client(write=True)
+        self._script = self._client.register_script(self.SCRIPT)
+        self._prefix = cache.make_key('ratelimit:')
+
+    def take(self, key, rate, capacity):
+        return float(self._script(keys=[self._prefix + key], args=[rate, capacity, time.time()]))
+
+
+def get_store():
+    store = getattr(settings, 'RATELIMIT_STORE', 'local')
+    if store == 'redis':
+        return RedisTokenBucketStore(getattr(settings, 'RATELIMIT_CACHE_ALIAS', 'default'))
+    return LocalTokenBucketStore()
+
+
+def client_ip(request):
+    """
+    The address the outermost of RATELIMIT_TRUSTED_PROXIES proxies saw the
+    request come from. Entries left of it in X-Forwarded-For are written by
+    the client and could be anything, so they are never used.
+    """
+    proxies = getattr(settings, 'RATELIMIT_TRUSTED_PROXIES', 0)
+    if proxies > 0:
+        forwarded = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+        if len(forwarded) >= proxies:
+            return forwarded[-proxies]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+class RateLimitMiddleware:
+    """
+    Apply the token buckets configured in RATELIMITS to the resolved URL name.
+
+    Each rule is limited either ``per`` 'ip' or 'user'; user rules are
+    skipped for anonymous requests, which the IP rules still cover.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'RATELIMIT_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.store = get_store()
+        self.rules = {}
+        for url_name, rules in getattr(settings, 'RATELIMITS', {}).items():
+            self.rules[url_name] = [
+                (
+                    rule.get('per', 'ip'),
+                    parse_rate(rule['rate']),
+                    rule.get('burst', max(1, int(rule['rate'].partition('/')[0]))),
+                    frozenset(rule.get('methods', ('POST',))),
+                )
+                for rule in rules
+            ]
+
+    def __call__(self, request):
+        # process_view does the work; in async mode Django runs it in a thread
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        rules = self.rules.get(match.url_name) if match else None
+        if not rules:
+            return None
+
+        retry_after = 0.0
+        for per, rate, capacity, methods in rules:
+            if request.method not in methods:
+                continue
+            if per == 'user':
+                if not request.user.is_authenticated:
+                    continue
+                identity = f'user:{request.user.pk}'
+            else:
+                identity = f'ip:{client_ip(request)}'
+            retry_after = max(retry_after, self.store.take(f'{match.url_name}:{identity}', rate, capacity))
+
+        if retry_after > 0:
+            return self.too_many_requests(request, math.ceil(retry_after))
+        return None
+
+    def too_many_requests(self, request, retry_after):
+        message = 'Too many requests. Please slow down and try again shortly.'
+        if 'application/json' in request.headers.get('Accept', '') or request.content_type == 'application/json':
+            response = JsonResponse({'error': message, 'retry_after': retry_after}, status=429)
+        else:
+            response = HttpResponse(message, status=429, content_type='text/plain')
+        response['Retry-After'] = str(retry_after)
+        return response
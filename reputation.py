@@ -0,0 +1,160 @@
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import (
+    Appointment, ArchivedAppointment, ArchivedPayment, Payment, RentalAgreement, ReputationScore, Review, User,
+    VerificationDocument,
+)
+
+UNPAID = ('pending', 'failed')
+SCORE_FIELDS = [
+    'score', 'review_rating', 'review_count', 'on_time_rate', 'payment_count', 'completion_rate',
+    'cancellation_rate', 'appointment_count', 'is_verified', 'computed_at',
+]
+
+
+def _columns(queryset, *fields):
+    """The ``fields`` of every row of ``queryset`` as one list per field."""
+    columns = tuple([] for _ in fields)
+    for row in queryset.values_list(*fields).iterator(chunk_size=10000):
+        for column, value in zip(columns, row):
+            column.append(value)
+    return columns
+
+
+def _positions(keys, wanted):
+    """Index of each ``wanted`` value in the sorted ``keys`` array, and which were found."""
+    wanted = np.asarray(wanted, dtype=np.int64)
+    if not len(keys):
+        return np.zeros(len(wanted), dtype=np.int64), np.zeros(len(wanted), dtype=bool)
+    positions = np.minimum(np.searchsorted(keys, wanted), len(keys) - 1)
+    return positions, keys[positions] == wanted
+
+
+def _per_user(user_ids, owners, mask=None):
+    """Count the rows owned by each user, optionally only those where ``mask`` holds."""
+    positions, found = _positions(user_ids, owners)
+    if mask is not None:
+        found &= mask
+    return np.bincount(positions[found], minlength=len(user_ids)).astype(np.float64)
+
+
+def smoothed(hits, totals, prior, strength):
+    """Rate of ``hits`` in ``totals`` pulled towards ``prior`` by ``strength`` pseudo-observations."""
+    return (hits + prior * strength) / (totals + strength)
+
+
+def _prior(hits, totals, default):
+    return hits.sum() / totals.sum() if totals.sum() else default
+
+
+def _review_stats(user_ids, strength):
+    reviewees, ratings = _columns(Review.objects.filter(is_approved=True).order_by(), 'reviewee_id', 'rating')
+    ratings = np.asarray(ratings, dtype=np.float64)
+    positions, found = _positions(user_ids, reviewees)
+    totals = np.bincount(positions[found], weights=ratings[found], minlength=len(user_ids))
+    counts = np.bincount(positions[found], minlength=len(user_ids)).astype(np.float64)
+    prior = ratings.mean() if len(ratings) else 4.0
+    return smoothed(totals, counts, prior, strength), counts
+
+
+def _payment_stats(user_ids, today, strength):
+    agreement_ids, tenants = (np.asarray(column, dtype=np.int64) for column in _columns(
+        RentalAgreement.objects.order_by('pk'), 'pk', 'tenant_id'
+    ))
+    on_time = np.zeros(len(user_ids))
+    owed = np.zeros(len(user_ids))
+    # Archived payments still count; they are only moved out of the hot table
+    for model in (Payment, ArchivedPayment):
+        agreements, statuses, paid_on, due_on = _columns(
+            model.objects.order_by(), 'rental_agreement_id', 'status', 'payment_date', 'due_date'
+        )
+        if not agreements or not len(agreement_ids):
+            continue
+        positions, found = _positions(agreement_ids, agreements)
+        statuses = np.asarray(statuses)
+        paid_on = np.asarray(paid_on, dtype='datetime64[D]')
+        due_on = np.asarray(due_on, dtype='datetime64[D]')
+        completed = statuses == 'completed'
+        # Rent counts once it has been paid or has fallen due unpaid
+        is_owed = completed | (np.isin(statuses, UNPAID) & (due_on < np.datetime64(today)))
+        tenant = tenants[positions]
+        on_time += _per_user(user_ids, tenant, found & completed & (paid_on <= due_on))
+        owed += _per_user(user_ids, tenant, found & is_owed)
+    return smoothed(on_time, owed, _prior(on_time, owed, 0.9), strength), owed
+
+
+def _appointment_stats(user_ids, strength):
+    completed = np.zeros(len(user_ids))
+    canceled = np.zeros(len(user_ids))
+    decided = np.zeros(len(user_ids))
+    for model in (Appointment, ArchivedAppointment):
+        requesters, landlords, statuses = _columns(model.objects.order_by(), 'requester_id', 'landlord_id', 'status')
+        statuses = np.asarray(statuses)
+        # A viewing reflects on both sides of it
+        for party in (requesters, landlords):
+            completed += _per_user(user_ids, party, statuses == 'completed')
+            canceled += _per_user(user_ids, party, statuses == 'canceled')
+            decided += _per_user(user_ids, party, statuses != 'pending')
+    settled = completed + canceled
+    completion = smoothed(completed, settled, _prior(completed, settled, 0.8), strength)
+    cancellation = smoothed(canceled, decided, _prior(canceled, decided, 0.1), strength)
+    return completion, cancellation, decided
+
+
+def refresh_reputation():
+    """
+    Recompute every user's reputation in one pass over reviews, rent
+    payments, viewings and verification. Returns the number of users scored.
+    """
+    computed_at = timezone.now()
+    strength = settings.REPUTATION_PRIOR_STRENGTH
+    weights = settings.REPUTATION_WEIGHTS
+
+    user_ids, verified = _columns(User.objects.order_by('pk'), 'pk', 'is_verified')
+    user_ids = np.asarray(user_ids, dtype=np.int64)
+    if not len(user_ids):
+        return 0
+    documents, = _columns(VerificationDocument.objects.filter(is_approved=True).order_by(), 'user_id')
+    verified = np.asarray(verified, dtype=bool) | (_per_user(user_ids, documents) > 0)
+
+    rating, review_count = _review_stats(user_ids, strength)
+    on_time, payment_count = _payment_stats(user_ids, timezone.localdate(), strength)
+    completion, cancellation, appointment_count = _appointment_stats(user_ids, strength)
+
+    components = {
+        'reviews': (rating - 1) / 4,
+        'payments': on_time,
+        'appointments': (completion + 1 - cancellation) / 2,
+        'verification': verified.astype(np.float64),
+    }
+    total_weight = sum(weights.values())
+    score = 100 * sum(weights[name] * value for name, value in components.items()) / total_weight
+
+    scores = [
+        ReputationScore(
+            user_id=int(user_ids[i]),
+            score=round(float(score[i]), 2),
+            review_rating=round(float(rating[i]), 3),
+            review_count=int(review_count[i]),
+            on_time_rate=round(float(on_time[i]), 4),
+            payment_count=int(payment_count[i]),
+            completion_rate=round(float(completion[i]), 4),
+            cancellation_rate=round(float(cancellation[i]), 4),
+            appointment_count=int(appointment_count[i]),
+            is_verified=bool(verified[i]),
+            computed_at=computed_at,
+        )
+        for i in range(len(user_ids))
+    ]
+    with transaction.atomic():
+        ReputationScore.objects.bulk_create(
+            scores,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=SCORE_FIELDS,
+        )
+    return len(scores)
@@ -0,0 +1,108 @@
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+# Set per request by ReplicaRoutingMiddleware; ContextVar keeps it correct under ASGI too
+_use_replica = ContextVar('use_replica', default=False)
+
+PRIMARY_DB = 'default'
+STICKY_COOKIE = 'db_primary_until'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith('replica')]
+
+
+class PrimaryReplicaRouter:
+    """
+    Send reads to a replica only while a whitelisted read-only view is being
+    served; everything else, including all writes, stays on the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not _use_replica.get():
+            return None
+        aliases = replica_aliases()
+        if not aliases:
+            return None
+        return random.choice(aliases)
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY_DB
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY_DB
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Decide per request whether reads may go to a replica.
+
+    A successful unsafe request sets a short-lived cookie that pins the
+    client to the primary, so users read their own writes despite replica lag.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.read_views = frozenset(getattr(settings, 'DATABASE_REPLICA_VIEWS', ()))
+        self.sticky_seconds = getattr(settings, 'DATABASE_REPLICA_STICKY_SECONDS', 15)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token = _use_replica.set(False)
+        try:
+            response = self.get_response(request)
+        finally:
+            _use_replica.reset(token)
+        return self._pin_after_write(request, response)
+
+    async def __acall__(self, request):
+        token = _use_replica.set(False)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _use_replica.reset(token)
+        return self._pin_after_write(request, response)
+
+    def _pin_after_write(self, request, response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            response.set_cookie(
+                STICKY_COOKIE,
+                str(int(time.time()) + self.sticky_seconds),
+                max_age=self.sticky_seconds,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        if (
+            request.method in SAFE_METHODS
+            and match is not None
+            and match.url_name in self.read_views
+            and not self._is_pinned(request)
+        ):
+            _use_replica.set(True)
+        return None
+
+    def _is_pinned(self, request):
+        try:
+            return int(request.COOKIES.get(STICKY_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
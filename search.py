@@ -0,0 +1,138 @@
+import math
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from .amenities import parse_amenity_ids, with_amenities
+from .models import Property, SavedSearch, SavedSearchMatch
+
+
+class InvalidFilter(ValueError):
+    """A numeric listing filter that isn't a number."""
+
+    def __init__(self, name):
+        super().__init__(f'{name} must be a number')
+        self.name = name
+
+
+def number_param(params, name, convert=Decimal, strict=False):
+    """
+    ``params[name]`` converted with ``convert``, or None when it is missing.
+    Values that don't convert are ignored, or raise InvalidFilter if ``strict``.
+    """
+    raw = params.get(name)
+    if not raw:
+        return None
+    try:
+        value = convert(raw.strip())
+        if not math.isfinite(value):
+            raise ValueError(raw)
+    except (ValueError, ArithmeticError):
+        if strict:
+            raise InvalidFilter(name)
+        return None
+    return value
+
+
+def filter_properties(queryset, params, strict=False):
+    """
+    Apply the listing search filters (type, location, bedrooms, monthly price,
+    landlord reputation, amenities) from a QueryDict to a Property queryset.
+    Malformed numbers are skipped, or raise InvalidFilter if ``strict``.
+    """
+    property_type = params.get('property_type')
+    if property_type:
+        queryset = queryset.filter(property_type=property_type)
+        
+    location = params.get('location')
+    if location:
+        queryset = queryset.filter(city__iexact=location)
+        
+    bedrooms = number_param(params, 'bedrooms', int, strict)
+    if bedrooms is not None:
+        if bedrooms == 3:
+            queryset = queryset.filter(bedrooms__gte=3)
+        else:
+            queryset = queryset.filter(bedrooms=bedrooms)
+            
+    # Price filters compare monthly equivalents so daily and weekly listings line up
+    min_price = number_param(params, 'min_price', strict=strict)
+    if min_price is not None:
+        queryset = queryset.filter(monthly_price__gte=min_price)
+        
+    max_price = number_param(params, 'max_price', strict=strict)
+    if max_price is not None:
+        queryset = queryset.filter(monthly_price__lte=max_price)
+        
+    # Precomputed by reputation.refresh_reputation(), so this is a join, not an aggregate
+    min_reputation = number_param(params, 'min_reputation', float, strict)
+    if min_reputation is not None:
+        queryset = queryset.filter(landlord__reputation__score__gte=min_reputation)
+        
+    # Repeated ?amenity=<pk>; a listing must have all of them
+    queryset = with_amenities(queryset, parse_amenity_ids(params.getlist('amenity')))
+        
+    return queryset
+
+
+def candidate_searches(prop):
+    """
+    Active saved searches that ``prop`` satisfies, found through the
+    (city, property_type, min_price) index rather than by running each search.
+    """
+    price = prop.monthly_price
+    return (
+        SavedSearch.objects
+        .filter(is_active=True, city__in=['', prop.city.lower()], property_type__in=['', prop.property_type])
+        .filter(Q(min_price__isnull=True) | Q(min_price__lte=price))
+        .filter(Q(max_price__isnull=True) | Q(max_price__gte=price))
+        .filter(Q(min_bedrooms__isnull=True) | Q(min_bedrooms__lte=prop.bedrooms))
+        .filter(Q(max_bedrooms__isnull=True) | Q(max_bedrooms__gte=prop.bedrooms))
+        .exclude(user_id=prop.landlord_id)
+    )
+
+
+def match_properties(property_ids):
+    """
+    Bring the matches of the given listings up to date: record the searches
+    they now satisfy and drop unsent matches for ones they no longer do.
+    Returns how many matches were created.
+    """
+    properties = Property.objects.filter(pk__in=property_ids, is_active=True, monthly_price__isnull=False)
+    created = 0
+    matched = set()
+    for prop in properties:
+        matched.add(prop.pk)
+        search_ids = list(candidate_searches(prop).values_list('pk', flat=True))
+        SavedSearchMatch.objects.filter(property=prop, notified_at__isnull=True).exclude(
+            search_id__in=search_ids,
+        ).delete()
+        if not search_ids:
+            continue
+        existing = set(
+            SavedSearchMatch.objects.filter(property=prop, search_id__in=search_ids).values_list('search_id', flat=True)
+        )
+        new = [SavedSearchMatch(search_id=pk, property=prop) for pk in search_ids if pk not in existing]
+        created += _create_matches(new)
+    # Deactivated, deleted and unpriced listings match nothing
+    SavedSearchMatch.objects.filter(
+        property_id__in=set(property_ids) - matched, notified_at__isnull=True,
+    ).delete()
+    return created
+
+
+def _create_matches(matches):
+    """Insert ``matches`` and return how many of them this call created."""
+    if not matches:
+        return 0
+    try:
+        with transaction.atomic():
+            SavedSearchMatch.objects.bulk_create(matches)
+        return len(matches)
+    except IntegrityError:
+        # A concurrent matcher inserted some of the same pairs in the meantime
+        return sum(
+            SavedSearchMatch.objects.get_or_create(search_id=match.search_id, property_id=match.property_id)[1]
+            for match in matches
+        )
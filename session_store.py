@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+
+from . import auth_cache
+
+
+class WriteBehindSessionStore(CachedDBStore):
+    """
+    cached_db sessions with write-behind to the database.
+
+    Reads come from the cache. Saves always update the cache but only reach
+    the database when the session is created or its last database write is
+    older than SESSION_WRITE_BEHIND_SECONDS, so busy sessions cost at most
+    one UPDATE per window instead of one per modified request.
+    """
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self.write_behind = getattr(settings, 'SESSION_WRITE_BEHIND_SECONDS', 60)
+
+    @property
+    def synced_key(self):
+        return f'{self.cache_key}:synced'
+
+    def save(self, must_create=False):
+        if not must_create and self.session_key is not None and self._cache.get(self.synced_key):
+            self._cache.set(self.cache_key, self._session, self.get_expiry_age())
+            return
+        super().save(must_create)
+        self._cache.set(self.synced_key, True, self.write_behind)
+
+    def delete(self, session_key=None):
+        key = session_key or self.session_key
+        if key is not None:
+            self._cache.delete(f'{self.cache_key_prefix}{key}:synced')
+        super().delete(session_key)
+
+
+# A per-process cache would hide one worker's session writes from the others,
+# and a cull or restart would lose them, so fall back to plain database sessions
+SessionStore = WriteBehindSessionStore if auth_cache.is_shared() else DBStore
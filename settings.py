@@ -41,8 +41,9 @@ INSTALLED_APPS = [
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
-    'django.contrib.staticfiles',
+    # Listed before staticfiles so its collectstatic (which also builds bundles) wins
     'tenant_network',
+    'django.contrib.staticfiles',
     'crispy_forms',
     'crispy_bootstrap5',
     'stripe',
@@ -58,6 +59,8 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 STRIPE_PUBLIC_KEY = 'your_stripe_public_key'
 STRIPE_SECRET_KEY = 'your_stripe_secret_key'
 STRIPE_WEBHOOK_SECRET = 'your_webhook_secret'
+# Seconds to wait for Stripe before handing the call to the task worker
+STRIPE_TIMEOUT = env.int('STRIPE_TIMEOUT', default=10)
 
 # Authentication
 LOGIN_URL = 'login'
@@ -72,8 +75,11 @@ EMAIL_USE_TLS = True
 EMAIL_HOST_USER = 'your@email.com'
 EMAIL_HOST_PASSWORD = 'yourpassword'
 DEFAULT_FROM_EMAIL = 'Tenant Network <noreply@tenantnetwork.com>'
+# Absolute base URL for links in emails sent outside a request
+SITE_URL = env('SITE_URL', default='http://localhost:8000')
 
 MIDDLEWARE = [
+    'tenant_network.instrumentation.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -81,15 +87,73 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'tenant_network.ratelimit.RateLimitMiddleware',
+    'tenant_network.routers.ReplicaRoutingMiddleware',
 ]
 
+# Token-bucket throttling per URL name (see tenant_network.ratelimit).
+# 'burst' is the bucket size; the bucket refills at 'rate'.
+RATELIMIT_ENABLED = env.bool('RATELIMIT_ENABLED', default=True)
+RATELIMIT_STORE = env('RATELIMIT_STORE', default='local')  # 'local' or 'redis'
+# Reverse proxies in front of the app that append to X-Forwarded-For; 0 uses REMOTE_ADDR
+RATELIMIT_TRUSTED_PROXIES = env.int('RATELIMIT_TRUSTED_PROXIES', default=0)
+RATELIMITS = {
+    'message_create': [
+        {'per': 'user', 'rate': '30/h', 'burst': 5},
+        {'per': 'ip', 'rate': '60/h', 'burst': 10},
+    ],
+    'appointment_create': [
+        {'per': 'user', 'rate': '10/h', 'burst': 3},
+        {'per': 'ip', 'rate': '30/h', 'burst': 5},
+    ],
+    'review_create': [
+        {'per': 'user', 'rate': '10/d', 'burst': 3},
+    ],
+    'toggle_favorite': [
+        {'per': 'user', 'rate': '60/m', 'burst': 20},
+    ],
+    'register': [
+        {'per': 'ip', 'rate': '5/h', 'burst': 3},
+    ],
+    'login': [
+        {'per': 'ip', 'rate': '10/m', 'burst': 5},
+    ],
+    'api_property_export': [
+        {'per': 'ip', 'rate': '6/h', 'burst': 2, 'methods': ('GET',)},
+    ],
+    'bulk_upload_images': [
+        {'per': 'user', 'rate': '30/h', 'burst': 10},
+    ],
+}
+
+# Request instrumentation (see tenant_network.instrumentation)
+PERFORMANCE_SAMPLE_RATE = env.float('PERFORMANCE_SAMPLE_RATE', default=1.0)
+PERFORMANCE_DUPLICATE_QUERY_THRESHOLD = env.int('PERFORMANCE_DUPLICATE_QUERY_THRESHOLD', default=5)
+PERFORMANCE_SERVER_TIMING = env.bool('PERFORMANCE_SERVER_TIMING', default=True)
+# Lets a scraper read /metrics/ with "Authorization: Bearer <token>"
+PERFORMANCE_METRICS_TOKEN = env('PERFORMANCE_METRICS_TOKEN', default='')
+# Time every template render and count the queries each one sets off
+PERFORMANCE_TEMPLATE_PROFILE = env.bool('PERFORMANCE_TEMPLATE_PROFILE', default=False)
+
 ROOT_URLCONF = 'tenant_network.urls'
 
+# Template performance mode (see tenant_network.templating): templates are
+# compiled once at startup into the cached loader, context-free partials are
+# re-rendered every TEMPLATE_PARTIAL_SECONDS and unbound form markup is reused.
+# Turn it off while editing templates.
+TEMPLATE_PERFORMANCE_MODE = env.bool('TEMPLATE_PERFORMANCE_MODE', default=not DEBUG)
+TEMPLATE_PARTIAL_SECONDS = env.int('TEMPLATE_PARTIAL_SECONDS', default=3600)
+FORM_LAYOUT_CACHE_SIZE = env.int('FORM_LAYOUT_CACHE_SIZE', default=1024)
+
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],  # Make sure this includes your templates directory
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -98,6 +162,11 @@ TEMPLATES = [
                 'django.contrib.messages.context_processors.messages',
                 'django.template.context_processors.static',  # Add this
             ],
+            'loaders': (
+                [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)]
+                if TEMPLATE_PERFORMANCE_MODE else TEMPLATE_LOADERS
+            ),
+            'debug': DEBUG and not TEMPLATE_PERFORMANCE_MODE,
         },
     },
 ]
@@ -119,6 +188,85 @@ DATABASES = {
         'PORT': env('PG_PORT', default='5432'),
     }
 }
+
+# Connection reuse: either psycopg's built-in pool (DB_POOL_MAX_SIZE > 0)
+# or persistent per-thread connections kept for CONN_MAX_AGE seconds.
+DB_POOL_MIN_SIZE = env.int('DB_POOL_MIN_SIZE', default=2)
+DB_POOL_MAX_SIZE = env.int('DB_POOL_MAX_SIZE', default=0)
+DB_POOL_TIMEOUT = env.int('DB_POOL_TIMEOUT', default=10)
+
+# Read replicas, e.g. PG_REPLICA_HOSTS=replica1:5432,replica2:5432.
+# Point PG_REPLICA_DB at a second local database to stand in for a replica; the
+# routing tests use tenant_network.tests.settings_replica, which does that for you.
+PG_REPLICA_HOSTS = env.list('PG_REPLICA_HOSTS', default=[])
+for index, replica_host in enumerate(PG_REPLICA_HOSTS, start=1):
+    host, _, port = replica_host.partition(':')
+    DATABASES['replica' if index == 1 else f'replica_{index}'] = {
+        **DATABASES['default'],
+        'NAME': env('PG_REPLICA_DB', default=DATABASES['default']['NAME']),
+        'USER': env('PG_REPLICA_USER', default=DATABASES['default']['USER']),
+        'PASSWORD': env('PG_REPLICA_PASSWORD', default=DATABASES['default']['PASSWORD']),
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+for db in DATABASES.values():
+    db['CONN_HEALTH_CHECKS'] = True
+    if DB_POOL_MAX_SIZE and db['ENGINE'] == 'django.db.backends.postgresql':
+        # Django refuses CONN_MAX_AGE together with a pool
+        db['CONN_MAX_AGE'] = 0
+        db['OPTIONS'] = {
+            'pool': {
+                'min_size': DB_POOL_MIN_SIZE,
+                'max_size': DB_POOL_MAX_SIZE,
+                'timeout': DB_POOL_TIMEOUT,
+            },
+        }
+    else:
+        db['CONN_MAX_AGE'] = env.int('CONN_MAX_AGE', default=60)
+
+DATABASE_ROUTERS = ['tenant_network.routers.PrimaryReplicaRouter']
+
+# URL names whose reads may be served by a replica
+DATABASE_REPLICA_VIEWS = [
+    'home',
+    'property_list',
+    'listings',
+    'property_detail',
+    'price_benchmark',
+    'api_property_list',
+    'api_property_detail',
+    'api_property_export',
+]
+# How long a client reads from the primary after it writes
+DATABASE_REPLICA_STICKY_SECONDS = env.int('DATABASE_REPLICA_STICKY_SECONDS', default=15)
+# Cache shared by sessions and the auth snapshot, e.g. CACHE_URL=redis://127.0.0.1:6379/1.
+# With the per-process locmem default, sessions are plain database sessions and
+# request.user/permissions are not cached (see tenant_network.auth_cache.is_shared)
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://tenant-network'),
+}
+
+# Sessions are read from the cache and written to the database at most once
+# per SESSION_WRITE_BEHIND_SECONDS (see tenant_network.session_store)
+SESSION_ENGINE = 'tenant_network.session_store'
+SESSION_WRITE_BEHIND_SECONDS = env.int('SESSION_WRITE_BEHIND_SECONDS', default=60)
+
+# request.user and permission sets come from the cache in the steady state
+AUTHENTICATION_BACKENDS = ['tenant_network.auth_backends.CachedModelBackend']
+AUTH_CACHE_TIMEOUT = env.int('AUTH_CACHE_TIMEOUT', default=300)
+
+# Longest a process keeps using an amenity catalog another process has changed,
+# when the cache is not shared (see tenant_network.amenities)
+AMENITY_CATALOG_SECONDS = env.int('AMENITY_CATALOG_SECONDS', default=60)
+
+# Password hashing runs on a bounded pool (see tenant_network.password_pool);
+# callers that wait longer than PASSWORD_HASH_WAIT_SECONDS for a slot are turned away
+PASSWORD_HASH_WORKERS = env.int('PASSWORD_HASH_WORKERS', default=2)
+PASSWORD_HASH_MAX_PENDING = env.int('PASSWORD_HASH_MAX_PENDING', default=16)
+PASSWORD_HASH_WAIT_SECONDS = env.int('PASSWORD_HASH_WAIT_SECONDS', default=5)
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -164,6 +312,30 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'static'),
 ]
 
+# Per-page bundles built by collectstatic / build_assets (see tenant_network.assets).
+# With ASSET_BUNDLES_ENABLED off the files are served one by one as before.
+ASSET_BUNDLES_ENABLED = env.bool('ASSET_BUNDLES_ENABLED', default=not DEBUG)
+ASSET_BUNDLES = {
+    'site.css': [
+        'vendor/bootstrap/css/bootstrap.min.css',
+        'vendor/font-awesome/css/all.min.css',
+        'vendor/bootstrap-icons/bootstrap-icons.css',
+        'vendor/tiny-slider/tiny-slider.css',
+        'vendor/choices/css/choices.min.css',
+        'vendor/flatpickr/css/flatpickr.min.css',
+        'vendor/glightbox/css/glightbox.css',
+        'css/style.css',
+    ],
+    'site.js': [
+        'vendor/bootstrap/js/bootstrap.bundle.min.js',
+        'vendor/choices/js/choices.min.js',
+        'vendor/tiny-slider/tiny-slider.js',
+        'vendor/flatpickr/js/flatpickr.min.js',
+        'vendor/glightbox/js/glightbox.js',
+        'js/functions.js',
+    ],
+}
+
 JAZZMIN_SETTINGS={
     'site_header':'Tenant Network Profile',
     'site brand':'',
@@ -202,6 +374,69 @@ THEME_SETTINGS = {
     'hero_text': '#ffffff'
 }
 
+# Bump on deploy to invalidate ETags of pages without database content (e.g. About)
+STATIC_PAGE_VERSION = env('STATIC_PAGE_VERSION', default='1')
+
+# Change feed (api/changes/) for partners mirroring listings
+CHANGEFEED_ENABLED = env.bool('CHANGEFEED_ENABLED', default=True)
+# Entries younger than this are held back until concurrent commits settle
+CHANGEFEED_SETTLE_SECONDS = env.int('CHANGEFEED_SETTLE_SECONDS', default=2)
+CHANGEFEED_RETENTION_DAYS = env.int('CHANGEFEED_RETENTION_DAYS', default=30)
+
+# Background cleanup (manage.py purge_deleted_properties / archive_cold_data)
+PROPERTY_PURGE_GRACE_HOURS = env.int('PROPERTY_PURGE_GRACE_HOURS', default=24)
+ARCHIVE_MESSAGES_AFTER_DAYS = env.int('ARCHIVE_MESSAGES_AFTER_DAYS', default=365)
+ARCHIVE_APPOINTMENTS_AFTER_DAYS = env.int('ARCHIVE_APPOINTMENTS_AFTER_DAYS', default=180)
+ARCHIVE_PAYMENTS_AFTER_DAYS = env.int('ARCHIVE_PAYMENTS_AFTER_DAYS', default=730)
+
+# Monthly partitions for messages, payments and appointments (PostgreSQL only, manage.py manage_partitions)
+PARTITION_MONTHS_AHEAD = env.int('PARTITION_MONTHS_AHEAD', default=3)
+# Model name -> months of partitions to keep attached; unlisted tables keep everything
+PARTITION_RETAIN_MONTHS = {}
+# Dashboard and admin lists only look this far back so partitioned tables are pruned
+RECENT_ACTIVITY_DAYS = env.int('RECENT_ACTIVITY_DAYS', default=180)
+
+# Listing view counters and trending order (popularity.py)
+VIEW_COUNTER_STORE = env('VIEW_COUNTER_STORE', default='local')  # 'local' or 'redis'
+# How often each process writes its buffered counts; the redis store is flushed by the worker instead
+VIEW_COUNTER_FLUSH_SECONDS = env.int('VIEW_COUNTER_FLUSH_SECONDS', default=30)
+# A view this old counts half as much towards the trending order
+POPULARITY_HALF_LIFE_HOURS = env.int('POPULARITY_HALF_LIFE_HOURS', default=48)
+
+# Reputation scores (manage.py refresh_reputation)
+# Relative weight of each component in the 0-100 score
+REPUTATION_WEIGHTS = {'reviews': 0.4, 'payments': 0.3, 'appointments': 0.15, 'verification': 0.15}
+# Pseudo-observations at the site-wide average added to every user's rates
+REPUTATION_PRIOR_STRENGTH = env.int('REPUTATION_PRIOR_STRENGTH', default=5)
+
+# Listing images (gallery.py)
+PROPERTY_IMAGES_MAX = env.int('PROPERTY_IMAGES_MAX', default=10)
+# Difference-hash bits that may differ for two images to count as the same photo
+PROPERTY_IMAGE_SIMILARITY_DISTANCE = env.int('PROPERTY_IMAGE_SIMILARITY_DISTANCE', default=6)
+
+# Background tasks (manage.py run_worker)
+TASKS_MODULES = ['tenant_network.tasks']
+# Run tasks inline instead of queueing them, e.g. when no worker is running in development
+TASKS_ALWAYS_EAGER = env.bool('TASKS_ALWAYS_EAGER', default=False)
+# Workers refresh a running task's lock every minute; a task whose lock is
+# older than this is assumed lost with its worker and retried
+TASKS_LOCK_TIMEOUT = env.int('TASKS_LOCK_TIMEOUT', default=300)
+TASKS_KEEP_DAYS = env.int('TASKS_KEEP_DAYS', default=7)
+TASKS_SCHEDULE = [
+    {'task': 'tenant_network.tasks.run_command', 'cron': '*/15 * * * *', 'args': ['refresh_price_benchmarks']},
+    # Catches listings changed through queryset.update(), which bypasses the stale-group marking
+    {'task': 'tenant_network.tasks.run_command', 'cron': '50 1 * * *', 'args': ['refresh_price_benchmarks', '--full']},
+    {'task': 'tenant_network.tasks.run_command', 'cron': '5 * * * *', 'args': ['purge_deleted_properties']},
+    {'task': 'tenant_network.tasks.run_command', 'cron': '30 2 * * *', 'args': ['archive_cold_data']},
+    {'task': 'tenant_network.tasks.run_command', 'cron': '0 3 * * *', 'args': ['manage_partitions']},
+    {'task': 'tenant_network.tasks.run_command', 'cron': '15 3 * * *', 'args': ['prune_changelog']},
+    {'task': 'tenant_network.tasks.purge_finished_tasks', 'cron': '45 3 * * *'},
+    {'task': 'tenant_network.tasks.send_saved_search_digests', 'cron': '0 * * * *'},
+    {'task': 'tenant_network.tasks.flush_view_counters', 'cron': '* * * * *'},
+    {'task': 'tenant_network.tasks.run_command', 'cron': '10 0 * * *', 'args': ['refresh_arrears']},
+    {'task': 'tenant_network.tasks.run_command', 'cron': '20 */6 * * *', 'args': ['refresh_reputation']},
+]
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
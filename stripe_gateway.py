@@ -0,0 +1,42 @@
+import asyncio
+import weakref
+
+import stripe
+from django.conf import settings
+
+# One client per event loop: its httpx pool keeps connections to Stripe open
+# between requests, but cannot be shared across loops
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def payment_intent_params(payment, user_id):
+    return {
+        'amount': int(payment.amount * 100),  # amount in cents
+        'currency': 'usd',
+        'metadata': {
+            'payment_id': payment.id,
+            'user_id': user_id
+        },
+    }
+
+
+def idempotency_key(payment):
+    return f'payment-intent-{payment.id}'
+
+
+def get_async_client():
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = stripe.StripeClient(
+            settings.STRIPE_SECRET_KEY,
+            http_client=stripe.HTTPXClient(timeout=settings.STRIPE_TIMEOUT),
+        )
+    return client
+
+
+async def create_payment_intent_async(payment, user_id):
+    return await get_async_client().payment_intents.create_async(
+        params=payment_intent_params(payment, user_id),
+        options={'idempotency_key': idempotency_key(payment)},
+    )
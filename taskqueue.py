@@ -0,0 +1,338 @@
+"""
+Database-backed task queue.
+
+Functions decorated with ``@task`` can be queued with ``.delay()``; the
+row is written in the caller's transaction, so work queued by a view that
+later fails is rolled back with it. ``manage.py run_worker`` claims due
+tasks by priority, runs them in a thread or process pool, retries
+failures with exponential backoff and enqueues the cron entries in
+TASKS_SCHEDULE. While a task runs, its worker refreshes ``locked_at``
+every HEARTBEAT_SECONDS; a task whose heartbeat stops for
+TASKS_LOCK_TIMEOUT is assumed lost with its worker and queued again.
+"""
+import importlib
+import logging
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import close_old_connections, connections, transaction
+from django.db.models import Avg, Case, Count, F, Max, Q, Value, When
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+REGISTRY = {}
+
+HEARTBEAT_SECONDS = 60
+# Cron keys name one minute's run, which must not be queued again once it finished
+CRON_KEY_PREFIX = 'cron:'
+
+
+class TaskFunction:
+    def __init__(self, func, name, priority, max_attempts, backoff):
+        self.func = func
+        self.name = name
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        return self.enqueue(args, kwargs)
+
+    def enqueue(self, args=(), kwargs=None, run_at=None, priority=None, dedupe_key=None):
+        return enqueue(
+            self.name, args, kwargs,
+            priority=self.priority if priority is None else priority,
+            max_attempts=self.max_attempts,
+            run_at=run_at,
+            dedupe_key=dedupe_key,
+        )
+
+
+def task(name=None, priority=0, max_attempts=3, backoff=10):
+    """Register a function as a task; ``backoff`` is the first retry delay in seconds."""
+    def decorator(func):
+        task_name = name or f'{func.__module__}.{func.__qualname__}'
+        REGISTRY[task_name] = TaskFunction(func, task_name, priority, max_attempts, backoff)
+        return REGISTRY[task_name]
+    return decorator
+
+
+def load_task_modules():
+    for module in getattr(settings, 'TASKS_MODULES', ()):
+        importlib.import_module(module)
+
+
+def enqueue(name, args=(), kwargs=None, priority=0, max_attempts=3, run_at=None, dedupe_key=None):
+    """
+    Queue ``name`` to run at ``run_at`` (default now).
+
+    With a ``dedupe_key``, an existing task with that key is returned
+    instead of adding a second one.
+    """
+    if getattr(settings, 'TASKS_ALWAYS_EAGER', False):
+        REGISTRY[name].func(*args, **(kwargs or {}))
+        return None
+
+    fields = {
+        'name': name,
+        'args': list(args),
+        'kwargs': kwargs or {},
+        'priority': priority,
+        'max_attempts': max_attempts,
+        'run_at': run_at or timezone.now(),
+    }
+    if dedupe_key:
+        return Task.objects.get_or_create(dedupe_key=dedupe_key, defaults=fields)[0]
+    return Task.objects.create(**fields)
+
+
+def _released_dedupe_key():
+    """Update value that frees a finished task's dedupe key for the next enqueue."""
+    return Case(
+        When(dedupe_key__startswith=CRON_KEY_PREFIX, then=F('dedupe_key')),
+        default=Value(None),
+    )
+
+
+def retry(task_obj):
+    """Put a failed task back in the queue with a fresh set of attempts."""
+    Task.objects.filter(pk=task_obj.pk, status=Task.FAILED).update(
+        status=Task.QUEUED, attempts=0, run_at=timezone.now(), last_error='',
+    )
+
+
+def claim_tasks(worker_id, limit):
+    """Mark up to ``limit`` due tasks as running for ``worker_id`` and return them."""
+    now = timezone.now()
+    with transaction.atomic():
+        due = (
+            Task.objects.select_for_update(skip_locked=True)
+            .filter(status=Task.QUEUED, run_at__lte=now)
+            .order_by('-priority', 'run_at')
+            .values_list('pk', flat=True)[:limit]
+        )
+        ids = list(due)
+        if not ids:
+            return []
+        # The status check keeps two workers from claiming the same row where
+        # SKIP LOCKED is unavailable (SQLite)
+        Task.objects.filter(pk__in=ids, status=Task.QUEUED).update(
+            status=Task.RUNNING, locked_by=worker_id, locked_at=now, started_at=now,
+            attempts=F('attempts') + 1,
+        )
+    return list(Task.objects.filter(pk__in=ids, status=Task.RUNNING, locked_by=worker_id, locked_at=now))
+
+
+def execute_task(task_id):
+    """Run one claimed task and record the outcome; returns True on success."""
+    close_old_connections()
+    try:
+        task_obj = Task.objects.get(pk=task_id)
+        func = REGISTRY.get(task_obj.name)
+        start = time.perf_counter()
+        try:
+            if func is None:
+                raise LookupError(f'No task registered as {task_obj.name!r}')
+            func.func(*task_obj.args, **task_obj.kwargs)
+        except Exception:
+            duration = time.perf_counter() - start
+            _record_failure(task_obj, func, traceback.format_exc(), duration)
+            logger.warning('Task %s #%s failed after %.3fs', task_obj.name, task_id, duration, exc_info=True)
+            return False
+
+        duration = time.perf_counter() - start
+        Task.objects.filter(pk=task_id).update(
+            status=Task.SUCCEEDED, finished_at=timezone.now(), duration=duration, last_error='', locked_by='',
+            dedupe_key=_released_dedupe_key(),
+        )
+        logger.info('Task %s #%s succeeded in %.3fs', task_obj.name, task_id, duration)
+        return True
+    finally:
+        close_old_connections()
+
+
+def _record_failure(task_obj, func, error, duration):
+    now = timezone.now()
+    if task_obj.attempts < task_obj.max_attempts:
+        base = func.backoff if func else 10
+        delay = base * 2 ** (task_obj.attempts - 1) * random.uniform(0.8, 1.2)
+        update = {'status': Task.QUEUED, 'run_at': now + timedelta(seconds=delay)}
+    else:
+        update = {'status': Task.FAILED, 'finished_at': now, 'dedupe_key': _released_dedupe_key()}
+    Task.objects.filter(pk=task_obj.pk).update(last_error=error, duration=duration, locked_by='', **update)
+
+
+def requeue_stale(timeout):
+    """Release tasks whose worker stopped heartbeating, counting the lost run as an attempt."""
+    cutoff = timezone.now() - timeout
+    stale = Task.objects.filter(status=Task.RUNNING, locked_at__lt=cutoff)
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Task.FAILED, finished_at=timezone.now(), last_error='Worker lost', locked_by='',
+        dedupe_key=_released_dedupe_key(),
+    )
+    requeued = stale.update(status=Task.QUEUED, run_at=timezone.now(), locked_by='')
+    return requeued + failed
+
+
+def task_stats(since):
+    """Per-task counts and timings for tasks finished since ``since``."""
+    return list(
+        Task.objects.filter(finished_at__gte=since)
+        .values('name')
+        .annotate(
+            total=Count('pk'),
+            failed=Count('pk', filter=Q(status=Task.FAILED)),
+            avg_seconds=Avg('duration'),
+            max_seconds=Max('duration'),
+        )
+        .order_by('name')
+    )
+
+
+CRON_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+
+
+def parse_cron(expression):
+    """Parse a five-field cron expression (``*``, ``a-b``, ``*/n`` and lists)."""
+    fields = expression.split()
+    if len(fields) != 5:
+        raise ImproperlyConfigured(f'Invalid cron expression {expression!r}; expected five fields.')
+    try:
+        return tuple(_parse_cron_field(field, low, high) for field, (low, high) in zip(fields, CRON_RANGES))
+    except ValueError:
+        raise ImproperlyConfigured(f'Invalid cron expression {expression!r}.')
+
+
+def _parse_cron_field(field, low, high):
+    values = set()
+    for part in field.split(','):
+        spec, _, step = part.partition('/')
+        step = int(step) if step else 1
+        if spec == '*':
+            start, end = low, high
+        elif '-' in spec:
+            start, end = (int(value) for value in spec.split('-', 1))
+        else:
+            start = int(spec)
+            end = high if step > 1 else start
+        if start < low or end > high or step < 1:
+            raise ValueError(part)
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+def cron_matches(parsed, moment):
+    minutes, hours, days, months, weekdays = parsed
+    return (
+        moment.minute in minutes and moment.hour in hours and moment.day in days
+        and moment.month in months and moment.isoweekday() % 7 in weekdays
+    )
+
+
+def _init_process():
+    django.setup()
+    # Connections inherited from the parent must not be shared
+    connections.close_all()
+    load_task_modules()
+
+
+class Worker:
+    """Poll for due tasks and run them until SIGINT/SIGTERM."""
+
+    STALE_CHECK_EVERY = 60
+
+    def __init__(self, concurrency=4, processes=False, poll_interval=1.0):
+        self.id = f'{socket.gethostname()}:{os.getpid()}'
+        self.concurrency = concurrency
+        self.processes = processes
+        self.poll_interval = poll_interval
+        self.schedule = [
+            (entry['task'], parse_cron(entry['cron']), entry.get('args', []), entry.get('kwargs', {}))
+            for entry in getattr(settings, 'TASKS_SCHEDULE', [])
+        ]
+        self.lock_timeout = timedelta(seconds=getattr(settings, 'TASKS_LOCK_TIMEOUT', 300))
+        self.stopping = False
+        self._last_minute = None
+        self._last_stale_check = 0.0
+        self._last_heartbeat = 0.0
+
+    def stop(self, *args):
+        self.stopping = True
+
+    def make_executor(self):
+        if self.processes:
+            connections.close_all()
+            return ProcessPoolExecutor(
+                max_workers=self.concurrency,
+                initializer=_init_process,
+                mp_context=multiprocessing.get_context('fork'),
+            )
+        return ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='task')
+
+    def enqueue_scheduled(self):
+        minute = timezone.localtime().replace(second=0, microsecond=0)
+        if minute == self._last_minute:
+            return
+        self._last_minute = minute
+        for index, (name, parsed, args, kwargs) in enumerate(self.schedule):
+            if cron_matches(parsed, minute):
+                # Every worker tries; the dedupe key lets only one row through
+                enqueue(name, args, kwargs, dedupe_key=f'{CRON_KEY_PREFIX}{index}:{name}:{minute:%Y%m%d%H%M}')
+
+    def heartbeat(self, task_ids):
+        """Refresh ``locked_at`` of this worker's running tasks so requeue_stale leaves them alone."""
+        if task_ids:
+            Task.objects.filter(pk__in=task_ids, status=Task.RUNNING, locked_by=self.id).update(
+                locked_at=timezone.now(),
+            )
+
+    def run(self, once=False):
+        load_task_modules()
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        in_flight = {}
+        with self.make_executor() as executor:
+            while not self.stopping:
+                self.enqueue_scheduled()
+                if time.monotonic() - self._last_stale_check > self.STALE_CHECK_EVERY:
+                    self._last_stale_check = time.monotonic()
+                    requeue_stale(self.lock_timeout)
+                if time.monotonic() - self._last_heartbeat > HEARTBEAT_SECONDS:
+                    self._last_heartbeat = time.monotonic()
+                    self.heartbeat(list(in_flight.values()))
+
+                free = self.concurrency - len(in_flight)
+                claimed = claim_tasks(self.id, free) if free > 0 else []
+                for task_obj in claimed:
+                    in_flight[executor.submit(execute_task, task_obj.pk)] = task_obj.pk
+
+                if not in_flight:
+                    if once:
+                        break
+                    time.sleep(self.poll_interval)
+                    continue
+                done, _ = wait(in_flight, timeout=0 if claimed else self.poll_interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task_id = in_flight.pop(future)
+                    if future.exception():
+                        # Only a crashed process gets here; requeue_stale picks the task up later
+                        logger.error('Task #%s crashed its worker: %s', task_id, future.exception())
+            # Leaving the executor block waits for in-flight tasks to finish
@@ -0,0 +1,123 @@
+from collections import defaultdict
+from datetime import timedelta
+
+import stripe
+from django.conf import settings
+from django.core.mail import send_mail
+from django.core.management import call_command
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+
+from .documents import generate_document
+from .models import Payment, RentalAgreement, SavedSearchMatch, Task
+from .popularity import flush_counters
+from .search import match_properties
+from .stripe_gateway import idempotency_key, payment_intent_params
+from .taskqueue import task
+
+stripe.api_key = settings.STRIPE_SECRET_KEY
+
+
+@task(priority=10)
+def create_first_payment(agreement_id):
+    """Create the first rent payment once both parties have signed."""
+    with transaction.atomic():
+        agreement = RentalAgreement.objects.select_for_update().get(pk=agreement_id)
+        if agreement.status != 'active' or agreement.payments.exists():
+            return
+        Payment.objects.create(
+            rental_agreement=agreement,
+            amount=agreement.monthly_rent,
+            payment_method='stripe',
+            status='pending',
+            payment_date=timezone.now().date(),
+            due_date=agreement.start_date,
+        )
+
+
+@task(priority=5)
+def generate_agreement_document(agreement_id):
+    """Render the signed agreement PDF unless the stored copy is current."""
+    agreement = RentalAgreement.objects.select_related('property', 'landlord', 'tenant').get(pk=agreement_id)
+    if agreement.is_fully_signed():
+        generate_document(agreement)
+
+
+@task(priority=20, max_attempts=5, backoff=2)
+def create_payment_intent(payment_id, user_id):
+    """Ask Stripe for a PaymentIntent and keep its client secret on the payment."""
+    payment = Payment.objects.get(pk=payment_id)
+    if payment.stripe_client_secret:
+        return
+    intent = stripe.PaymentIntent.create(
+        **payment_intent_params(payment, user_id),
+        idempotency_key=idempotency_key(payment),
+    )
+    Payment.objects.filter(pk=payment_id).update(
+        transaction_id=intent.id, stripe_client_secret=intent.client_secret,
+    )
+
+
+@task(priority=-10, max_attempts=1)
+def run_command(name, *args, **options):
+    """Run a management command; used by TASKS_SCHEDULE for periodic jobs."""
+    call_command(name, *args, **options)
+
+
+@task(priority=-10, max_attempts=1)
+def purge_finished_tasks():
+    cutoff = timezone.now() - timedelta(days=getattr(settings, 'TASKS_KEEP_DAYS', 7))
+    Task.objects.filter(status__in=[Task.SUCCEEDED, Task.FAILED], finished_at__lt=cutoff).delete()
+
+
+@task(priority=5)
+def match_saved_searches(*property_ids):
+    """Record which saved searches a new or changed listing satisfies."""
+    match_properties(property_ids)
+
+
+@task(priority=-5)
+def send_saved_search_digests(limit_per_search=10):
+    """Email each user one digest of listings matched since their last digest."""
+    pending = (
+        SavedSearchMatch.objects
+        .filter(
+            notified_at__isnull=True, search__is_active=True,
+            property__is_active=True, property__deleted_at__isnull=True,
+        )
+        .select_related('search__user', 'property')
+        .order_by('search__user_id', 'search_id', '-matched_at')
+    )
+    by_user = defaultdict(lambda: defaultdict(list))
+    match_ids = defaultdict(list)
+    for match in pending.iterator(chunk_size=1000):
+        user = match.search.user
+        match_ids[user].append(match.pk)
+        listings = by_user[user][match.search]
+        if len(listings) < limit_per_search:
+            listings.append({
+                'property': match.property,
+                'url': settings.SITE_URL + reverse('property_detail', args=[match.property_id]),
+            })
+
+    for user, searches in by_user.items():
+        if user.email:
+            context = {'user': user, 'searches': dict(searches), 'site_url': settings.SITE_URL}
+            send_mail(
+                subject='New listings for your saved searches',
+                message=render_to_string('emails/saved_search_digest.txt', context),
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                recipient_list=[user.email],
+            )
+        # Marked per user so a failure part-way does not resend earlier digests
+        SavedSearchMatch.objects.filter(pk__in=match_ids[user]).update(notified_at=timezone.now())
+
+
+@task(priority=-5, max_attempts=1)
+def flush_view_counters():
+    """Write the view counts buffered in Redis (VIEW_COUNTER_STORE = 'redis')."""
+    if settings.VIEW_COUNTER_STORE == 'redis':
+        flush_counters()
+
@@ -0,0 +1,17 @@
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from tenant_network.assets import bundle_paths
+
+register = template.Library()
+
+
+@register.simple_tag
+def bundle(name):
+    """Render the <link>/<script> tags for an ASSET_BUNDLES entry."""
+    if name.endswith('.css'):
+        tag = '<link rel="stylesheet" type="text/css" href="{}">\n'
+    else:
+        tag = '<script src="{}"></script>\n'
+    return format_html_join('', tag, ((static(path),) for path in bundle_paths(name)))
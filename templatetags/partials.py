@@ -0,0 +1,11 @@
+from django import template
+
+from tenant_network.templating import render_partial
+
+register = template.Library()
+
+
+@register.simple_tag
+def static_partial(name):
+    """Include a template that needs no context, e.g. the footer, from the partial cache."""
+    return render_partial(name)
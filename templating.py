@@ -0,0 +1,96 @@
+"""
+Template performance mode (TEMPLATE_PERFORMANCE_MODE).
+
+With it on, the project's templates are compiled into the cached loader
+when the process starts, partials that need no request context are
+rendered once per TEMPLATE_PARTIAL_SECONDS, and the markup of unbound
+forms is reused between requests (see forms.CachedLayoutMixin).
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from django.conf import settings
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.template.loader import get_template
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_partials = {}
+_layouts = OrderedDict()
+
+
+def enabled():
+    return getattr(settings, 'TEMPLATE_PERFORMANCE_MODE', False)
+
+
+def _template_dirs(loaders):
+    """Every directory the loaders search, the cached loader's wrapped ones included."""
+    for loader in loaders:
+        if hasattr(loader, 'loaders'):
+            yield from _template_dirs(loader.loaders)
+        elif hasattr(loader, 'get_dirs'):
+            yield from loader.get_dirs()
+
+
+def precompile_templates():
+    """
+    Compile every template the configured loaders can find (TEMPLATES DIRS,
+    this app's and third-party apps' template directories) so no request
+    pays for parsing.
+    """
+    if not enabled():
+        return 0
+    engine = engines['django'].engine
+    names = set()
+    for directory in dict.fromkeys(_template_dirs(engine.template_loaders)):
+        directory = Path(directory)
+        if directory.is_dir():
+            names.update(path.relative_to(directory).as_posix() for path in directory.rglob('*.html'))
+    compiled = 0
+    # By name, so a template shadowed by an earlier directory is compiled once, as requests see it
+    for name in sorted(names):
+        try:
+            engine.get_template(name)
+        except (TemplateDoesNotExist, TemplateSyntaxError) as exc:
+            logger.warning("Could not precompile %s: %s", name, exc)
+        else:
+            compiled += 1
+    return compiled
+
+
+def render_partial(name):
+    """
+    HTML of a template that uses no request context, rendered at most once
+    per TEMPLATE_PARTIAL_SECONDS in this process.
+    """
+    if not enabled():
+        return get_template(name).render()
+    now = time.monotonic()
+    cached = _partials.get(name)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+    html = get_template(name).render()
+    with _lock:
+        _partials[name] = (now + settings.TEMPLATE_PARTIAL_SECONDS, html)
+    return html
+
+
+def cached_layout(key, render):
+    """``render()``'s result, remembered under ``key`` in a bounded per-process LRU."""
+    if not enabled():
+        return render()
+    with _lock:
+        html = _layouts.get(key)
+        if html is not None:
+            _layouts.move_to_end(key)
+            return html
+    html = render()
+    with _lock:
+        _layouts[key] = html
+        while len(_layouts) > settings.FORM_LAYOUT_CACHE_SIZE:
+            _layouts.popitem(last=False)
+    return html
@@ -0,0 +1,27 @@
+"""
+Test settings with a second, separate local database standing in for a
+read replica, so routing is checked against diverging data:
+
+    DJANGO_SETTINGS_MODULE=tenant_network.tests.settings_replica python manage.py test tenant_network.tests.test_routers
+
+Nothing replicates between the two databases, which is also what replica
+lag looks like to a client.
+"""
+from tenant_network.routers import PrimaryReplicaRouter
+from tenant_network.settings import *  # noqa: F401,F403
+from tenant_network.settings import DATABASES
+
+
+class SchemaOnReplicaRouter(PrimaryReplicaRouter):
+    """Also migrate the stand-in replica; a real one gets its schema by replication."""
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return True
+
+
+# Exactly one replica, so the router cannot pick a mirror configured by PG_REPLICA_HOSTS
+DATABASES = {
+    'default': DATABASES['default'],
+    'replica': {**DATABASES['default'], 'TEST': {'NAME': f"test_{DATABASES['default']['NAME']}_replica"}},
+}
+DATABASE_ROUTERS = [SchemaOnReplicaRouter()]
@@ -0,0 +1,106 @@
+from datetime import date, timedelta
+from io import StringIO
+from unittest import skipIf, skipUnless
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+
+from tenant_network.models import Appointment, Message, Property, User
+from tenant_network.partitioning import (
+    convert_table, is_partitioned, is_supported, list_partitions, maintain_partitions, month_start,
+)
+
+
+def make_message(sender, recipient, sent_at=None):
+    message = Message.objects.create(sender=sender, recipient=recipient, subject='Viewing', body='Is it free?')
+    if sent_at is not None:
+        Message.objects.filter(pk=message.pk).update(sent_at=sent_at)
+    return message
+
+
+class MonthStartTests(SimpleTestCase):
+    def test_first_of_month(self):
+        self.assertEqual(month_start(date(2024, 5, 17)), date(2024, 5, 1))
+
+    def test_offsets_cross_year_boundaries(self):
+        self.assertEqual(month_start(date(2024, 11, 15), 2), date(2025, 1, 1))
+        self.assertEqual(month_start(date(2024, 1, 31), -1), date(2023, 12, 1))
+
+
+@skipIf(connection.vendor == 'postgresql', 'covers the plain-table fallback')
+class PlainTableFallbackTests(TestCase):
+    def setUp(self):
+        self.sender = User.objects.create_user('sender', 'sender@example.com', 'x')
+        self.recipient = User.objects.create_user('recipient', 'recipient@example.com', 'x')
+
+    def test_not_supported(self):
+        self.assertFalse(is_supported())
+
+    def test_command_leaves_plain_tables_alone(self):
+        out = StringIO()
+        call_command('manage_partitions', '--convert', stdout=out)
+        self.assertIn('plain tables are left as they are', out.getvalue())
+
+    def test_plain_tables_keep_working(self):
+        message = make_message(self.sender, self.recipient, timezone.now() - timedelta(days=400))
+        self.assertEqual(Message.objects.get(pk=message.pk).subject, 'Viewing')
+
+
+@skipUnless(connection.vendor == 'postgresql', 'partitioning needs PostgreSQL')
+class ConvertTableTests(TransactionTestCase):
+    def setUp(self):
+        self.sender = User.objects.create_user('sender', 'sender@example.com', 'x')
+        self.recipient = User.objects.create_user('recipient', 'recipient@example.com', 'x')
+
+    def test_convert_keeps_rows_and_ids(self):
+        old_sent_at = timezone.now() - timedelta(days=70)
+        old = make_message(self.sender, self.recipient, old_sent_at)
+        recent = make_message(self.sender, self.recipient)
+        table = Message._meta.db_table
+
+        self.assertTrue(convert_table(Message, 'sent_at', months_ahead=1))
+        self.assertTrue(is_partitioned(table))
+        self.assertFalse(convert_table(Message, 'sent_at'))
+
+        self.assertEqual(set(Message.objects.values_list('pk', flat=True)), {old.pk, recent.pk})
+        added = make_message(self.sender, self.recipient)
+        self.assertGreater(added.pk, recent.pk)
+
+        partitions = list_partitions(table)
+        this_month = month_start(date.today())
+        self.assertIn(month_start(old_sent_at.date()), partitions)
+        self.assertIn(month_start(this_month, 1), partitions)
+
+    def test_maintain_creates_upcoming_months(self):
+        # The table may already be converted by another test in this run
+        convert_table(Message, 'sent_at', months_ahead=0)
+        created, removed = maintain_partitions(Message, 'sent_at', months_ahead=2)
+        self.assertIn(month_start(date.today(), 2), list_partitions(Message._meta.db_table))
+        self.assertEqual(removed, [])
+
+    def test_maintain_moves_rows_out_of_default(self):
+        landlord = User.objects.create_user('landlord', 'landlord@example.com', 'x', user_type='landlord')
+        listing = Property.objects.create(
+            landlord=landlord, title='Flat', description='Bright', property_type='apartment', price=1000,
+            bedrooms=1, bathrooms=1, sqft=500, address='1 Main St', city='Harare', state='HA', zip_code='0000',
+        )
+        convert_table(Appointment, 'requested_date', months_ahead=1)
+        table = Appointment._meta.db_table
+        requested = timezone.now() + timedelta(days=183)
+        month = month_start(requested.date())
+        self.assertNotIn(month, list_partitions(table))
+        appointment = Appointment.objects.create(
+            property=listing, requester=self.recipient, landlord=landlord, requested_date=requested,
+        )
+
+        maintain_partitions(Appointment, 'requested_date', months_ahead=7)
+
+        self.assertIn(month, list_partitions(table))
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT id FROM "{list_partitions(table)[month]}"')
+            self.assertEqual(cursor.fetchall(), [(appointment.pk,)])
+            cursor.execute(f'SELECT COUNT(*) FROM "{table}_default"')
+            self.assertEqual(cursor.fetchone()[0], 0)
+        self.assertEqual(Appointment.objects.get(pk=appointment.pk).requested_date, requested)
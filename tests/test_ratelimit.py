@@ -0,0 +1,58 @@
+from types import SimpleNamespace
+
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from tenant_network.ratelimit import RateLimitMiddleware, client_ip
+
+
+def view(request):
+    return HttpResponse()
+
+
+class ClientIpTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_header_ignored_without_trusted_proxies(self):
+        request = self.factory.get('/', HTTP_X_FORWARDED_FOR='203.0.113.9', REMOTE_ADDR='10.0.0.1')
+        with override_settings(RATELIMIT_TRUSTED_PROXIES=0):
+            self.assertEqual(client_ip(request), '10.0.0.1')
+
+    def test_spoofed_entries_left_of_the_proxy_are_ignored(self):
+        request = self.factory.get('/', HTTP_X_FORWARDED_FOR='1.2.3.4, 198.51.100.7', REMOTE_ADDR='10.0.0.1')
+        with override_settings(RATELIMIT_TRUSTED_PROXIES=1):
+            self.assertEqual(client_ip(request), '198.51.100.7')
+
+    def test_counts_trusted_hops_from_the_right(self):
+        request = self.factory.get(
+            '/', HTTP_X_FORWARDED_FOR='1.2.3.4, 198.51.100.7, 10.0.0.2', REMOTE_ADDR='10.0.0.1',
+        )
+        with override_settings(RATELIMIT_TRUSTED_PROXIES=2):
+            self.assertEqual(client_ip(request), '198.51.100.7')
+
+    def test_short_header_falls_back_to_remote_addr(self):
+        request = self.factory.get('/', HTTP_X_FORWARDED_FOR='198.51.100.7', REMOTE_ADDR='10.0.0.1')
+        with override_settings(RATELIMIT_TRUSTED_PROXIES=2):
+            self.assertEqual(client_ip(request), '10.0.0.1')
+
+
+@override_settings(
+    RATELIMIT_ENABLED=True, RATELIMIT_STORE='local', RATELIMIT_TRUSTED_PROXIES=1,
+    RATELIMITS={'login': [{'per': 'ip', 'rate': '1/h', 'burst': 2}]},
+)
+class SpoofedForwardedForTests(SimpleTestCase):
+    def test_fresh_spoofed_address_does_not_reset_the_bucket(self):
+        middleware = RateLimitMiddleware(view)
+        factory = RequestFactory()
+        statuses = []
+        for attempt in range(4):
+            request = factory.post(
+                '/login/', HTTP_X_FORWARDED_FOR=f'192.0.2.{attempt}, 198.51.100.7', REMOTE_ADDR='10.0.0.1',
+            )
+            request.user = AnonymousUser()
+            request.resolver_match = SimpleNamespace(url_name='login')
+            response = middleware.process_view(request, view, (), {})
+            statuses.append(response.status_code if response else 200)
+        self.assertEqual(statuses, [200, 200, 429, 429])
@@ -0,0 +1,152 @@
+import time
+from types import SimpleNamespace
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.db import router
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from tenant_network.models import Property, User
+from tenant_network.routers import (
+    PRIMARY_DB, STICKY_COOKIE, PrimaryReplicaRouter, ReplicaRoutingMiddleware, _use_replica,
+)
+
+
+def view(request):
+    return HttpResponse()
+
+
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        patcher = mock.patch('tenant_network.routers.replica_aliases', return_value=['replica'])
+        self.aliases = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reads_stay_on_primary_outside_read_views(self):
+        self.assertIsNone(self.router.db_for_read(Property))
+
+    def test_reads_go_to_replica_in_read_views(self):
+        token = _use_replica.set(True)
+        try:
+            self.assertEqual(self.router.db_for_read(Property), 'replica')
+        finally:
+            _use_replica.reset(token)
+
+    def test_no_replicas_configured(self):
+        self.aliases.return_value = []
+        token = _use_replica.set(True)
+        try:
+            self.assertIsNone(self.router.db_for_read(Property))
+        finally:
+            _use_replica.reset(token)
+
+    def test_writes_always_go_to_primary(self):
+        token = _use_replica.set(True)
+        try:
+            self.assertEqual(self.router.db_for_write(Property), PRIMARY_DB)
+        finally:
+            _use_replica.reset(token)
+
+
+@override_settings(DATABASE_REPLICA_VIEWS=['property_list'], DATABASE_REPLICA_STICKY_SECONDS=15)
+class ReplicaRoutingMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        patcher = mock.patch('tenant_network.routers.replica_aliases', return_value=['replica'])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def serve(self, request, url_name, status=200):
+        """Run ``request`` through the middleware; returns (read alias seen by the view, response)."""
+        seen = []
+
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            seen.append(router.db_for_read(Property))
+            return HttpResponse(status=status)
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        request.resolver_match = SimpleNamespace(url_name=url_name)
+        response = middleware(request)
+        return seen[0], response
+
+    def test_read_view_uses_replica(self):
+        alias, _ = self.serve(self.factory.get('/properties/'), 'property_list')
+        self.assertEqual(alias, 'replica')
+        self.assertFalse(_use_replica.get())
+
+    def test_other_views_use_primary(self):
+        alias, _ = self.serve(self.factory.get('/dashboard/'), 'dashboard')
+        self.assertEqual(alias, PRIMARY_DB)
+
+    def test_unsafe_methods_use_primary_and_pin_the_client(self):
+        alias, response = self.serve(self.factory.post('/properties/'), 'property_list')
+        self.assertEqual(alias, PRIMARY_DB)
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+    def test_failed_writes_do_not_pin(self):
+        _, response = self.serve(self.factory.post('/properties/'), 'property_list', status=400)
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+    def test_pinned_client_reads_from_primary(self):
+        request = self.factory.get('/properties/')
+        request.COOKIES[STICKY_COOKIE] = str(int(time.time()) + 10)
+        alias, _ = self.serve(request, 'property_list')
+        self.assertEqual(alias, PRIMARY_DB)
+
+
+def has_separate_replica():
+    replica = settings.DATABASES.get('replica')
+    return replica is not None and not replica.get('TEST', {}).get('MIRROR')
+
+
+@skipUnless(has_separate_replica(), 'run with DJANGO_SETTINGS_MODULE=tenant_network.tests.settings_replica')
+@override_settings(DATABASE_REPLICA_VIEWS=['property_list'], DATABASE_REPLICA_STICKY_SECONDS=15)
+class SeparateReplicaTests(TestCase):
+    """
+    Two separate databases: the listing written in setUp exists only on the
+    primary, as if replication had not caught up yet.
+    """
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        landlord = User.objects.create_user('landlord', 'landlord@example.com', 'x', user_type='landlord')
+        self.listing = Property.objects.create(
+            landlord=landlord, title='Flat', description='Bright', property_type='apartment', price=1000,
+            bedrooms=1, bathrooms=1, sqft=500, address='1 Main St', city='Harare', state='HA', zip_code='0000',
+        )
+
+    def serve(self, request, url_name):
+        """Run ``request`` through the middleware; returns (listing pks the view read, response)."""
+        seen = []
+
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            seen.extend(Property.objects.values_list('pk', flat=True))
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        request.resolver_match = SimpleNamespace(url_name=url_name)
+        response = middleware(request)
+        return seen, response
+
+    def test_read_view_is_served_by_the_replica(self):
+        with self.assertNumQueries(1, using='replica'), self.assertNumQueries(0, using='default'):
+            listings, _ = self.serve(self.factory.get('/properties/'), 'property_list')
+        self.assertEqual(listings, [])
+
+    def test_other_views_are_served_by_the_primary(self):
+        with self.assertNumQueries(0, using='replica'), self.assertNumQueries(1, using='default'):
+            listings, _ = self.serve(self.factory.get('/dashboard/'), 'dashboard')
+        self.assertEqual(listings, [self.listing.pk])
+
+    def test_sticky_cookie_hides_replica_lag(self):
+        _, response = self.serve(self.factory.post('/properties/'), 'property_list')
+        request = self.factory.get('/properties/')
+        request.COOKIES[STICKY_COOKIE] = response.cookies[STICKY_COOKIE].value
+        with self.assertNumQueries(0, using='replica'), self.assertNumQueries(1, using='default'):
+            listings, _ = self.serve(request, 'property_list')
+        self.assertEqual(listings, [self.listing.pk])
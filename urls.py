@@ -5,6 +5,8 @@ from .forms import CustomAuthenticationForm
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
+from . import api
+from .instrumentation import metrics_view
 from .views import (
     HomeView,
     PropertyListView,
@@ -21,8 +23,8 @@ from .views import (
     ProfileUpdateView,
     RegisterView,
     delete_property,
-    toggle_favorite,    PropertyVideoCreateView, RentalAgreementCreateView, RentalAgreementDetailView,AboutView,
-    sign_agreement, create_stripe_payment_intent, payment_success, payment_failed # Make sure this is imported
+    toggle_favorite,    PropertyVideoCreateView, RentalAgreementCreateView, AboutView,
+    sign_agreement, create_stripe_payment_intent, payment_intent_status, payment_success, payment_failed # Make sure this is imported
 )
 
 urlpatterns = [
@@ -34,9 +36,16 @@ urlpatterns = [
     path('properties/', views.PropertyListView.as_view(), name='property_list'),
     path('properties/<int:pk>/', views.PropertyDetailView.as_view(), name='property_detail'),
     path('properties/add/', views.PropertyCreateView.as_view(), name='property_create'),
+    path('properties/price-benchmark/', views.price_benchmark, name='price_benchmark'),
     path('properties/<int:pk>/edit/', views.PropertyUpdateView.as_view(), name='property_update'),
     path('properties/<int:pk>/images/', views.property_images, name='property_images'),
+    path('properties/<int:pk>/images/bulk/', views.bulk_upload_images, name='bulk_upload_images'),
+    path('properties/<int:pk>/images/<int:image_pk>/main/', views.set_main_image, name='set_main_image'),
+    path('properties/<int:pk>/images/<int:image_pk>/delete/', views.delete_image, name='delete_image'),
     path('property/<int:pk>/toggle-favorite/', toggle_favorite, name='toggle_favorite'),
+    path('saved-searches/', views.saved_search_list, name='saved_search_list'),
+    path('saved-searches/add/', views.saved_search_create, name='saved_search_create'),
+    path('saved-searches/<int:pk>/delete/', views.saved_search_delete, name='saved_search_delete'),
     # Messaging
     path('messages/send/', views.MessageCreateView.as_view(), name='message_create'),
     
@@ -65,13 +74,27 @@ urlpatterns = [
     path('contact/', views.contact_view, name='contact'),
     # Rental Agreements
     path('property/<int:pk>/rent/<int:tenant_pk>/', RentalAgreementCreateView.as_view(), name='create_rental_agreement'),
-    path('rental-agreement/<int:pk>/', RentalAgreementDetailView.as_view(), name='rental_agreement_detail'),
+    path('rental-agreement/<int:pk>/', views.rental_agreement_detail, name='rental_agreement_detail'),
     path('rental-agreement/<int:pk>/sign/', sign_agreement, name='sign_agreement'),
+    path('rental-agreement/<int:pk>/document/', views.agreement_document, name='agreement_document'),
+    path('rental-agreements/arrears/', views.arrears_report, name='arrears_report'),
+    path('tenants/screening/', views.tenant_screening, name='tenant_screening'),
     
     # Payments
     path('payments/<int:pk>/create-intent/', create_stripe_payment_intent, name='create_payment_intent'),
+    path('payments/<int:pk>/intent-status/', payment_intent_status, name='payment_intent_status'),
     path('payments/<int:pk>/success/', payment_success, name='payment_success'),
     path('payments/<int:pk>/failed/', payment_failed, name='payment_failed'),
+
+    # JSON API
+    path('api/properties/', api.property_list_api, name='api_property_list'),
+    path('api/properties/export/', api.property_export_api, name='api_property_export'),
+    path('api/properties/<int:pk>/', api.property_detail_api, name='api_property_detail'),
+    path('api/changes/', api.change_feed, name='api_change_feed'),
+    path('api/changes/messages/', api.message_change_feed, name='api_message_change_feed'),
+
+    # Monitoring
+    path('metrics/', metrics_view, name='metrics'),
 ]+ static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 
 if settings.DEBUG:
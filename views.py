@@ -4,16 +4,38 @@ from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib import messages,admin
 from django.urls import reverse_lazy
 from django.forms import inlineformset_factory
-from .models import Property, PropertyImage, Amenity, Message, Appointment, Review, User,PropertyVideo, RentalAgreement, Payment
-from .forms import PropertyForm, PropertyImageForm, MessageForm, AppointmentForm, ReviewForm, UserProfileForm, CustomUserCreationForm,PropertyVideoForm, RentalAgreementForm, PaymentForm
+from .models import Property, PropertyImage, PropertyAmenity, Amenity, Message, Appointment, Review, User,PropertyVideo, RentalAgreement, Payment, SavedSearch, AgreementBalance, Task
+from .forms import PropertyForm, PropertyImageForm, MessageForm, AppointmentForm, ReviewForm, UserProfileForm, CustomUserCreationForm,PropertyVideoForm, RentalAgreementForm, PaymentForm, SavedSearchForm
 from django.contrib.auth import get_user_model
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.views import LoginView,LogoutView
 from django.views.decorators.http import require_POST
-from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.http import Http404, JsonResponse
+from asgiref.sync import sync_to_async
+import asyncio
+import logging
 from django.contrib.auth.decorators import login_required,user_passes_test
 import stripe
 from django.conf import settings
+from django.utils import timezone
+from datetime import timedelta
+from .analytics import get_price_benchmark
+from .http_caching import ConditionalResponseMixin, ranged_file_response, related_version
+from .search import filter_properties, number_param
+from .amenities import amenities_for, catalog, catalog_version
+from .popularity import record_impressions, record_view
+from .gallery import HashingUploadHandler, add_images, save_image_formset
+from .tasks import create_first_payment, create_payment_intent, generate_agreement_document
+from .documents import document_version
+from .ledger import landlord_arrears
+from .password_pool import HasherBusy
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
+from .stripe_gateway import create_payment_intent_async
+from django.db.models import Count, Exists, F, OuterRef
+
+logger = logging.getLogger(__name__)
 
 
 # Initialize Stripe
@@ -34,15 +56,19 @@ def home(request):
         'featured_properties': featured_properties
     })
 @require_POST
-def toggle_favorite(request, pk):
-    property = get_object_or_404(Property, pk=pk)
-    user = request.user
-    
-    if property in user.favorite_properties.all():
-        user.favorite_properties.remove(property)
+async def toggle_favorite(request, pk):
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'error': 'Please log in to save favorites.'}, status=401)
+    if not await Property.objects.filter(pk=pk).aexists():
+        raise Http404('No property found')
+    
+    # Deleting the link row tells us whether it was a favorite in one query
+    removed, _ = await Property.favorited_by.through.objects.filter(property_id=pk, user_id=user.pk).adelete()
+    if removed:
         is_favorite = False
     else:
-        user.favorite_properties.add(property)
+        await user.favorite_properties.aadd(pk)
         is_favorite = True
     
     return JsonResponse({'is_favorite': is_favorite})
@@ -75,58 +101,136 @@ class RegisterView(CreateView):
     success_url = reverse_lazy('login')
     
     def form_valid(self, form):
-        user = form.save(commit=False)
+        try:
+            # Saving again through super() would hash the password twice
+            user = form.save(commit=False)
+        except HasherBusy:
+            form.add_error(None, "We're handling a lot of sign-ups right now. Please try again in a moment.")
+            return self.form_invalid(form)
         user.is_verified = False
         user.save()
-        return super().form_valid(form)
+        self.object = user
+        return redirect(self.get_success_url())
+
+def listing_versions(queryset):
+    # The rows a page shows, in order, with what their cards render; a new main
+    # image changes main_image_id and updated_at (see Property.set_main_image)
+    return list(queryset.values_list('pk', 'updated_at', 'main_image_id'))
 
-class HomeView(ListView):
+class HomeView(ConditionalResponseMixin, ListView):
     model = Property
     template_name = 'home.html'
     context_object_name = 'featured_properties'
     
+    def get_featured_queryset(self):
+        return Property.objects.filter(is_active=True, is_verified=True)
+    
     def get_queryset(self):
-        return Property.objects.filter(is_active=True, is_verified=True).order_by('-created_at')[:6]
+        return self.get_featured_queryset().order_by('-created_at')[:6]
+    
+    def get_trending_ids(self):
+        if not hasattr(self, '_trending_ids'):
+            self._trending_ids = list(
+                Property.objects.filter(is_active=True, popularity__gt=0)
+                .order_by('-popularity').values_list('pk', flat=True)[:6]
+            )
+        return self._trending_ids
+    
+    def get_cache_versions(self):
+        trending_ids = self.get_trending_ids()
+        return [
+            *listing_versions(self.get_queryset()),
+            trending_ids,
+            *listing_versions(Property.objects.filter(pk__in=trending_ids).order_by('pk')),
+        ]
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        trending_ids = self.get_trending_ids()
+        trending = Property.objects.in_bulk(trending_ids)
+        context['trending_properties'] = [trending[pk] for pk in trending_ids if pk in trending]
+        record_impressions({prop.pk for prop in context['featured_properties']} | set(trending))
+        return context
 
-class PropertyListView(ListView):
+class PropertyListView(ConditionalResponseMixin, ListView):
     model = Property
     template_name = 'listings/property_list.html'
     context_object_name = 'properties'
     paginate_by = 12
     
+    def get_cache_versions(self):
+        page = self.request.GET.get(self.page_kwarg) or '1'
+        if not page.isdigit():
+            # Leave 'last' and bad page numbers to the paginator
+            return None
+        queryset = self.get_queryset()
+        # The pagination links need the count anyway; get_paginator() reuses it
+        self._listing_count = queryset.count()
+        start = (max(int(page), 1) - 1) * self.paginate_by
+        # Rows are listed in page order, so re-ranking (trending, reputation) changes the ETag too
+        return [
+            self.request.GET.urlencode(), catalog_version(), self._listing_count,
+            *listing_versions(queryset[start:start + self.paginate_by]),
+        ]
+    
+    def get_paginator(self, *args, **kwargs):
+        paginator = super().get_paginator(*args, **kwargs)
+        if hasattr(self, '_listing_count'):
+            paginator.count = self._listing_count
+        return paginator
+    
     def get_queryset(self):
-        queryset = Property.objects.filter(is_active=True)
-        
-        property_type = self.request.GET.get('property_type')
-        if property_type:
-            queryset = queryset.filter(property_type=property_type)
-            
-        location = self.request.GET.get('location')
-        if location:
-            queryset = queryset.filter(city__iexact=location)
-            
-        bedrooms = self.request.GET.get('bedrooms')
-        if bedrooms:
-            if bedrooms == '3':
-                queryset = queryset.filter(bedrooms__gte=3)
-            else:
-                queryset = queryset.filter(bedrooms=bedrooms)
-                
-        min_price = self.request.GET.get('min_price')
-        if min_price:
-            queryset = queryset.filter(price__gte=min_price)
-            
-        max_price = self.request.GET.get('max_price')
-        if max_price:
-            queryset = queryset.filter(price__lte=max_price)
-            
+        queryset = filter_properties(Property.objects.filter(is_active=True), self.request.GET)
+        sort = self.request.GET.get('sort')
+        if sort == 'trending':
+            return queryset.order_by('-popularity', '-created_at')
+        if sort == 'reputation':
+            return queryset.order_by(F('landlord__reputation__score').desc(nulls_last=True), '-created_at')
         return queryset.order_by('-created_at')
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        record_impressions([prop.pk for prop in context['properties']])
+        context['amenity_catalog'] = catalog().values()
+        context['selected_amenities'] = self.request.GET.getlist('amenity')
+        return context
 
-class PropertyDetailView(DetailView):
+class PropertyDetailView(ConditionalResponseMixin, DetailView):
     model = Property
     template_name = 'listings/property_detail.html'
     context_object_name = 'property'
     
+    def dispatch(self, request, *args, **kwargs):
+        response = super().dispatch(request, *args, **kwargs)
+        # Revalidated (304) page loads are views too
+        if request.method == 'GET' and response.status_code in (200, 304):
+            record_view(self.kwargs['pk'])
+        return response
+    
+    def get_cache_versions(self):
+        queryset = Property.objects.filter(pk=self.kwargs['pk']).annotate(
+            image_version=related_version(PropertyImage, 'uploaded_at'),
+            image_count=related_version(PropertyImage),
+            video_version=related_version(PropertyVideo, 'uploaded_at'),
+            video_count=related_version(PropertyVideo),
+            amenity_version=related_version(PropertyAmenity, 'pk'),
+            amenity_count=related_version(PropertyAmenity),
+            review_version=related_version(Review, 'updated_at'),
+            review_count=related_version(Review),
+        )
+        fields = ['updated_at', 'image_version', 'image_count', 'video_version', 'video_count',
+                  'amenity_version', 'amenity_count', 'review_version', 'review_count']
+        if self.request.user.is_authenticated:
+            queryset = queryset.annotate(is_favorite=Exists(
+                Property.favorited_by.through.objects.filter(
+                    property_id=OuterRef('pk'), user_id=self.request.user.pk
+                )
+            ))
+            fields.append('is_favorite')
+        versions = queryset.values_list(*fields).first()
+        # Unknown pk: skip validators and let get_object() raise the 404
+        return [*versions, catalog_version()] if versions else None
+    
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['message_form'] = MessageForm(initial={
@@ -137,6 +241,7 @@ class PropertyDetailView(DetailView):
             'property': self.object,
             'landlord': self.object.landlord
         })
+        context['amenities'] = amenities_for([self.object.pk])[self.object.pk]
         if self.request.user.is_authenticated:
             context['is_favorite'] = self.object.favorited_by.filter(id=self.request.user.id).exists()
         return context
@@ -149,6 +254,27 @@ def share_property(request, pk):
 
 # urls.py
 
+@login_required
+def price_benchmark(request):
+    benchmark = get_price_benchmark(
+        request.GET.get('city'),
+        request.GET.get('property_type'),
+        request.GET.get('bedrooms'),
+    )
+    if benchmark is None:
+        return JsonResponse({'error': 'No benchmark available for this combination'}, status=404)
+    
+    return JsonResponse({
+        'city': benchmark.city,
+        'property_type': benchmark.property_type,
+        'bedrooms': benchmark.bedrooms,
+        'p25': str(benchmark.p25),
+        'p50': str(benchmark.p50),
+        'p75': str(benchmark.p75),
+        'sample_size': benchmark.sample_size,
+        'refreshed_at': benchmark.refreshed_at.isoformat(),
+    })
+
 class PropertyCreateView(LoginRequiredMixin, UserPassesTestMixin, CreateView):
     model = Property
     form_class = PropertyForm
@@ -175,10 +301,7 @@ class PropertyCreateView(LoginRequiredMixin, UserPassesTestMixin, CreateView):
             self.object.save()
             
             # Save property images
-            images = image_formset.save(commit=False)
-            for image in images:
-                image.property = self.object
-                image.save()
+            save_image_formset(image_formset, self.object)
             
             messages.success(self.request, 'Property created successfully!')
             return redirect('property_detail', pk=self.object.pk)
@@ -212,15 +335,8 @@ class PropertyUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
         if image_formset.is_valid():
             self.object = form.save()
             
-            # Save property images
-            images = image_formset.save(commit=False)
-            for image in images:
-                image.property = self.object
-                image.save()
-            
-            # Delete marked images
-            for image in image_formset.deleted_objects:
-                image.delete()
+            # Save property images, deleting those marked for removal
+            save_image_formset(image_formset, self.object)
             
             messages.success(self.request, 'Property updated successfully!')
             return redirect('property_detail', pk=self.object.pk)
@@ -237,25 +353,74 @@ PropertyImageFormSet = inlineformset_factory(
     can_delete=True
 )
 
+@login_required
 def property_images(request, pk):
-    property = get_object_or_404(Property, pk=pk)
+    property = get_object_or_404(Property, pk=pk, landlord=request.user)
     
     if request.method == 'POST':
         form = PropertyImageForm(request.POST, request.FILES)
         if form.is_valid():
-            image = form.save(commit=False)
-            image.property = property
-            image.save()
-            messages.success(request, 'Image uploaded successfully!')
+            created, skipped, rejected = add_images(
+                property, [form.cleaned_data['image']], main=0 if form.cleaned_data['is_main'] else None
+            )
+            if created:
+                messages.success(request, 'Image uploaded successfully!')
+            else:
+                messages.warning(request, 'This listing already has that image.')
             return redirect('property_images', pk=property.pk)
     else:
         form = PropertyImageForm()
     
     return render(request, 'listings/property_images.html', {
         'property': property,
-        'form': form
+        'image_form': form
     })
 
+@login_required
+@require_POST
+def set_main_image(request, pk, image_pk):
+    property = get_object_or_404(Property, pk=pk, landlord=request.user)
+    image = get_object_or_404(PropertyImage, pk=image_pk, property=property)
+    property.set_main_image(image)
+    messages.success(request, 'Main image updated.')
+    return redirect('property_images', pk=property.pk)
+
+@login_required
+@require_POST
+def delete_image(request, pk, image_pk):
+    property = get_object_or_404(Property, pk=pk, landlord=request.user)
+    image = get_object_or_404(PropertyImage, pk=image_pk, property=property)
+    was_main = image.pk == property.main_image_id
+    image.delete()
+    if was_main:
+        # Promote the next image rather than leave the listing without one
+        property.set_main_image(property.images.first())
+    messages.success(request, 'Image deleted.')
+    return redirect('property_images', pk=property.pk)
+
+# CSRF is checked in _bulk_upload_images, once the hashing upload handler is in place
+@csrf_exempt
+@login_required
+def bulk_upload_images(request, pk):
+    request.upload_handlers = [HashingUploadHandler(request)]
+    return _bulk_upload_images(request, pk)
+
+@csrf_protect
+@require_POST
+def _bulk_upload_images(request, pk):
+    property = get_object_or_404(Property, pk=pk, landlord=request.user)
+    created, skipped, rejected = add_images(property, request.FILES.getlist('images'), main=request.POST.get('main'))
+    if created:
+        similar = sum(1 for image in created if image.similar_to_id)
+        messages.success(request, f'{len(created)} image(s) uploaded.')
+        if similar:
+            messages.info(request, f'{similar} of them look like photos you have already uploaded.')
+    if skipped:
+        messages.warning(request, f'Skipped {len(skipped)} duplicate or surplus image(s): {", ".join(skipped)}')
+    if rejected:
+        messages.error(request, f'Not images: {", ".join(rejected)}')
+    return redirect('property_images', pk=property.pk)
+
 class MessageCreateView(LoginRequiredMixin, CreateView):
     model = Message
     form_class = MessageForm
@@ -315,14 +480,16 @@ class DashboardView(LoginRequiredMixin, TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         user = self.request.user
+        # A lower bound lets Postgres skip old monthly partitions
+        since = timezone.now() - timedelta(days=settings.RECENT_ACTIVITY_DAYS)
         
         if user.user_type == 'landlord':
             context['properties'] = Property.objects.filter(landlord=user)
             context['appointments'] = Appointment.objects.filter(
-                landlord=user
+                landlord=user, requested_date__gte=since
             ).order_by('-requested_date')[:5]
             context['messages'] = Message.objects.filter(
-                recipient=user
+                recipient=user, sent_at__gte=since
             ).order_by('-sent_at')[:5]
             context['reviews'] = Review.objects.filter(
                 reviewee=user
@@ -330,20 +497,50 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         else:
             context['favorites'] = user.favorite_properties.all()[:6]
             context['appointments'] = Appointment.objects.filter(
-                requester=user
+                requester=user, requested_date__gte=since
             ).order_by('-requested_date')[:5]
             context['messages'] = Message.objects.filter(
-                sender=user
+                sender=user, sent_at__gte=since
             ).order_by('-sent_at')[:5]
         
         return context
 
+@login_required
+@require_POST
+def saved_search_create(request):
+    form = SavedSearchForm(request.user, request.POST)
+    if not form.is_valid():
+        for error in [*form.non_field_errors(), *(
+            f'{form.fields[name].label}: {message}'
+            for name, errors in form.errors.items() if name != '__all__' for message in errors
+        )]:
+            messages.error(request, error)
+        searches = request.user.saved_searches.annotate(match_count=Count('matches'))
+        return render(request, 'listings/saved_searches.html', {'searches': searches}, status=400)
+    search = form.save()
+    messages.success(request, f'Saved "{search}". We will email you when new listings match.')
+    return redirect('saved_search_list')
+
+@login_required
+def saved_search_list(request):
+    searches = request.user.saved_searches.annotate(match_count=Count('matches'))
+    return render(request, 'listings/saved_searches.html', {'searches': searches})
+
+@login_required
+@require_POST
+def saved_search_delete(request, pk):
+    search = get_object_or_404(SavedSearch, pk=pk, user=request.user)
+    search.delete()
+    messages.success(request, 'Saved search removed.')
+    return redirect('saved_search_list')
+
 @login_required
 def delete_property(request, pk):
     property = get_object_or_404(Property, pk=pk, landlord=request.user)
     
     if request.method == 'POST':
-        property.delete()
+        # Related rows are removed later by purge_deleted_properties
+        property.soft_delete()
         messages.success(request, 'Property deleted successfully!')
         return redirect('dashboard')
     
@@ -414,19 +611,39 @@ class RentalAgreementCreateView(LoginRequiredMixin, UserPassesTestMixin, CreateV
         messages.success(self.request, 'Rental agreement created successfully!')
         return reverse('rental_agreement_detail', kwargs={'pk': self.object.pk})
 
-class RentalAgreementDetailView(LoginRequiredMixin, DetailView):
-    model = RentalAgreement
-    template_name = 'rentals/agreement_detail.html'
+@login_required
+async def rental_agreement_detail(request, pk):
+    try:
+        agreement = await RentalAgreement.objects.select_related(
+            'property', 'landlord', 'tenant', 'balance'
+        ).aget(pk=pk)
+    except RentalAgreement.DoesNotExist:
+        raise Http404('No rental agreement found')
+    user = await request.auser()
+    if user.pk not in (agreement.landlord_id, agreement.tenant_id):
+        raise Http404('No rental agreement found')
+    
+    try:
+        balance = agreement.balance
+    except AgreementBalance.DoesNotExist:
+        balance = None  # No payments booked yet
+    paginator = Paginator(agreement.payments.order_by('-due_date', '-pk'), 12)
+    payments = await sync_to_async(paginator.get_page)(request.GET.get('page'))
     
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context['payment_form'] = PaymentForm(initial={
-            'amount': self.object.monthly_rent,
+    context = {
+        'agreement': agreement,
+        'object': agreement,
+        'balance': balance,
+        'payments': payments,
+        'payment_form': PaymentForm(initial={
+            'amount': agreement.monthly_rent,
             'payment_date': timezone.now().date(),
-            'due_date': self.object.start_date,
-        })
-        context['stripe_public_key'] = settings.STRIPE_PUBLIC_KEY
-        return context
+            'due_date': agreement.start_date,
+        }),
+        'stripe_public_key': settings.STRIPE_PUBLIC_KEY,
+    }
+    # Rendering touches the session (messages) and lazy template lookups, which are sync
+    return await sync_to_async(render)(request, 'rentals/agreement_detail.html', context)
 
 @login_required
 def sign_agreement(request, pk):
@@ -440,45 +657,120 @@ def sign_agreement(request, pk):
     if agreement.signed_by_landlord and agreement.signed_by_tenant:
         agreement.status = 'active'
         agreement.signed_at = timezone.now()
-        
-        # Create first payment record
-        Payment.objects.create(
-            rental_agreement=agreement,
-            amount=agreement.monthly_rent,
-            payment_method='stripe',
-            status='pending',
-            payment_date=timezone.now().date(),
-            due_date=agreement.start_date,
-        )
     
     agreement.save()
+    if agreement.status == 'active':
+        # First payment record and the signed PDF are created by the task worker
+        create_first_payment.enqueue(args=(agreement.pk,), dedupe_key=f'first-payment:{agreement.pk}')
+        _queue_agreement_document(agreement)
     messages.success(request, 'Agreement signed successfully!')
     return redirect('rental_agreement_detail', pk=agreement.pk)
 
+def _queue_agreement_document(agreement, version=None):
+    version = version or document_version(agreement)
+    # One task per version: re-signing or reloading never renders the same PDF twice
+    generate_agreement_document.enqueue(
+        args=(agreement.pk,), dedupe_key=f'agreement-pdf:{agreement.pk}:{version}'
+    )
+
 @login_required
-def create_stripe_payment_intent(request, pk):
-    payment = get_object_or_404(Payment, pk=pk)
+def tenant_screening(request):
+    """Everyone who asked to view one of the landlord's listings, best reputation first."""
+    if request.user.user_type != 'landlord':
+        raise PermissionDenied
+    applicants = User.objects.filter(
+        pk__in=Appointment.objects.filter(landlord=request.user).values('requester')
+    ).select_related('reputation').order_by(F('reputation__score').desc(nulls_last=True))
+    # A malformed score is ignored rather than failing the query
+    min_score = number_param(request.GET, 'min_score', float)
+    if min_score is not None:
+        applicants = applicants.filter(reputation__score__gte=min_score)
+    page = Paginator(applicants, 25).get_page(request.GET.get('page'))
+    return render(request, 'rentals/tenant_screening.html', {'applicants': page, 'min_score': min_score})
+
+@login_required
+def arrears_report(request):
+    if request.user.user_type != 'landlord':
+        raise PermissionDenied
+    return render(request, 'rentals/arrears_report.html', {
+        'balances': landlord_arrears(request.user),
+        'today': timezone.localdate(),
+    })
+
+@login_required
+def agreement_document(request, pk):
+    agreement = get_object_or_404(
+        RentalAgreement.objects.select_related('property', 'landlord', 'tenant'), pk=pk
+    )
+    if request.user.pk not in (agreement.landlord_id, agreement.tenant_id) or not agreement.is_fully_signed():
+        raise Http404('No signed agreement found')
+    
+    version = document_version(agreement)
+    if not agreement.document or agreement.document_version != version:
+        _queue_agreement_document(agreement, version)
+        messages.info(request, 'The signed agreement is being prepared. Please try again in a minute.')
+        return redirect('rental_agreement_detail', pk=agreement.pk)
+    return ranged_file_response(
+        request, agreement.document, etag=version,
+        content_type='application/pdf', filename=f'rental-agreement-{agreement.pk}.pdf',
+    )
+
+@login_required
+async def create_stripe_payment_intent(request, pk):
+    try:
+        payment = await Payment.objects.select_related('rental_agreement').aget(pk=pk)
+    except Payment.DoesNotExist:
+        raise Http404('No payment found')
+    user = await request.auser()
+    agreement = payment.rental_agreement
+    if user.pk not in (agreement.landlord_id, agreement.tenant_id):
+        raise Http404('No payment found')
     
     if request.method == 'POST':
-        try:
-            # Create a PaymentIntent with the order amount and currency
-            intent = stripe.PaymentIntent.create(
-                amount=int(payment.amount * 100),  # amount in cents
-                currency='usd',
-                metadata={
-                    'payment_id': payment.id,
-                    'user_id': request.user.id
-                }
-            )
-            
+        if payment.stripe_client_secret:
             return JsonResponse({
-                'clientSecret': intent.client_secret
+                'clientSecret': payment.stripe_client_secret
             })
-        except Exception as e:
-            return JsonResponse({'error': str(e)}, status=403)
+        
+        try:
+            intent = await asyncio.wait_for(
+                create_payment_intent_async(payment, user.id), timeout=settings.STRIPE_TIMEOUT
+            )
+        except Exception:
+            logger.warning('Stripe intent for payment %s failed; queueing a retry', payment.pk, exc_info=True)
+            return await sync_to_async(_queue_payment_intent)(payment, user.id)
+        
+        await Payment.objects.filter(pk=payment.pk).aupdate(
+            transaction_id=intent.id, stripe_client_secret=intent.client_secret
+        )
+        return JsonResponse({
+            'clientSecret': intent.client_secret
+        })
     
     return JsonResponse({'error': 'Invalid request'}, status=400)
 
+def _queue_payment_intent(payment, user_id):
+    # The task worker retries with backoff; the page polls payment_intent_status until the
+    # secret is ready. A finished task frees its key, so a later attempt queues a fresh one.
+    create_payment_intent.enqueue(
+        args=(payment.pk, user_id), dedupe_key=f'payment-intent:{payment.pk}'
+    )
+    return JsonResponse({'status': 'pending'}, status=202)
+
+@login_required
+def payment_intent_status(request, pk):
+    """Polled by the payment page while the intent is created in the background; never calls Stripe."""
+    payment = get_object_or_404(Payment.objects.select_related('rental_agreement'), pk=pk)
+    agreement = payment.rental_agreement
+    if request.user.pk not in (agreement.landlord_id, agreement.tenant_id):
+        raise Http404('No payment found')
+    if payment.stripe_client_secret:
+        return JsonResponse({'clientSecret': payment.stripe_client_secret})
+    task = Task.objects.filter(name=create_payment_intent.name, args__0=payment.pk).order_by('-pk').first()
+    if task is not None and task.status == Task.FAILED:
+        return JsonResponse({'error': 'Could not reach the payment provider. Please try again.'}, status=502)
+    return JsonResponse({'status': 'pending'}, status=202)
+
 @login_required
 def payment_success(request, pk):
     payment = get_object_or_404(Payment, pk=pk)
@@ -497,8 +789,13 @@ def payment_failed(request, pk):
     messages.error(request, 'Payment failed. Please try again.')
     return redirect('rental_agreement_detail', pk=payment.rental_agreement.pk)
 
-class AboutView(TemplateView):
+class AboutView(ConditionalResponseMixin, TemplateView):
     template_name = 'about.html'
+    cache_max_age = 3600
+    cache_shared_max_age = 86400
+    
+    def get_cache_versions(self):
+        return [settings.STATIC_PAGE_VERSION]
 
 
 def contact_view(request):
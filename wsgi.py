@@ -18,3 +18,6 @@ os.environ['DJANGO_SETTINGS_MODULE'] = 'tenant_network.settings'
 
 from django.core.wsgi import get_wsgi_application
 application = get_wsgi_application()
+
+from tenant_network.templating import precompile_templates
+precompile_templates()